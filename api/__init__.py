@@ -1,16 +1,143 @@
-from fastapi import FastAPI, Depends, HTTPException, Form
+import time
+
+# Reference point for the cold-start budget check in lifespan
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Depends, HTTPException, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from db import get_db, engine
-from db.models import Base, Waitlist
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+from contextlib import asynccontextmanager
+from db import dispose_engines, get_async_db, get_async_engine, get_engine, get_replica_async_engine, new_async_session
+from db.batch import SignupBatcher
+from db.migrations import run_migrations
+from db.pool import pool_stats
+from db.models import Waitlist
+from db.replica import get_read_db, new_read_session, replica_router
+from db.queries import (
+    confirm_signup, email_exists, insert_waitlist_email, insert_waitlist_emails, signup_values,
+    waitlist_listing_query,
+)
+from db.rollups import GRANULARITIES, REFERRER_GRANULARITIES, referrer_source, rollup_series, truncate
+from db.spool import CircuitBreaker, SignupSpool, SpoolFull, is_unavailable
+from api.analytics import ANALYTICS_MAX_POINTS, signup_aggregator
+from api.bloom import email_filter
+from api.confirmations import create_confirmation_worker
+from api.counter import waitlist_counter
+from api.idempotency import MAX_KEY_LENGTH, IdempotencyConflict, idempotency_cache
+from api.live import count_broadcaster
+from api.metrics import metrics
+from api.payloads import SIGNUP_REQUEST_BODY, FastJSONResponse, loads, read_signup_fields, required_string
+from api.listing import MEDIA_TYPES, decode_cursor, encode_cursor, serialize_row, stream_rows
+from api.ranks import LEADERBOARD_MAX, LEADERBOARD_TTL, public_handle, rank_index
+from api.ratelimit import enforce_signup_rate_limit, signup_limiter
+from api.security import require_admin
+from api.static import etag_matches
+from validation import InvalidEmail, normalize_email
+from logging_config import REQUEST_LOGGER, configure_logging
 import logging
+import os
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger(REQUEST_LOGGER)
+
+# Optional write-behind mode: coalesce concurrent signups into multi-row inserts
+signup_batcher = None
+if os.getenv("WAITLIST_WRITE_BEHIND", "").lower() in ("1", "true", "yes", "on"):
+    signup_batcher = SignupBatcher(
+        new_async_session,
+        max_rows=int(os.getenv("WAITLIST_BATCH_MAX_ROWS", "500")),
+        max_delay=float(os.getenv("WAITLIST_BATCH_MAX_DELAY_MS", "10")) / 1000,
+    )
+
+# Optional degraded mode: accept signups into a local spool while the database is down
+signup_spool = None
+if os.getenv("WAITLIST_SPOOL_DIR"):
+    signup_spool = SignupSpool(
+        os.getenv("WAITLIST_SPOOL_DIR"),
+        CircuitBreaker(
+            window=int(os.getenv("SPOOL_BREAKER_WINDOW", "20")),
+            failure_ratio=float(os.getenv("SPOOL_BREAKER_FAILURE_RATIO", "0.5")),
+            slow_call=float(os.getenv("SPOOL_BREAKER_SLOW_MS", "1000")) / 1000,
+            cooldown=float(os.getenv("SPOOL_BREAKER_COOLDOWN", "5")),
+        ),
+        segment_bytes=int(os.getenv("SPOOL_SEGMENT_BYTES", str(4 * 1024 * 1024))),
+        max_bytes=int(os.getenv("SPOOL_MAX_BYTES", str(1024 * 1024 * 1024))),
+    )
+# Seconds a signup may wait on the database before it is spooled instead
+SPOOL_DB_TIMEOUT = float(os.getenv("SPOOL_DB_TIMEOUT", "2"))
+
+# Largest JSON array accepted by the partner batch endpoint
+WAITLIST_BATCH_MAX_EMAILS = int(os.getenv("WAITLIST_BATCH_MAX_EMAILS", "1000"))
+
+# Double opt-in confirmation emails, enabled by SMTP_HOST
+confirmation_worker = create_confirmation_worker(new_async_session)
+# Where the confirmation link sends the browser afterwards; JSON response if unset
+CONFIRMATION_REDIRECT_URL = os.getenv("CONFIRMATION_REDIRECT_URL")
+
+# Workers started by main.py skip this; the launcher migrates once beforehand
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes", "on")
+# Cold-start time budget in milliseconds; exceeding it logs a warning
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1000"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the schema and background workers on startup and drain them on shutdown."""
+    if DB_MIGRATE_ON_STARTUP:
+        await asyncio.to_thread(run_migrations, get_engine())
+    if signup_batcher:
+        signup_batcher.start()
+    if signup_spool:
+        signup_spool.start(new_async_session, record_replayed_signup)
+    if confirmation_worker:
+        confirmation_worker.start()
+    if signup_aggregator:
+        signup_aggregator.start(new_async_session)
+    if count_broadcaster:
+        count_broadcaster.start(new_read_session)
+    # Route reads to the replica only while it is reachable and caught up
+    replica_engine = get_replica_async_engine()
+    replica_task = asyncio.create_task(replica_router.run(replica_engine)) if replica_engine else None
+    
+    startup_ms = (time.perf_counter() - _import_started) * 1000
+    if startup_ms > STARTUP_BUDGET_MS:
+        logger.warning("Startup took %.0f ms, over the %.0f ms budget", startup_ms, STARTUP_BUDGET_MS)
+    else:
+        logger.info("Startup completed in %.0f ms", startup_ms)
+    
+    yield
+    if email_filter:
+        email_filter.stop()
+    if rank_index:
+        rank_index.stop()
+    if replica_task:
+        replica_task.cancel()
+    if count_broadcaster:
+        await count_broadcaster.stop()
+    if signup_batcher:
+        # Requests still waiting on a batch get their result before the pool closes
+        logger.info("Flushing write-behind queue before shutdown")
+        await signup_batcher.stop()
+    if signup_spool:
+        await signup_spool.stop()
+    if confirmation_worker:
+        await confirmation_worker.stop()
+    if signup_aggregator:
+        await signup_aggregator.stop()
+    await dispose_engines()
 
 # Create FastAPI app
-app = FastAPI(title="Lavoo Waitlist API", version="1.0.0")
+# Responses are serialized with orjson when it is installed (see api.payloads)
+app = FastAPI(
+    title="Lavoo Waitlist API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
 
 # Configure CORS to allow frontend to communicate with backend
 origins = [
@@ -28,20 +155,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-from fastapi import Request
+from fastapi import Request, Response
+from fastapi.responses import PlainTextResponse, RedirectResponse, StreamingResponse
+from datetime import datetime, timezone
+from typing import Optional
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    # Reduced logging noise for production
-    if request.url.path != "/":  # Skip health check spam
-        logger.info(f"INCOMING REQUEST: {request.method} {request.url.path}")
     response = await call_next(request)
+    # Reduced logging noise for production; access logs are sampled and rate limited
+    if request.url.path != "/":  # Skip health check spam
+        access_logger.info(
+            "%s %s %s", request.method, request.url.path, response.status_code,
+            extra={"method": request.method, "path": request.url.path, "status": response.status_code}
+        )
     return response
 
-# Create database tables
-# logger.info("Connecting to DB engine for initialization...")
-Base.metadata.create_all(bind=engine)
-# logger.info("Database tables initialized.")
+# Record per-route latency and status, and trace queries on sampled requests
+metrics.instrument_engine(Engine)
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    token = metrics.start_request()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.finish_request(
+            token,
+            request.method,
+            route.path if route else "unmatched",
+            status_code,
+            time.perf_counter() - started,
+        )
 
 '''
 @app.get("/")
@@ -53,118 +203,728 @@ def read_root():
     }
 '''
 
-@app.post("/api/waitlist")
+def record_signup(values: dict, new_entry):
+    """Update in-process counters, indexes and workers after a committed signup."""
+    waitlist_counter.increment()
+    if count_broadcaster:
+        count_broadcaster.notify()
+    if rank_index:
+        rank_index.add(new_entry.id, new_entry.referred_by_id)
+    if confirmation_worker:
+        confirmation_worker.notify()
+    if signup_aggregator:
+        signup_aggregator.record(values["created_at"], new_entry.referred_by_id)
+
+def record_replayed_signup(values: dict, new_entry):
+    """Account for a spooled signup once the replayer has inserted it."""
+    if email_filter:
+        email_filter.add(values["email"])
+    record_signup(values, new_entry)
+
+async def insert_signup(db: AsyncSession, email: str, values: dict):
+    """
+    Insert a validated signup, directly or through the write-behind batcher.
+    
+    With the optional duplicate filter (see api.bloom), emails it has never
+    seen go straight to the insert; probable duplicates are confirmed with
+    an indexed lookup first.
+    
+    Returns:
+        The inserted row, or None if the email is already waitlisted
+    """
+    known_duplicate = False
+    if email_filter:
+        email_filter.start(new_async_session)
+    if email_filter and email_filter.ready and email_filter.might_contain(email):
+        known_duplicate = await email_exists(db, email)
+        if not known_duplicate:
+            email_filter.record_false_positive()
+    
+    # Insert and detect duplicates in a single round trip, either directly
+    # or as part of a write-behind batch
+    if known_duplicate:
+        new_entry = None
+    elif signup_batcher:
+        new_entry = await signup_batcher.submit(values)
+    else:
+        new_entry = await insert_waitlist_email(db, values)
+    
+    # Either way the email is now in the table
+    if email_filter and not known_duplicate:
+        email_filter.add(email)
+    return new_entry
+
+async def insert_signup_with_timeout(email: str, values: dict, timeout: float):
+    """
+    insert_signup() in its own session, giving up after timeout seconds.
+    
+    A timed-out insert is not cancelled: cancelling a statement mid-flight
+    can leave its connection holding locks. It finishes in the background
+    instead, and if it still inserts the row the signup is recorded then;
+    replaying the spooled copy later only finds a duplicate.
+    
+    Raises:
+        TimeoutError: If the insert did not finish in time
+    """
+    async def insert():
+        async with new_async_session() as db:
+            return await insert_signup(db, email, values)
+    
+    def record_late_insert(task):
+        if task.cancelled():
+            return
+        if task.exception() is None and task.result() is not None:
+            record_signup(values, task.result())
+    
+    task = asyncio.create_task(insert())
+    done, _ = await asyncio.wait((task,), timeout=timeout)
+    if not done:
+        task.add_done_callback(record_late_insert)
+        raise TimeoutError(f"Insert took longer than {timeout}s")
+    return task.result()
+
+async def spool_signup(email: str, ref, values: dict, idempotency_key=None):
+    """Accept a signup into the local spool and answer 202 Accepted."""
+    try:
+        await signup_spool.append(values, ref)
+    except SpoolFull as e:
+        logger.error("Rejecting signup for %s: %s", email, e)
+        raise HTTPException(
+            status_code=503,
+            detail="We're experiencing high demand, please try again shortly",
+            headers={"Retry-After": "30"}
+        )
+    logger.info("Spooled signup for %s until the database recovers", email)
+    
+    # Duplicates cannot be detected until replay, which skips them
+    result = {
+        "success": True,
+        "message": "You have been successfully waitlisted!",
+        "email": email,
+        "id": None,
+        "referral_code": values["referral_code"],
+        "position": None,
+        "queued": True
+    }
+    if idempotency_key:
+        idempotency_cache.complete(idempotency_key, result, status_code=202)
+    return FastJSONResponse(result, status_code=202)
+
+def referral_code_param(ref):
+    """Referral code from a request, or None if absent or not a plausible code."""
+    return ref if isinstance(ref, str) and 0 < len(ref) <= 16 else None
+
+@app.post(
+    "/api/waitlist",
+    dependencies=[Depends(enforce_signup_rate_limit)],
+    openapi_extra=SIGNUP_REQUEST_BODY
+)
 async def add_to_waitlist(
-    email: str = Form(...),
-    db: Session = Depends(get_db)
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Add an email to the waitlist.
     
+    The body may be JSON (``{"email": ..., "ref": ...}``), URL-encoded or
+    multipart form data. Requests carrying an Idempotency-Key header that this worker has already
+    completed are answered with the original response (marked with an
+    Idempotent-Replayed header) without touching the database.
+    
+    With WAITLIST_SPOOL_DIR set, a signup the database cannot be reached
+    for or fails to take within SPOOL_DB_TIMEOUT, or any signup while the
+    circuit breaker is open, is written to the local spool instead and
+    answered with 202 (see db.spool); it is inserted once the database
+    recovers. Other errors are not spooled and fail with 500.
+    
     Args:
-        email: User's email address (from form data)
-        db: Database session
+        request: Request whose body holds email and, optionally, ref (the
+            referral code of the user who shared the signup link)
+        idempotency_key: Optional client-generated key identifying this submission
+        db: Async database session
         
     Returns:
-        Success message with email confirmation
+        Success message with email confirmation, the new user's referral
+        code and queue position (None until this worker's rank index has
+        loaded, which the first position or leaderboard request starts),
+        or a 202 with ``queued`` set and no id or position if spooled
         
     Raises:
-        HTTPException: If email already exists or validation fails
+        HTTPException: If email already exists, validation fails, the
+            Idempotency-Key was used for a different email (422), the
+            client is over its signup rate limit (429 with Retry-After) or
+            the spool is full (503)
+        RequestValidationError: If the body has no email (422 with
+            FastAPI's list of validation errors as ``detail``)
     """
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key header")
+    fields = await read_signup_fields(request)
+    email = required_string(fields, "email")
+    claimed = False
+    
     try:
-        # Normalize email
-        normalized_email = email.lower().strip()
-        logger.info(f"Processing waitlist request for: {normalized_email}")
-        
-        # Validate email format (basic check)
-        if not normalized_email or "@" not in normalized_email or "." not in normalized_email:
-            logger.warning(f"Validation failed for: {normalized_email}")
+        # Validate and normalize email
+        try:
+            normalized_email = normalize_email(email)
+        except InvalidEmail:
+            logger.warning("Validation failed for: %s", email.strip())
             raise HTTPException(
                 status_code=400,
                 detail="Invalid email format"
             )
+        logger.debug("Processing waitlist request for: %s", normalized_email)
+        
+        # Replay the stored response for a retried submission
+        if idempotency_key and idempotency_cache:
+            try:
+                replay = await idempotency_cache.claim(idempotency_key, normalized_email)
+            except IdempotencyConflict as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            if replay is not None:
+                status_code, payload = replay
+                return FastJSONResponse(payload, status_code=status_code, headers={"Idempotent-Replayed": "true"})
+            claimed = True
         
-        # Check if email already exists in the waitlist
-        existing_entry = db.query(Waitlist).filter(Waitlist.email == normalized_email).first()
+        if signup_limiter:
+            await signup_limiter.check_domain(normalized_email)
         
-        if existing_entry:
-            logger.info(f"Email already waitlisted: {normalized_email}")
+        # Unknown referral codes are ignored
+        ref = referral_code_param(fields.get("ref"))
+        values = signup_values(normalized_email, ref, confirm=confirmation_worker is not None)
+        if signup_spool is None:
+            new_entry = await insert_signup(db, normalized_email, values)
+        elif signup_spool.breaker.is_open:
+            return await spool_signup(normalized_email, ref, values, idempotency_key if claimed else None)
+        else:
+            started = time.perf_counter()
+            try:
+                new_entry = await insert_signup_with_timeout(normalized_email, values, SPOOL_DB_TIMEOUT)
+            except Exception as e:
+                if not is_unavailable(e):
+                    raise
+                signup_spool.breaker.record(time.perf_counter() - started, failed=True)
+                logger.warning("Database unavailable for %s, spooling: %r", normalized_email, e)
+                return await spool_signup(normalized_email, ref, values, idempotency_key if claimed else None)
+            signup_spool.breaker.record(time.perf_counter() - started)
+        
+        if new_entry is None:
+            logger.info("Email already waitlisted: %s", normalized_email)
             raise HTTPException(
                 status_code=409,
                 detail="This email has already been waitlisted"
             )
         
-        # Create new waitlist entry
-        new_entry = Waitlist(email=normalized_email)
-        
-        # Add to database
-        db.add(new_entry)
-        db.commit()
-        db.refresh(new_entry)
+        record_signup(values, new_entry)
+        logger.info("Successfully added %s to waitlist (ID: %s)", normalized_email, new_entry.id)
         
-        logger.info(f"Successfully added {normalized_email} to waitlist (ID: {new_entry.id})")
-        
-        return {
+        result = {
             "success": True,
             "message": "You have been successfully waitlisted!",
-            "email": new_entry.email,
-            "id": new_entry.id
+            "email": normalized_email,
+            "id": new_entry.id,
+            "referral_code": new_entry.referral_code,
+            "position": rank_index.position(new_entry.id) if rank_index else None
         }
+        if claimed:
+            idempotency_cache.complete(idempotency_key, result)
+        return FastJSONResponse(result)
         
     except HTTPException:
         # Re-raise HTTP exceptions (including our duplicate check)
         raise
         
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error adding to waitlist: {str(e)}")
+        await db.rollback()
+        logger.error("Error adding to waitlist: %s", e)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while processing your request"
         )
+    
+    finally:
+        # Let waiting retries run the signup themselves if this attempt failed
+        if claimed:
+            idempotency_cache.release(idempotency_key)
+
+@app.post("/api/waitlist/batch", dependencies=[Depends(require_admin)])
+async def add_batch_to_waitlist(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Add many emails in one request, for partner integrations.
+    
+    The body is a JSON array of email strings or ``{"email", "ref"}``
+    objects, at most WAITLIST_BATCH_MAX_EMAILS long. All valid, distinct
+    emails are inserted with a single multi-row INSERT ... ON CONFLICT.
+    
+    Args:
+        request: Request whose body holds the JSON array
+        db: Async database session
+        
+    Returns:
+        Counts of added, duplicate and invalid emails, and a result per
+        input item in order
+        
+    Raises:
+        HTTPException: If the body is not a JSON array (400) or too long (413)
+    """
+    try:
+        items = loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed JSON body")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array")
+    if len(items) > WAITLIST_BATCH_MAX_EMAILS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {WAITLIST_BATCH_MAX_EMAILS} emails per request"
+        )
+    
+    # Normalize everything first; repeated emails are inserted once
+    normalized = []
+    rows = {}
+    for item in items:
+        email, ref = (item.get("email"), item.get("ref")) if isinstance(item, dict) else (item, None)
+        try:
+            if not isinstance(email, str):
+                raise InvalidEmail("email must be a string")
+            normalized_email = normalize_email(email)
+        except InvalidEmail:
+            normalized.append(None)
+            continue
+        normalized.append(normalized_email)
+        if normalized_email not in rows:
+            rows[normalized_email] = signup_values(
+                normalized_email, referral_code_param(ref), confirm=confirmation_worker is not None
+            )
+    
+    try:
+        inserted = await insert_waitlist_emails(db, list(rows.values())) if rows else {}
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error adding batch of %d to waitlist: %s", len(rows), e)
+        raise HTTPException(
+            status_code=500,
+            detail="An error occurred while processing your request"
+        )
+    
+    for normalized_email, new_entry in inserted.items():
+        record_signup(rows[normalized_email], new_entry)
+    if email_filter:
+        for normalized_email in rows:
+            email_filter.add(normalized_email)
+    
+    results = []
+    for normalized_email in normalized:
+        if normalized_email is None:
+            results.append({"status": "invalid"})
+            continue
+        new_entry = inserted.pop(normalized_email, None)
+        if new_entry is None:
+            results.append({"email": normalized_email, "status": "duplicate"})
+        else:
+            results.append({
+                "email": normalized_email,
+                "status": "added",
+                "id": new_entry.id,
+                "referral_code": new_entry.referral_code
+            })
+    
+    added = sum(result["status"] == "added" for result in results)
+    invalid = normalized.count(None)
+    logger.info("Batch signup: %d added, %d invalid of %d", added, invalid, len(items))
+    return FastJSONResponse({
+        "added": added,
+        "duplicates": len(items) - added - invalid,
+        "invalid": invalid,
+        "results": results
+    })
 
 @app.get("/api/waitlist/count")
-async def get_waitlist_count(db: Session = Depends(get_db)):
+async def get_waitlist_count(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
     """
     Get the total number of people on the waitlist.
     
+    The count is served from an in-process cache (see api.counter), reloaded
+    from the read replica when one is healthy (see db.replica), and sent
+    with Cache-Control and ETag headers so browsers and proxies can reuse it.
+    
     Returns:
         Total count of waitlist entries
     """
     try:
-        count = db.query(Waitlist).count()
-        return {"count": count}
+        count = await waitlist_counter.get(db)
+        
+        headers = {
+            "Cache-Control": f"public, max-age={int(waitlist_counter.ttl)}",
+            "ETag": f'W/"{count}"',
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        
+        return FastJSONResponse({"count": count}, headers=headers)
     except Exception as e:
-        logger.error(f"Error getting waitlist count: {str(e)}")
+        logger.error("Error getting waitlist count: %s", e)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while fetching waitlist count"
         )
 
+@app.get("/api/waitlist/count/stream")
+async def stream_waitlist_count():
+    """
+    Stream the waitlist count as Server-Sent Events.
+    
+    Sends the current count on connect and a ``count`` event whenever it
+    changes, at most every LIVE_COUNT_MIN_INTERVAL seconds. All streams are
+    fed by one broadcaster (see api.live), so open streams cost no database
+    queries.
+    
+    Returns:
+        A text/event-stream response
+    """
+    if count_broadcaster is None:
+        raise HTTPException(status_code=404, detail="Live count is disabled")
+    try:
+        queue = count_broadcaster.subscribe()
+    except OverflowError:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many live viewers, please poll /api/waitlist/count",
+            headers={"Retry-After": "30"}
+        )
+    
+    return StreamingResponse(
+        count_broadcaster.stream(queue),
+        media_type="text/event-stream",
+        # Disable proxy buffering so events are delivered as they are sent
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/waitlist/confirm")
+async def confirm_waitlist_email(
+    token: str = Query(..., min_length=1, max_length=64),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Confirm an email address from the link in the confirmation email.
+    
+    Confirming twice is not an error. With CONFIRMATION_REDIRECT_URL set the
+    browser is redirected there instead of receiving JSON.
+    
+    Args:
+        token: Confirmation token from the emailed link
+        db: Async database session
+        
+    Returns:
+        Confirmation status, or a redirect
+        
+    Raises:
+        HTTPException: If the token is unknown
+    """
+    try:
+        newly_confirmed = await confirm_signup(db, token)
+    except Exception as e:
+        logger.error("Error confirming email: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail="An error occurred while confirming your email"
+        )
+    
+    if newly_confirmed is None:
+        raise HTTPException(status_code=404, detail="Invalid or expired confirmation link")
+    if CONFIRMATION_REDIRECT_URL:
+        return RedirectResponse(CONFIRMATION_REDIRECT_URL, status_code=303)
+    return {
+        "success": True,
+        "message": "Your email has been confirmed!" if newly_confirmed else "Your email was already confirmed"
+    }
+
+async def require_ranks():
+    """
+    Dependency rejecting rank lookups while the index is disabled or loading.
+    
+    The first rank lookup in a worker starts loading its index, so workers
+    only read the table once positions are actually asked for.
+    """
+    if rank_index is None:
+        raise HTTPException(status_code=404, detail="Queue positions are disabled")
+    rank_index.start(new_async_session)
+    if not rank_index.ready:
+        raise HTTPException(
+            status_code=503,
+            detail="Queue positions are loading, please try again shortly",
+            headers={"Retry-After": str(max(1, int(rank_index.refresh_interval)))}
+        )
+
+@app.get("/api/waitlist/position", dependencies=[Depends(require_ranks)])
+async def get_waitlist_position(
+    code: str = Query(..., min_length=1, max_length=16),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get a user's queue position and referral count.
+    
+    The referral code is resolved with one unique-index lookup; the position
+    comes from the in-process rank index (see api.ranks).
+    
+    Each worker keeps its own index, so positions are eventually
+    consistent: signups and referrals made through other workers are seen
+    after their next refresh, up to RANK_REFRESH_INTERVAL seconds later.
+    Until then a position may be slightly off, and consecutive requests
+    served by different workers may disagree. A signup not yet in this
+    worker's index gets a 503 with Retry-After rather than a 404.
+    
+    Args:
+        code: The user's referral code, as returned on signup
+        db: Async database session
+        
+    Returns:
+        Position (1 is first in line), total signups, referral count and
+        the handle shown for this user on the leaderboard
+    """
+    signup_id = await db.scalar(select(Waitlist.id).where(Waitlist.referral_code == code))
+    if signup_id is None:
+        raise HTTPException(status_code=404, detail="Unknown referral code")
+    position = rank_index.position(signup_id)
+    if position is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Queue position is not available yet, please try again shortly",
+            headers={"Retry-After": str(max(1, int(rank_index.refresh_interval)))}
+        )
+    
+    return {
+        "position": position,
+        "total": len(rank_index.ids),
+        "referrals": rank_index.referral_count(signup_id),
+        "handle": public_handle(code)
+    }
+
+@app.get("/api/waitlist/leaderboard", dependencies=[Depends(require_ranks)])
+async def get_referral_leaderboard(
+    response: Response,
+    limit: int = Query(10, ge=1, le=LEADERBOARD_MAX),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get the users with the most referrals, by public handle.
+    
+    Handles are one-way hashes of referral codes (see api.ranks.public_handle),
+    so neither emails nor usable codes are exposed.
+    
+    Referral counts come from this worker's rank index and are cached for
+    LEADERBOARD_TTL seconds, so referrals made through other workers show up
+    after up to RANK_REFRESH_INTERVAL plus LEADERBOARD_TTL seconds.
+    
+    Returns:
+        Ranked list of handles and referral counts
+    """
+    response.headers["Cache-Control"] = f"public, max-age={int(LEADERBOARD_TTL)}"
+    return {"leaders": await rank_index.leaderboard(db, limit, LEADERBOARD_TTL)}
+
+@app.get("/api/waitlist", dependencies=[Depends(require_admin)])
+async def list_waitlist(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    format: str = Query("json", pattern="^(json|ndjson|csv)$"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    List waitlist entries for admins, oldest first.
+    
+    Pages are keyset-paginated on (created_at, id): pass the returned
+    next_cursor to fetch the following page. With format=ndjson or csv the
+    whole list from the cursor onward is streamed from a server-side cursor
+    and limit is ignored. Both are read from the replica when one is healthy,
+    so they may lag the primary by up to REPLICA_MAX_LAG seconds.
+    
+    Args:
+        cursor: Opaque position returned by a previous page
+        limit: Page size for JSON responses
+        format: json, ndjson or csv
+        db: Async database session
+        
+    Returns:
+        A page of entries with next_cursor, or a streaming NDJSON/CSV body
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if format != "json":
+        return StreamingResponse(stream_rows(format, after), media_type=MEDIA_TYPES[format])
+    
+    try:
+        rows = (await db.execute(waitlist_listing_query(after, limit))).all()
+    except Exception as e:
+        logger.error("Error listing waitlist: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail="An error occurred while listing the waitlist"
+        )
+    
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    
+    return {
+        "entries": [serialize_row(row) for row in rows],
+        "next_cursor": next_cursor
+    }
+
+@app.get("/api/analytics/signups", dependencies=[Depends(require_admin)])
+async def get_signup_analytics(
+    granularity: str = Query("hour", pattern="^(minute|hour|day)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    source: Optional[str] = Query(None, pattern="^(direct|referral)$"),
+    referrer: Optional[str] = Query(None, min_length=1, max_length=16),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get signups per minute, hour or day for admin dashboards.
+    
+    Served from the signup_rollups table (see db.rollups), so the cost
+    depends on the number of buckets requested, not the size of the
+    waitlist. Counts lag live signups by up to ANALYTICS_FLUSH_INTERVAL;
+    bulk imports add theirs when they commit.
+    
+    Args:
+        granularity: minute, hour or day
+        start: First bucket; defaults to 100 buckets before end
+        end: End of the range, exclusive; a bucket it falls inside is
+            included. Defaults to now
+        source: Only direct or only referral signups; both if omitted
+        referrer: Referral code of one user, for the signups they referred
+            (hour and day only)
+        db: Async database session
+        
+    Returns:
+        Every bucket in the range with its signup count, and the total
+    """
+    step = GRANULARITIES[granularity]
+    if referrer is not None:
+        if source is not None or granularity not in REFERRER_GRANULARITIES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"referrer needs granularity {' or '.join(REFERRER_GRANULARITIES)} and no source"
+            )
+        referrer_id = await db.scalar(select(Waitlist.id).where(Waitlist.referral_code == referrer))
+        if referrer_id is None:
+            raise HTTPException(status_code=404, detail="Unknown referral code")
+        source = referrer_source(referrer_id)
+    # Rollups are stored in naive UTC like Waitlist.created_at
+    if start and start.tzinfo:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if end and end.tzinfo:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    # Round the end up to a bucket boundary, so a partial last bucket is included
+    end = end or datetime.utcnow()
+    last = truncate(end, granularity)
+    end = last + step if last < end else last
+    start = truncate(start, granularity) if start else end - 100 * step
+    if start >= end or (end - start) / step > ANALYTICS_MAX_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range must be non-empty and span at most {ANALYTICS_MAX_POINTS} buckets"
+        )
+    
+    try:
+        series = await rollup_series(db, granularity, start, end, source)
+    except Exception as e:
+        logger.error("Error reading signup analytics: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail="An error occurred while reading signup analytics"
+        )
+    
+    points = []
+    bucket = start
+    while bucket < end:
+        points.append({"t": bucket.isoformat(), "signups": series.get(bucket, 0)})
+        bucket += step
+    
+    return {
+        "granularity": granularity,
+        "source": "referral" if referrer else source or "all",
+        "referrer": referrer,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "total": sum(series.values()),
+        "points": points
+    }
+
+@app.get("/api/internal/stats", dependencies=[Depends(require_admin)])
+async def get_internal_stats():
+    """
+    Report internal runtime statistics for capacity planning.
+    
+    Returns:
+        Connection pool occupancy (checked out, overflow), checkout wait times,
+        write-behind batch sizes, duplicate filter hit/false-positive rates,
+        idempotency cache hit rates, rank index size, confirmation
+        email delivery counts, pending analytics rollups, live count
+        stream clients, spool backlog and circuit breaker state, and read
+        replica health, lag and pool occupancy
+    """
+    stats = {"pool": pool_stats.snapshot(get_async_engine().pool)}
+    replica_engine = get_replica_async_engine()
+    if replica_engine:
+        stats["replica"] = {**replica_router.stats(), "pool": pool_stats.occupancy(replica_engine.pool)}
+    if signup_batcher:
+        stats["write_behind"] = signup_batcher.stats()
+    if signup_spool:
+        stats["spool"] = signup_spool.stats()
+    if email_filter:
+        stats["duplicate_filter"] = email_filter.stats()
+    if signup_limiter:
+        stats["rate_limit"] = signup_limiter.stats()
+    if idempotency_cache:
+        stats["idempotency"] = idempotency_cache.stats()
+    if rank_index:
+        stats["ranks"] = rank_index.stats()
+    if confirmation_worker:
+        stats["confirmations"] = confirmation_worker.stats()
+    if signup_aggregator:
+        stats["analytics"] = signup_aggregator.stats()
+    if count_broadcaster:
+        stats["live_count"] = count_broadcaster.stats()
+    return stats
+
+@app.get("/metrics", dependencies=[Depends(require_admin)], response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Expose request, query and pool metrics in Prometheus text format.
+    
+    Returns:
+        Text exposition of all collected metrics
+    """
+    return PlainTextResponse(
+        metrics.render(get_async_engine().pool),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 # Serve static files (Frontend) - MUST BE LAST
-import os
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from api.static import StaticSite
 
 # Check if the build output directory exists (production mode)
 if os.path.exists("out"):
-    # Mount the assets folder separately to avoid conflict with root catch-all
-    # Vite places assets in out/assets
-    if os.path.exists("out/assets"):
-        app.mount("/assets", StaticFiles(directory="out/assets"), name="assets")
-
-    # Serve the main index.html for the root path and any other path (SPA support)
-    @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
+    # Build the file manifest once; requests never stat the filesystem
+    static_site = StaticSite("out").load()
+
+    # Serve built files, falling back to index.html for any other path (SPA support)
+    @app.api_route("/{full_path:path}", methods=["GET", "HEAD"])
+    async def serve_spa(full_path: str, request: Request):
         # Allow API routes to pass through (though they should be matched above)
         if full_path.startswith("api"):
             raise HTTPException(status_code=404, detail="API route not found")
         
-        # Check if the file exists in the out directory (e.g., favicon.ico, etc.)
-        file_path = os.path.join("out", full_path)
-        if os.path.exists(file_path) and os.path.isfile(file_path):
-             return FileResponse(file_path)
-        
-        # Fallback to index.html for SPA routing
-        return FileResponse("out/index.html")
-
+        return static_site.response(full_path, request.headers)
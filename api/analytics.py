@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime
+from db.rollups import add_rollup_counts, rollup_keys
+
+logger = logging.getLogger(__name__)
+
+
+class SignupAggregator:
+    """
+    In-process signup counters flushed to the rollup table.
+
+    Each signup bumps its minute, hour and day buckets in memory; every
+    ``interval`` seconds the pending counts are swapped out and added to
+    signup_rollups with a single upsert. A failed flush puts its counts back
+    so they go out with the next one. Counts still pending when the process
+    is killed without a clean shutdown are lost.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.pending = Counter()
+        self.flushes = 0
+        self.flushed_signups = 0
+        self._signups = 0
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    def record(self, created_at: datetime, referrer_id=None):
+        """Count one committed signup, and its referrer's if it was referred."""
+        self.pending.update(rollup_keys(created_at, referrer_id))
+        self._signups += 1
+
+    async def flush(self, session_factory):
+        if not self.pending:
+            return
+        counts, signups = self.pending, self._signups
+        self.pending, self._signups = Counter(), 0
+        try:
+            async with session_factory() as db:
+                await add_rollup_counts(db, counts)
+        except Exception as e:
+            logger.error("Error flushing %d signup rollups: %s", len(counts), e)
+            self.pending.update(counts)
+            self._signups += signups
+            return
+        self.flushes += 1
+        self.flushed_signups += signups
+
+    async def _run(self, session_factory):
+        # Never cancelled mid-flush; stop() wakes the loop for a final flush
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush(session_factory)
+
+    def start(self, session_factory):
+        """Start the periodic flush task on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self):
+        """Write out what is still pending and stop the flush task."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "pending_buckets": len(self.pending),
+            "pending_signups": self._signups,
+            "flushes": self.flushes,
+            "flushed_signups": self.flushed_signups,
+        }
+
+
+# Seconds between rollup flushes; also the most a dashboard lags behind
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "10"))
+# Largest number of buckets one time series request may cover
+ANALYTICS_MAX_POINTS = int(os.getenv("ANALYTICS_MAX_POINTS", "5000"))
+
+signup_aggregator = None
+if os.getenv("WAITLIST_ANALYTICS", "true").lower() in ("1", "true", "yes", "on"):
+    signup_aggregator = SignupAggregator(ANALYTICS_FLUSH_INTERVAL)
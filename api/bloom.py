@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+from sqlalchemy import select
+from db.models import Waitlist
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Bit positions come from one 128-bit BLAKE2b digest split into two 64-bit
+    halves and combined with double hashing, so each lookup hashes the item
+    once regardless of the number of hash functions.
+    """
+
+    def __init__(self, num_bits: int, num_hashes: int):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray((num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        for position in self._positions(item):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def false_positive_rate(self) -> float:
+        """Theoretical false-positive rate for the items added so far."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class EmailFilter:
+    """
+    Membership filter over waitlisted emails used to skip duplicate checks.
+
+    A negative answer is definite, so signups for new emails go straight to
+    the insert. A positive answer is only probable and is confirmed against
+    the database before returning a 409. Emails inserted by other workers
+    are not in this process's filter, which is safe because the insert is
+    conflict-checked anyway.
+
+    Off by default (WAITLIST_DUPLICATE_FILTER). A signup is already a single
+    ``INSERT ... ON CONFLICT DO NOTHING`` round trip, so the filter saves no
+    round trips: a hit swaps that insert for an indexed SELECT and a false
+    positive costs both. It only pays off when repeat submissions dominate
+    and conflicting inserts are expensive. Each worker loads it by streaming
+    every email once, started by its first signup rather than at boot.
+    """
+
+    def __init__(self, memory_bytes: int, capacity: int):
+        num_bits = memory_bytes * 8
+        num_hashes = max(1, min(16, round(num_bits / max(capacity, 1) * math.log(2))))
+        self.bloom = BloomFilter(num_bits, num_hashes)
+        self.ready = False
+        self.lookups = 0
+        self.probable_hits = 0
+        self.false_positives = 0
+        self._task = None
+
+    def start(self, session_factory):
+        """Start warming in the background, on the first call only."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.warm(session_factory))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def warm(self, session_factory, batch_size: int = 10000):
+        """
+        Load every existing waitlist email into the filter.
+
+        Emails are streamed from a server-side cursor so memory stays bounded
+        by the filter size, not the table size.
+
+        Args:
+            session_factory: Callable returning a new AsyncSession
+            batch_size: Rows fetched per round trip
+        """
+        try:
+            async with session_factory() as db:
+                stmt = select(Waitlist.email).execution_options(yield_per=batch_size)
+                async for email in await db.stream_scalars(stmt):
+                    self.bloom.add(email)
+        except Exception as e:
+            logger.error("Error warming duplicate filter: %s", e)
+            return
+
+        self.ready = True
+        logger.info("Duplicate filter warmed with %d emails", self.bloom.count)
+
+    def might_contain(self, email: str) -> bool:
+        """
+        Ask whether an email may already be waitlisted.
+
+        Only meaningful once ``ready`` is set; before the filter is warmed a
+        negative answer could miss existing emails.
+        """
+        self.lookups += 1
+        if email in self.bloom:
+            self.probable_hits += 1
+            return True
+        return False
+
+    def record_false_positive(self):
+        """Note that a probable hit turned out not to be in the database."""
+        self.false_positives += 1
+
+    def add(self, email: str):
+        self.bloom.add(email)
+
+    def stats(self) -> dict:
+        # Only lookups for emails that were really absent can be false positives
+        absent = self.lookups - self.probable_hits + self.false_positives
+        return {
+            "ready": self.ready,
+            "memory_bytes": len(self.bloom.bits),
+            "hash_functions": self.bloom.num_hashes,
+            "items": self.bloom.count,
+            "lookups": self.lookups,
+            "probable_hits": self.probable_hits,
+            "false_positives": self.false_positives,
+            "observed_false_positive_rate": (
+                round(self.false_positives / absent, 6) if absent else 0.0
+            ),
+            "estimated_false_positive_rate": round(self.bloom.false_positive_rate(), 6),
+        }
+
+
+# Memory budget for the filter
+WAITLIST_BLOOM_BYTES = int(os.getenv("WAITLIST_BLOOM_BYTES", str(1024 * 1024)))
+# Expected number of emails, used to pick the number of hash functions
+WAITLIST_BLOOM_CAPACITY = int(os.getenv("WAITLIST_BLOOM_CAPACITY", "1000000"))
+
+email_filter = None
+if os.getenv("WAITLIST_DUPLICATE_FILTER", "false").lower() in ("1", "true", "yes", "on") and WAITLIST_BLOOM_BYTES > 0:
+    email_filter = EmailFilter(WAITLIST_BLOOM_BYTES, WAITLIST_BLOOM_CAPACITY)
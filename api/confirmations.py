@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from urllib.parse import urlencode
+from db.queries import claim_due_confirmations, record_confirmation_results
+
+try:
+    import aiosmtplib
+except ImportError:  # Optional: confirmation emails are disabled without it
+    aiosmtplib = None
+
+logger = logging.getLogger(__name__)
+
+
+class SmtpMailer:
+    """
+    Pool of persistent SMTP connections.
+
+    At most ``pool_size`` messages are sent at once, each over its own
+    connection; connections are kept open between batches so a burst of
+    signups does not pay a TCP and TLS handshake per email. A reused
+    connection the server has since closed is replaced once before the
+    send counts as failed.
+    """
+
+    def __init__(self, host: str, port: int, username=None, password=None,
+                 security: str = "starttls", pool_size: int = 4, timeout: float = 10.0):
+        self.options = {
+            "hostname": host,
+            "port": port,
+            "username": username,
+            "password": password,
+            "use_tls": security == "tls",
+            "start_tls": security == "starttls",
+            "timeout": timeout,
+        }
+        self.pool_size = pool_size
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle = []
+
+    async def _connect(self):
+        client = aiosmtplib.SMTP(**self.options)
+        await client.connect()
+        return client
+
+    async def send(self, message: EmailMessage):
+        async with self._slots:
+            client = self._idle.pop() if self._idle else None
+            reused = client is not None
+            try:
+                if client is None:
+                    client = await self._connect()
+                try:
+                    await client.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    if not reused:
+                        raise
+                    client = await self._connect()
+                    await client.send_message(message)
+            except Exception:
+                if client is not None:
+                    client.close()
+                raise
+            self._idle.append(client)
+
+    async def close(self):
+        while self._idle:
+            client = self._idle.pop()
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+
+
+def build_confirmation_email(sender: str, recipient: str, link: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = recipient
+    message["Subject"] = "Confirm your spot on the Lavoo waitlist"
+    message.set_content(
+        "Thanks for joining the Lavoo waitlist!\n\n"
+        f"Please confirm your email address by opening this link:\n\n{link}\n\n"
+        "If you didn't sign up, you can ignore this email.\n",
+        # Plain ASCII; 7bit keeps the link unwrapped for clients that show raw text
+        cte="7bit",
+    )
+    return message
+
+
+class ConfirmationWorker:
+    """
+    Background sender for double opt-in confirmation emails.
+
+    Signups are stored with a token and a due time, so the request path
+    never waits on SMTP. This worker claims due rows in batches (see
+    db.queries.claim_due_confirmations), sends them concurrently through the
+    mailer and records the outcome in one round trip per batch. Failed sends
+    are retried with exponential backoff and jitter until max_attempts.
+
+    Signups made by this process wake the worker immediately; rows from
+    other workers are picked up by polling every ``interval`` seconds.
+    """
+
+    def __init__(self, session_factory, mailer: SmtpMailer, sender: str, confirm_url: str,
+                 batch_size: int = 100, interval: float = 5.0, max_attempts: int = 5,
+                 retry_base: float = 30.0, lease: float = 300.0):
+        self.session_factory = session_factory
+        self.mailer = mailer
+        self.sender = sender
+        self.confirm_url = confirm_url
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.lease = lease
+        self.sent = 0
+        self.failed = 0
+        self.abandoned = 0
+        self.batches = 0
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = None
+
+    def start(self):
+        """Start the background sender task on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Finish the batch in progress, then close SMTP connections."""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                # Cancelled; its claimed rows are retried once their lease expires
+                pass
+            self._task = None
+        await self.mailer.close()
+
+    def notify(self):
+        """Signal that a new confirmation is due."""
+        self._wake.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                claimed = await self._process_batch()
+            except Exception as e:
+                logger.error("Error sending confirmation batch: %s", e)
+                claimed = 0
+            if claimed < self.batch_size and not self._stopping:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _link(self, token: str) -> str:
+        return f"{self.confirm_url}?{urlencode({'token': token})}"
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = self.retry_base * 2 ** (attempts - 1)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _process_batch(self) -> int:
+        async with self.session_factory() as db:
+            rows = await claim_due_confirmations(db, self.batch_size, self.lease)
+        if not rows:
+            return 0
+
+        results = await asyncio.gather(
+            *(self.mailer.send(build_confirmation_email(self.sender, row.email, self._link(row.confirmation_token)))
+              for row in rows),
+            return_exceptions=True,
+        )
+
+        sent_ids, retries = [], []
+        now = datetime.utcnow()
+        for row, result in zip(rows, results):
+            if not isinstance(result, Exception):
+                sent_ids.append(row.id)
+                continue
+            attempts = row.confirmation_attempts + 1
+            if attempts >= self.max_attempts:
+                logger.warning("Giving up on confirmation email for %s: %s", row.email, result)
+                retries.append((row.id, attempts, None))
+                self.abandoned += 1
+            else:
+                logger.info("Confirmation email for %s failed (attempt %d): %s", row.email, attempts, result)
+                retries.append((row.id, attempts, now + timedelta(seconds=self._retry_delay(attempts))))
+            self.failed += 1
+
+        async with self.session_factory() as db:
+            await record_confirmation_results(db, sent_ids, retries)
+
+        self.sent += len(sent_ids)
+        self.batches += 1
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "abandoned": self.abandoned,
+            "batches": self.batches,
+            "smtp_pool_size": self.mailer.pool_size,
+            "idle_connections": len(self.mailer._idle),
+        }
+
+
+def create_confirmation_worker(session_factory):
+    """
+    Build the confirmation worker from the environment.
+
+    Double opt-in is enabled by setting SMTP_HOST; without it (or without
+    the aiosmtplib package) signups are not sent confirmation emails.
+    """
+    host = os.getenv("SMTP_HOST")
+    if not host:
+        return None
+    if aiosmtplib is None:
+        logger.error("SMTP_HOST is set but aiosmtplib is not installed; confirmation emails are disabled")
+        return None
+
+    mailer = SmtpMailer(
+        host,
+        int(os.getenv("SMTP_PORT", "587")),
+        username=os.getenv("SMTP_USERNAME") or None,
+        password=os.getenv("SMTP_PASSWORD") or None,
+        security=os.getenv("SMTP_SECURITY", "starttls").lower(),
+        pool_size=int(os.getenv("SMTP_POOL_SIZE", "4")),
+        timeout=float(os.getenv("SMTP_TIMEOUT", "10")),
+    )
+    return ConfirmationWorker(
+        session_factory,
+        mailer,
+        sender=os.getenv("CONFIRMATION_FROM", "Lavoo <noreply@localhost>"),
+        confirm_url=os.getenv("CONFIRMATION_URL", "http://localhost:8000/api/waitlist/confirm"),
+        batch_size=int(os.getenv("CONFIRMATION_BATCH_SIZE", "100")),
+        interval=float(os.getenv("CONFIRMATION_POLL_INTERVAL", "5")),
+        max_attempts=int(os.getenv("CONFIRMATION_MAX_ATTEMPTS", "5")),
+        retry_base=float(os.getenv("CONFIRMATION_RETRY_BASE", "30")),
+    )
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.queries import count_waitlist
+
+
+class WaitlistCounter:
+    """
+    Cached waitlist count.
+
+    The count is loaded with a single COUNT query at most once per TTL and
+    bumped in-process on every successful signup in between, so the public
+    counter endpoint is served from memory. Other workers' signups show up
+    once the TTL expires and the count is reloaded.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._count = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._count is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    async def get(self, db: AsyncSession) -> int:
+        """
+        Return the cached count, reloading it from the database when stale.
+
+        Concurrent callers share a single reload instead of each running COUNT.
+
+        Args:
+            db: Async database session used only on a cache miss
+
+        Returns:
+            Total number of waitlist entries
+        """
+        if self._is_fresh():
+            return self._count
+
+        async with self._lock:
+            if not self._is_fresh():
+                self._count = await count_waitlist(db)
+                self._loaded_at = time.monotonic()
+            return self._count
+
+    def increment(self, amount: int = 1):
+        """Account for signups committed by this process."""
+        if self._count is not None:
+            self._count += amount
+
+    def invalidate(self):
+        """Force the next read to reload the count from the database."""
+        self._count = None
+
+
+# Seconds a loaded count is trusted before running COUNT again
+WAITLIST_COUNT_TTL = float(os.getenv("WAITLIST_COUNT_TTL", "5"))
+
+waitlist_counter = WaitlistCounter(ttl=WAITLIST_COUNT_TTL)
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Rough per-entry cost of the dict slot, tuple and small objects on top of
+# the key and serialized response
+ENTRY_OVERHEAD = 200
+
+
+class IdempotencyConflict(ValueError):
+    """Raised when an Idempotency-Key is reused for a different request."""
+
+
+class IdempotencyCache:
+    """
+    Responses to completed signups keyed by the client's Idempotency-Key.
+
+    Entries expire after ttl seconds and the least recently used ones are
+    evicted once the estimated size passes max_bytes. A key whose first
+    request is still running is held as in-flight, so a retry arriving
+    meanwhile waits for that outcome instead of inserting again. Only
+    successful responses are stored; if the first request fails, a waiting
+    retry runs the signup itself.
+
+    The cache is per process. Retries routed to another worker miss it and
+    take the normal path.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, fingerprint, status_code, payload, size)
+        self.bytes = 0
+        self._in_flight = {}  # key -> (fingerprint, future)
+        self.hits = 0
+        self.misses = 0
+        self.conflicts = 0
+        self.evictions = 0
+
+    def _lookup(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key)
+        self.bytes -= entry[4]
+
+    def _conflict(self):
+        self.conflicts += 1
+        raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+
+    async def claim(self, key: str, fingerprint: str) -> Optional[tuple]:
+        """
+        Look up a key before running the request it identifies.
+
+        Args:
+            key: Client-supplied Idempotency-Key
+            fingerprint: Identifies the request body, e.g. the normalized email
+
+        Returns:
+            (status_code, payload) of the original response, or None if the
+            caller now owns the key and must finish with complete() or release()
+
+        Raises:
+            IdempotencyConflict: If the key was used with a different fingerprint
+        """
+        while True:
+            entry = self._lookup(key)
+            if entry is not None:
+                if entry[1] != fingerprint:
+                    self._conflict()
+                self.hits += 1
+                return entry[2], entry[3]
+
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                self.misses += 1
+                self._in_flight[key] = (fingerprint, asyncio.get_running_loop().create_future())
+                return None
+            if in_flight[0] != fingerprint:
+                self._conflict()
+            # Shielded so a cancelled retry does not cancel the shared future
+            await asyncio.shield(in_flight[1])
+
+    def complete(self, key: str, payload: dict, status_code: int = 200):
+        """Store the response for a claimed key and wake any waiting retries."""
+        fingerprint, future = self._in_flight.pop(key)
+        size = len(key) + len(fingerprint) + len(json.dumps(payload, default=str)) + ENTRY_OVERHEAD
+        if size <= self.max_bytes:
+            self.entries[key] = (time.monotonic() + self.ttl, fingerprint, status_code, payload, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+        future.set_result(None)
+
+    def release(self, key: str):
+        """Give up a claimed key without storing a response; no-op once completed."""
+        in_flight = self._in_flight.pop(key, None)
+        if in_flight is not None:
+            in_flight[1].set_result(None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "conflicts": self.conflicts,
+            "evictions": self.evictions,
+        }
+
+
+# Longest Idempotency-Key accepted; clients typically send a UUID
+MAX_KEY_LENGTH = 255
+
+# Memory budget for stored responses; 0 disables Idempotency-Key support
+IDEMPOTENCY_CACHE_BYTES = int(os.getenv("IDEMPOTENCY_CACHE_BYTES", str(4 * 1024 * 1024)))
+# Seconds a stored response is replayed for
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+
+idempotency_cache = None
+if IDEMPOTENCY_CACHE_BYTES > 0:
+    idempotency_cache = IdempotencyCache(IDEMPOTENCY_CACHE_BYTES, IDEMPOTENCY_TTL)
@@ -0,0 +1,79 @@
+import base64
+import csv
+import io
+from datetime import datetime
+from api.payloads import dumps
+from db.replica import new_read_session
+from db.queries import waitlist_listing_query
+
+# Rows fetched per round trip when streaming from a server-side cursor
+STREAM_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Leading characters spreadsheets evaluate as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@")
+
+
+def encode_cursor(created_at: datetime, entry_id: int) -> str:
+    """Encode a (created_at, id) position as an opaque URL-safe cursor."""
+    raw = f"{created_at.isoformat()}|{entry_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, entry_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(entry_id)
+    except (UnicodeDecodeError, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def csv_cell(value: str) -> str:
+    """Quote a text cell with ``'`` if a spreadsheet would run it as a formula."""
+    if value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def serialize_row(row) -> dict:
+    return {"id": row.id, "email": row.email, "created_at": row.created_at.isoformat()}
+
+
+async def stream_rows(fmt: str, after=None):
+    """
+    Yield the waitlist as NDJSON or CSV chunks from a server-side cursor.
+
+    The generator opens its own session because it outlives the request
+    handler that created the response; it reads from the replica when one
+    is healthy.
+
+    Args:
+        fmt: "ndjson" or "csv"
+        after: Optional ``(created_at, id)`` to resume after
+    """
+    if fmt == "csv":
+        yield "id,email,created_at\r\n"
+
+    async with new_read_session() as db:
+        stmt = waitlist_listing_query(after).execution_options(yield_per=STREAM_BATCH_SIZE)
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in partition:
+                    writer.writerow([row.id, csv_cell(row.email), row.created_at.isoformat()])
+                yield buffer.getvalue()
+            else:
+                yield b"".join(dumps(serialize_row(row)) + b"\n" for row in partition)
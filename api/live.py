@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+from api.counter import waitlist_counter
+from api.payloads import dumps
+
+logger = logging.getLogger(__name__)
+
+# SSE comment line sent to idle streams so proxies keep them open
+HEARTBEAT = b": keepalive\n\n"
+
+
+def count_event(count: int) -> bytes:
+    """Encode a count as one SSE message."""
+    return b"event: count\ndata: " + dumps({"count": count}) + b"\n\n"
+
+
+class CountBroadcaster:
+    """
+    Pushes waitlist count changes to every open SSE stream.
+
+    A single task publishes for all clients: signups from this process wake
+    it through notify(), and it sends at most one update per
+    ``min_interval`` seconds however many signups arrive in between. The
+    count comes from the shared WaitlistCounter, so viewers cost no queries
+    of their own; while anyone is connected the counter is reloaded once its
+    TTL expires, which is how other workers' signups reach this process.
+
+    Each client has a queue of at most ``buffer`` messages. A client that
+    falls behind loses its oldest messages rather than growing its queue;
+    only the latest count matters.
+
+    Streams are ended by stop() from the lifespan shutdown. Uvicorn runs it
+    only after open responses finish or GRACEFUL_SHUTDOWN_TIMEOUT expires
+    (see main.py), so a stopping worker holds its streams up to that long;
+    EventSource clients then reconnect to another worker.
+    """
+
+    def __init__(self, min_interval: float, heartbeat: float, buffer: int, max_clients: int):
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self.buffer = buffer
+        self.max_clients = max_clients
+        self.count = None
+        self.published = 0
+        self.dropped = 0
+        self._clients = set()
+        self._changed = asyncio.Event()
+        self._task = None
+
+    def notify(self):
+        """Signal that the count may have changed."""
+        self._changed.set()
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Register a client and queue the current count for it.
+
+        Raises:
+            OverflowError: If max_clients streams are already open
+        """
+        if len(self._clients) >= self.max_clients:
+            raise OverflowError("Too many live count streams")
+        queue = asyncio.Queue(maxsize=self.buffer)
+        if self.count is not None:
+            queue.put_nowait(count_event(self.count))
+        self._clients.add(queue)
+        # Refresh a count that may have gone stale while nobody was watching
+        self._changed.set()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._clients.discard(queue)
+
+    def close(self):
+        """End every open stream."""
+        for queue in self._clients:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def _publish(self, message: bytes):
+        for queue in self._clients:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message)
+
+    async def _run(self, session_factory):
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), self.heartbeat)
+            except asyncio.TimeoutError:
+                # Also picks up other workers' signups once the counter's TTL expires
+                pass
+            self._changed.clear()
+            if not self._clients:
+                continue
+
+            try:
+                # Opens a connection only when the cached count is stale
+                async with session_factory() as db:
+                    count = await waitlist_counter.get(db)
+            except Exception as e:
+                logger.error("Error refreshing live waitlist count: %s", e)
+                count = self.count
+
+            if count is not None and count != self.count:
+                self.count = count
+                self._publish(count_event(count))
+                self.published += 1
+                await asyncio.sleep(self.min_interval)
+            else:
+                self._publish(HEARTBEAT)
+
+    def start(self, session_factory):
+        """Start the publishing task on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self):
+        """Stop publishing and end any streams still open."""
+        self.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def stream(self, queue: asyncio.Queue):
+        """SSE body for one client, unsubscribing it when the client goes away."""
+        try:
+            # Reconnect after 5s if the connection drops
+            yield b"retry: 5000\n\n"
+            while True:
+                message = await queue.get()
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(queue)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._clients),
+            "count": self.count,
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+# Shortest gap between two count updates, in seconds
+LIVE_COUNT_MIN_INTERVAL = float(os.getenv("LIVE_COUNT_MIN_INTERVAL", "0.5"))
+# Seconds between keepalives, and between count refreshes while nothing changes here
+LIVE_COUNT_HEARTBEAT = float(os.getenv("LIVE_COUNT_HEARTBEAT", "15"))
+# Messages buffered per client before the oldest are dropped
+LIVE_COUNT_BUFFER = int(os.getenv("LIVE_COUNT_BUFFER", "4"))
+# Open streams allowed per worker process
+LIVE_COUNT_MAX_CLIENTS = int(os.getenv("LIVE_COUNT_MAX_CLIENTS", "10000"))
+
+count_broadcaster = None
+if os.getenv("WAITLIST_LIVE_COUNT", "true").lower() in ("1", "true", "yes", "on"):
+    count_broadcaster = CountBroadcaster(
+        LIVE_COUNT_MIN_INTERVAL, LIVE_COUNT_HEARTBEAT, LIVE_COUNT_BUFFER, LIVE_COUNT_MAX_CLIENTS
+    )
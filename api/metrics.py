@@ -0,0 +1,198 @@
+import bisect
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from db.pool import pool_stats
+
+# Latency buckets in seconds, tuned for sub-millisecond to multi-second requests
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50)
+
+# Fraction of requests whose database queries are traced
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "0.1"))
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list:
+        lines = []
+        cumulative = 0
+        sep = "," if labels else ""
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class QueryTrace:
+    """Per-request database query counter, present only on sampled requests."""
+
+    __slots__ = ("queries", "duration")
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+
+_current_trace: ContextVar = ContextVar("query_trace", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    Request and database metrics rendered in Prometheus text format.
+
+    Route latency and status counts are recorded for every request. Query
+    counts and durations come from SQLAlchemy cursor events and are only
+    collected for a sampled fraction of requests, so unsampled requests pay
+    a single context-variable lookup per query.
+    """
+
+    def __init__(self, sample_rate: float):
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self.latency = {}
+        self.statuses = {}
+        self.queries_per_request = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_duration = Histogram(LATENCY_BUCKETS)
+        self.db_time_per_request = Histogram(LATENCY_BUCKETS)
+
+    def instrument_engine(self, engine):
+        """
+        Attach query timing listeners to a synchronous Engine.
+
+        Passing the Engine class instruments every engine, including ones
+        created lazily after this call.
+        """
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if _current_trace.get() is not None:
+                context._metrics_started = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            trace = _current_trace.get()
+            started = getattr(context, "_metrics_started", None)
+            if trace is None or started is None:
+                return
+            elapsed = time.perf_counter() - started
+            trace.queries += 1
+            trace.duration += elapsed
+            with self._lock:
+                self.query_duration.observe(elapsed)
+
+    def start_request(self):
+        """
+        Decide whether to trace this request's queries.
+
+        Returns:
+            Context token to pass to finish_request
+        """
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return _current_trace.set(QueryTrace())
+        return None
+
+    def finish_request(self, token, method: str, route: str, status: int, elapsed: float):
+        trace = None
+        if token is not None:
+            trace = _current_trace.get()
+            _current_trace.reset(token)
+
+        key = (method, route)
+        with self._lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(elapsed)
+            status_key = (method, route, status)
+            self.statuses[status_key] = self.statuses.get(status_key, 0) + 1
+            if trace is not None:
+                self.queries_per_request.observe(trace.queries)
+                self.db_time_per_request.observe(trace.duration)
+
+    def render(self, pool) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Args:
+            pool: Connection pool whose occupancy and wait times are reported
+        """
+        lines = []
+        with self._lock:
+            lines.append("# HELP waitlist_http_request_duration_seconds Request latency by route")
+            lines.append("# TYPE waitlist_http_request_duration_seconds histogram")
+            for (method, route), histogram in sorted(self.latency.items()):
+                labels = f'method="{method}",route="{_escape(route)}"'
+                lines.extend(histogram.render("waitlist_http_request_duration_seconds", labels))
+
+            lines.append("# HELP waitlist_http_requests_total Responses by route and status")
+            lines.append("# TYPE waitlist_http_requests_total counter")
+            for (method, route, status), count in sorted(self.statuses.items()):
+                labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+                lines.append(f"waitlist_http_requests_total{{{labels}}} {count}")
+
+            lines.append("# HELP waitlist_db_queries_per_request Queries issued by sampled requests")
+            lines.append("# TYPE waitlist_db_queries_per_request histogram")
+            lines.extend(self.queries_per_request.render("waitlist_db_queries_per_request", ""))
+
+            lines.append("# HELP waitlist_db_time_per_request_seconds Query time of sampled requests")
+            lines.append("# TYPE waitlist_db_time_per_request_seconds histogram")
+            lines.extend(self.db_time_per_request.render("waitlist_db_time_per_request_seconds", ""))
+
+            lines.append("# HELP waitlist_db_query_duration_seconds Duration of sampled queries")
+            lines.append("# TYPE waitlist_db_query_duration_seconds histogram")
+            lines.extend(self.query_duration.render("waitlist_db_query_duration_seconds", ""))
+
+        stats = pool_stats.snapshot(pool)
+        lines.append("# HELP waitlist_db_pool_checkouts_total Connections checked out of the pool")
+        lines.append("# TYPE waitlist_db_pool_checkouts_total counter")
+        lines.append(f"waitlist_db_pool_checkouts_total {stats['checkouts']}")
+        lines.append("# HELP waitlist_db_pool_timeouts_total Checkouts that timed out")
+        lines.append("# TYPE waitlist_db_pool_timeouts_total counter")
+        lines.append(f"waitlist_db_pool_timeouts_total {stats['timeouts']}")
+        lines.append("# HELP waitlist_db_pool_wait_seconds_total Time spent waiting for connections")
+        lines.append("# TYPE waitlist_db_pool_wait_seconds_total counter")
+        lines.append(f"waitlist_db_pool_wait_seconds_total {pool_stats.total_wait}")
+        lines.append("# HELP waitlist_db_pool_wait_seconds_max Longest connection wait")
+        lines.append("# TYPE waitlist_db_pool_wait_seconds_max gauge")
+        lines.append(f"waitlist_db_pool_wait_seconds_max {stats['max_wait_ms'] / 1000}")
+        lines.append("# HELP waitlist_db_pool_connects_total Connections opened, including reconnects")
+        lines.append("# TYPE waitlist_db_pool_connects_total counter")
+        lines.append(f"waitlist_db_pool_connects_total {stats['connects']}")
+        lines.append("# HELP waitlist_db_pool_connect_seconds_total Time spent opening connections")
+        lines.append("# TYPE waitlist_db_pool_connect_seconds_total counter")
+        lines.append(f"waitlist_db_pool_connect_seconds_total {pool_stats.total_connect}")
+        for key in ("size", "checked_out", "overflow"):
+            if key in stats:
+                lines.append(f"# TYPE waitlist_db_pool_{key} gauge")
+                lines.append(f"waitlist_db_pool_{key} {stats[key]}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry(sample_rate=METRICS_SAMPLE_RATE)
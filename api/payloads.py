@@ -0,0 +1,113 @@
+import json
+from urllib.parse import parse_qsl
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library json module is used without it
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    """Serialize to compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(body: bytes):
+    """Parse JSON, raising ValueError on malformed input."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson when it is installed.
+
+    Used as the app's default response class. Hot endpoints construct it
+    directly so their plain dict results skip FastAPI's jsonable_encoder pass.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# Request body documented for POST /api/waitlist, which parses it by hand
+SIGNUP_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            media_type: {
+                "schema": {
+                    "type": "object",
+                    "required": ["email"],
+                    "properties": {
+                        "email": {"type": "string"},
+                        "ref": {"type": "string", "description": "Referral code"},
+                    },
+                }
+            }
+            for media_type in ("application/json", "application/x-www-form-urlencoded", "multipart/form-data")
+        },
+    }
+}
+
+
+async def read_signup_fields(request: Request) -> dict:
+    """
+    Read the signup fields from a JSON, URL-encoded or multipart body.
+
+    JSON and URL-encoded bodies are parsed directly from the raw bytes;
+    only multipart bodies go through python-multipart.
+
+    Args:
+        request: Incoming request
+
+    Returns:
+        Dictionary of the submitted fields
+
+    Raises:
+        HTTPException: 400 if the body cannot be parsed
+    """
+    content_type = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+
+    if content_type == "application/json":
+        try:
+            fields = loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Malformed JSON body")
+        if not isinstance(fields, dict):
+            raise HTTPException(status_code=400, detail="JSON body must be an object")
+        return fields
+
+    if content_type == "application/x-www-form-urlencoded":
+        body = (await request.body()).decode("utf-8", errors="replace")
+        return dict(parse_qsl(body, keep_blank_values=True))
+
+    form = await request.form()
+    return {key: value for key, value in form.items() if isinstance(value, str)}
+
+
+def required_string(fields: dict, name: str) -> str:
+    """
+    Return a required string field from a body read by read_signup_fields.
+
+    Fails the way a ``Form(...)`` parameter does, so clients keep getting
+    FastAPI's 422 response with a ``detail`` list of validation errors.
+    Empty values count as missing, as they do for form fields.
+
+    Raises:
+        RequestValidationError: If the field is missing, empty or not a string
+    """
+    value = fields.get(name)
+    if value is None or value == "":
+        error = {"type": "missing", "loc": ("body", name), "msg": "Field required", "input": None}
+    elif not isinstance(value, str):
+        error = {"type": "string_type", "loc": ("body", name), "msg": "Input should be a valid string", "input": value}
+    else:
+        return value
+    raise RequestValidationError([error])
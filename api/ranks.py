@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from array import array
+from bisect import bisect_left, insort
+from sqlalchemy import select
+from db.models import Waitlist
+
+logger = logging.getLogger(__name__)
+
+
+def public_handle(referral_code: str) -> str:
+    """
+    Stable public name for a signup on the leaderboard, e.g. ``#3f9a21c0``.
+
+    Derived from the referral code by a one-way hash, so the board reveals
+    neither emails nor codes that could be used to look up positions. The
+    position endpoint returns the same handle so users can find themselves.
+    """
+    return "#" + hashlib.sha256(referral_code.encode()).hexdigest()[:8]
+
+
+class RankIndex:
+    """
+    In-process queue positions and referral counts.
+
+    Position orders signups by number of referrals (most first), then by
+    signup order. All ids are kept in a sorted ``array('q')`` (8 bytes per
+    signup) and the minority with at least one referral are grouped into
+    sorted lists per referral count, so a position is a handful of bisects
+    instead of an ORDER BY or COUNT over the table.
+
+    The index is loaded on first use (see start) from ``(id, referred_by_id)``
+    rather than at boot, so workers that never serve a position or the
+    leaderboard never read the table. It is then kept up to
+    date incrementally: signups made by this process are added directly and
+    a periodic refresh reads only rows above the highest id seen, minus a
+    small overlap that catches transactions committing out of id order.
+    Referral counts are derived from referred_by_id, so they never drift
+    from the rows. Every worker process holds its own index, so positions
+    are per worker and eventually consistent with the table.
+    """
+
+    def __init__(self, refresh_interval: float, overlap: int = 1000):
+        self.refresh_interval = refresh_interval
+        self.overlap = overlap
+        self.ids = array("q")
+        self.referrals = {}  # id -> referral count, only for ids with referrals
+        self.levels = {}  # referral count -> sorted ids with that count
+        self.ready = False
+        self.refreshes = 0
+        self._leaderboard = None
+        self._leaderboard_at = 0.0
+        self._task = None
+
+    def _contains(self, signup_id: int) -> bool:
+        i = bisect_left(self.ids, signup_id)
+        return i < len(self.ids) and self.ids[i] == signup_id
+
+    def _credit(self, referrer_id: int):
+        count = self.referrals.get(referrer_id, 0)
+        if count:
+            level = self.levels[count]
+            del level[bisect_left(level, referrer_id)]
+            if not level:
+                del self.levels[count]
+        self.referrals[referrer_id] = count + 1
+        insort(self.levels.setdefault(count + 1, []), referrer_id)
+
+    def _insert(self, signup_id: int, referrer_id=None):
+        if self._contains(signup_id):
+            return
+        if not self.ids or signup_id > self.ids[-1]:
+            self.ids.append(signup_id)
+        else:
+            # Another worker's row committed after a higher id was seen
+            self.ids.insert(bisect_left(self.ids, signup_id), signup_id)
+        if referrer_id is not None:
+            self._credit(referrer_id)
+
+    def add(self, signup_id: int, referrer_id=None):
+        """Record a signup committed by this process."""
+        if self.ready:
+            self._insert(signup_id, referrer_id)
+
+    async def _read(self, session_factory, after: int, batch_size: int = 10000):
+        async with session_factory() as db:
+            stmt = (
+                select(Waitlist.id, Waitlist.referred_by_id)
+                .where(Waitlist.id > after)
+                .order_by(Waitlist.id)
+                .execution_options(yield_per=batch_size)
+            )
+            async for signup_id, referrer_id in await db.stream(stmt):
+                self._insert(signup_id, referrer_id)
+
+    def start(self, session_factory):
+        """Start loading and refreshing in the background, on the first call only."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(session_factory))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def run(self, session_factory):
+        """
+        Load the index, then refresh it every refresh_interval seconds until cancelled.
+
+        Args:
+            session_factory: Callable returning a new AsyncSession
+        """
+        while not self.ready:
+            try:
+                started = time.perf_counter()
+                await self._read(session_factory, 0)
+                self.ready = True
+                logger.info(
+                    "Rank index loaded with %d signups in %.0f ms",
+                    len(self.ids), (time.perf_counter() - started) * 1000
+                )
+            except Exception as e:
+                logger.error("Error loading rank index: %s", e)
+                await asyncio.sleep(self.refresh_interval)
+
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self._read(session_factory, (self.ids[-1] if self.ids else 0) - self.overlap)
+                self.refreshes += 1
+            except Exception as e:
+                logger.error("Error refreshing rank index: %s", e)
+
+    def position(self, signup_id: int):
+        """
+        1-based queue position of a signup, or None if it is not indexed yet.
+
+        Counts the signups with more referrals, then those with as many
+        referrals and a lower id.
+        """
+        if not self._contains(signup_id):
+            return None
+        count = self.referrals.get(signup_id, 0)
+        ahead = sum(len(level) for referrals, level in self.levels.items() if referrals > count)
+        if count:
+            ahead += bisect_left(self.levels[count], signup_id)
+        else:
+            # Earlier signups, less those that moved up by referring someone
+            ahead += bisect_left(self.ids, signup_id)
+            ahead -= sum(bisect_left(level, signup_id) for level in self.levels.values())
+        return ahead + 1
+
+    def referral_count(self, signup_id: int) -> int:
+        return self.referrals.get(signup_id, 0)
+
+    def top(self, limit: int) -> list:
+        """``(id, referral count)`` of the top referrers, best first."""
+        leaders = []
+        for count in sorted(self.levels, reverse=True):
+            for signup_id in self.levels[count]:
+                leaders.append((signup_id, count))
+                if len(leaders) == limit:
+                    return leaders
+        return leaders
+
+    async def leaderboard(self, db, limit: int, ttl: float) -> list:
+        """
+        Top referrers by public handle, rebuilt at most once per ttl.
+
+        Args:
+            db: Async database session used to look up the leaders' referral codes
+            limit: Number of entries; the cached board holds LEADERBOARD_MAX
+            ttl: Seconds a built board is reused
+
+        Returns:
+            List of ``{"rank", "handle", "referrals"}`` dictionaries
+        """
+        if self._leaderboard is None or time.monotonic() - self._leaderboard_at >= ttl:
+            leaders = self.top(LEADERBOARD_MAX)
+            codes = {}
+            if leaders:
+                rows = await db.execute(
+                    select(Waitlist.id, Waitlist.referral_code).where(Waitlist.id.in_([i for i, _ in leaders]))
+                )
+                codes = dict(rows.all())
+            self._leaderboard = [
+                {"rank": rank, "handle": public_handle(codes.get(signup_id) or ""), "referrals": count}
+                for rank, (signup_id, count) in enumerate(leaders, start=1)
+            ]
+            self._leaderboard_at = time.monotonic()
+        return self._leaderboard[:limit]
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "signups": len(self.ids),
+            "referrers": len(self.referrals),
+            "referral_levels": len(self.levels),
+            "memory_bytes": self.ids.itemsize * len(self.ids),
+            "refreshes": self.refreshes,
+        }
+
+
+# Seconds between incremental refreshes picking up other workers' signups
+RANK_REFRESH_INTERVAL = float(os.getenv("RANK_REFRESH_INTERVAL", "2"))
+# Seconds the public leaderboard is cached
+LEADERBOARD_TTL = float(os.getenv("LEADERBOARD_TTL", "10"))
+# Largest leaderboard a client may request
+LEADERBOARD_MAX = 100
+
+rank_index = None
+if os.getenv("WAITLIST_RANKS", "true").lower() in ("1", "true", "yes", "on"):
+    rank_index = RankIndex(RANK_REFRESH_INTERVAL)
@@ -0,0 +1,163 @@
+import importlib
+import math
+import os
+import time
+from fastapi import HTTPException, Request
+
+
+class InMemoryBackend:
+    """
+    Token buckets held in a dict of ``key -> (tokens, updated_at)`` tuples.
+
+    Idle buckets refill to full within ``burst / rate`` seconds, at which
+    point they carry no information, so a periodic sweep drops every bucket
+    untouched for longer than that. Memory is bounded by the number of keys
+    active within that window.
+    """
+
+    def __init__(self, sweep_interval: float = 60.0):
+        self.buckets = {}
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+        self._max_idle = 0.0
+
+    async def acquire(self, key: str, rate: float, burst: float) -> float:
+        """
+        Take one token from the bucket for key.
+
+        Args:
+            key: Bucket identifier
+            rate: Tokens added per second
+            burst: Bucket capacity
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic()
+        self._max_idle = max(self._max_idle, burst / rate)
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        tokens, updated = self.buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self.buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+        self.buckets[key] = (tokens - 1, now)
+        return 0.0
+
+    def _sweep(self, now: float):
+        cutoff = now - self._max_idle
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if bucket[1] >= cutoff}
+        self._next_sweep = now + self.sweep_interval
+
+
+def load_backend(spec: str):
+    """
+    Build the rate limit backend named by RATE_LIMIT_BACKEND.
+
+    "memory" selects the per-process InMemoryBackend. Anything else is a
+    ``module:factory`` path to a callable returning an object with the same
+    async ``acquire(key, rate, burst)`` method, e.g. one backed by Redis so
+    limits are shared across workers and replicas.
+    """
+    if spec == "memory":
+        return InMemoryBackend()
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+class RateLimiter:
+    """
+    Signup rate limits per client IP, per email domain and for the whole process.
+
+    A rate of 0 disables that limit.
+    """
+
+    def __init__(self, backend, ip_rate, ip_burst, global_rate, global_burst,
+                 domain_rate, domain_burst, proxy_hops: int = 0):
+        self.backend = backend
+        self.ip_rate, self.ip_burst = ip_rate, ip_burst
+        self.global_rate, self.global_burst = global_rate, global_burst
+        self.domain_rate, self.domain_burst = domain_rate, domain_burst
+        self.proxy_hops = proxy_hops
+        self.rejected = 0
+
+    def client_ip(self, request: Request) -> str:
+        """
+        Resolve the client address, honouring X-Forwarded-For only for the
+        configured number of trusted proxy hops in front of the app.
+        """
+        if self.proxy_hops:
+            forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",")]
+            forwarded = [part for part in forwarded if part]
+            if len(forwarded) >= self.proxy_hops:
+                return forwarded[-self.proxy_hops]
+        return request.client.host if request.client else "unknown"
+
+    def _reject(self, retry_after: float):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=429,
+            detail="Too many signup attempts, please try again later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    async def check_request(self, request: Request):
+        """Apply the per-IP and global limits, raising 429 when exceeded."""
+        if self.ip_rate:
+            retry_after = await self.backend.acquire(
+                f"ip:{self.client_ip(request)}", self.ip_rate, self.ip_burst
+            )
+            if retry_after:
+                self._reject(retry_after)
+        if self.global_rate:
+            retry_after = await self.backend.acquire("global", self.global_rate, self.global_burst)
+            if retry_after:
+                self._reject(retry_after)
+
+    async def check_domain(self, email: str):
+        """Apply the per-domain limit to a normalized email, raising 429 when exceeded."""
+        if self.domain_rate:
+            domain = email.rpartition("@")[2]
+            retry_after = await self.backend.acquire(f"domain:{domain}", self.domain_rate, self.domain_burst)
+            if retry_after:
+                self._reject(retry_after)
+
+    def stats(self) -> dict:
+        stats = {"rejected": self.rejected}
+        if isinstance(self.backend, InMemoryBackend):
+            stats["tracked_keys"] = len(self.backend.buckets)
+        return stats
+
+
+# Proxies between the client and the app that append to X-Forwarded-For
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+# Behind a proxy that is not trusted every visitor shares the proxy's address,
+# so the per-IP limit is off unless the hops are configured or a rate is set
+DEFAULT_IP_RATE = "0.2" if TRUSTED_PROXY_HOPS else "0"
+
+signup_limiter = None
+if os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes", "on"):
+    signup_limiter = RateLimiter(
+        load_backend(os.getenv("RATE_LIMIT_BACKEND", "memory")),
+        ip_rate=float(os.getenv("RATE_LIMIT_IP_PER_SECOND", DEFAULT_IP_RATE)),
+        ip_burst=float(os.getenv("RATE_LIMIT_IP_BURST", "10")),
+        global_rate=float(os.getenv("RATE_LIMIT_GLOBAL_PER_SECOND", "500")),
+        global_burst=float(os.getenv("RATE_LIMIT_GLOBAL_BURST", "1000")),
+        domain_rate=float(os.getenv("RATE_LIMIT_DOMAIN_PER_SECOND", "0")),
+        domain_burst=float(os.getenv("RATE_LIMIT_DOMAIN_BURST", "50")),
+        proxy_hops=TRUSTED_PROXY_HOPS,
+    )
+
+
+async def enforce_signup_rate_limit(request: Request):
+    """
+    Dependency rejecting signups over the per-IP or global limit.
+
+    Runs as a route dependency so floods are turned away before a database
+    session is opened.
+    """
+    if signup_limiter:
+        await signup_limiter.check_request(request)
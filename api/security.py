@@ -0,0 +1,30 @@
+import os
+import secrets
+from typing import Optional
+from fastapi import Header, HTTPException
+
+
+def require_admin(
+    x_admin_token: Optional[str] = Header(None),
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Dependency guarding internal and admin endpoints.
+
+    The token is read from ADMIN_TOKEN and may be sent either as an
+    ``X-Admin-Token`` header or as ``Authorization: Bearer <token>``. When
+    ADMIN_TOKEN is not set the protected endpoints are disabled entirely.
+
+    Raises:
+        HTTPException: 404 if admin access is disabled, 401 if the token is wrong
+    """
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    token = x_admin_token
+    if token is None and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+
+    if not token or not secrets.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from typing import Optional
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are built without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Vite fingerprints everything under assets/, so those URLs never change content
+IMMUTABLE_PREFIX = "assets/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Files larger than this are streamed from disk instead of held in memory
+MAX_MEMORY_FILE_BYTES = 4 * 1024 * 1024
+# Compressing tiny files costs more in headers than it saves
+MIN_COMPRESS_BYTES = 1024
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches etag.
+
+    The header is ``*`` (any current representation) or a comma-separated
+    list of entity tags, compared weakly as RFC 9110 requires for
+    If-None-Match: ``W/"1"`` and ``"1"`` match each other.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+class StaticAsset:
+    """A file from the build output with its headers and encoded variants precomputed."""
+
+    __slots__ = ("path", "body", "content_type", "cache_control", "etag", "variants")
+
+    def __init__(self, path, body, content_type, cache_control, etag):
+        self.path = path
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.etag = etag
+        self.variants = {}
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Parse Accept-Encoding into the set of codings the client accepts."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticSite:
+    """
+    In-memory manifest of the built frontend.
+
+    The build directory is scanned once at startup. Small files are kept in
+    memory with gzip (and brotli, when the package is installed) variants
+    computed up front; ``.gz``/``.br`` files produced by the build are used
+    as-is. Requests are answered from the manifest without touching the
+    filesystem, with immutable caching for fingerprinted assets and ETag
+    revalidation for everything else, including index.html.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.assets = {}
+        self.index = None
+
+    def load(self):
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith((".gz", ".br")):
+                    continue
+                path = os.path.join(directory, filename)
+                url_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+                self.assets[url_path] = self._load_asset(url_path, path)
+
+        self.index = self.assets.get("index.html")
+        logger.info("Loaded %d static files from %s", len(self.assets), self.root)
+        return self
+
+    def _load_asset(self, url_path: str, path: str) -> StaticAsset:
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type == "application/javascript":
+            content_type += "; charset=utf-8"
+
+        cache_control = (
+            IMMUTABLE_CACHE_CONTROL if url_path.startswith(IMMUTABLE_PREFIX) else REVALIDATE_CACHE_CONTROL
+        )
+
+        if os.path.getsize(path) > MAX_MEMORY_FILE_BYTES:
+            stat = os.stat(path)
+            etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            return StaticAsset(path, None, content_type, cache_control, etag)
+
+        with open(path, "rb") as f:
+            body = f.read()
+        digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        asset = StaticAsset(path, body, content_type, cache_control, f'"{digest}"')
+
+        if content_type.startswith(COMPRESSIBLE_TYPES):
+            for encoding, suffix, compress in (
+                ("br", ".br", brotli.compress if brotli else None),
+                ("gzip", ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)),
+            ):
+                if os.path.exists(path + suffix):
+                    with open(path + suffix, "rb") as f:
+                        encoded = f.read()
+                elif compress and len(body) >= MIN_COMPRESS_BYTES:
+                    encoded = compress(body)
+                else:
+                    continue
+                if len(encoded) < len(body):
+                    asset.variants[encoding] = encoded
+
+        return asset
+
+    def response(self, url_path: str, headers) -> Response:
+        """
+        Build the response for a request path.
+
+        Unknown paths fall back to index.html for client-side routing, except
+        under assets/ where a missing file is a real 404.
+
+        Args:
+            url_path: Request path without the leading slash
+            headers: Request headers
+
+        Returns:
+            Response with caching and content-encoding headers set
+        """
+        asset = self.assets.get(url_path or "index.html")
+        if asset is None:
+            if url_path.startswith(IMMUTABLE_PREFIX) or self.index is None:
+                raise HTTPException(status_code=404, detail="Not Found")
+            asset = self.index
+
+        response_headers = {"Cache-Control": asset.cache_control}
+        if asset.body is None:
+            response_headers["ETag"] = asset.etag
+            if etag_matches(headers.get("if-none-match"), asset.etag):
+                return Response(status_code=304, headers=response_headers)
+            return FileResponse(asset.path, media_type=asset.content_type, headers=response_headers)
+
+        body, etag = asset.body, asset.etag
+        if asset.variants:
+            response_headers["Vary"] = "Accept-Encoding"
+            accepted = _accepted_encodings(headers.get("accept-encoding", ""))
+            for encoding in ("br", "gzip"):
+                if encoding in asset.variants and encoding in accepted:
+                    body = asset.variants[encoding]
+                    etag = f'{asset.etag[:-1]}-{encoding}"'
+                    response_headers["Content-Encoding"] = encoding
+                    break
+
+        response_headers["ETag"] = etag
+        if etag_matches(headers.get("if-none-match"), etag):
+            response_headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=response_headers)
+        return Response(content=body, media_type=asset.content_type, headers=response_headers)
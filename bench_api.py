@@ -0,0 +1,191 @@
+"""
+Load-testing benchmark for the waitlist API.
+
+Boots api:app in-process with uvicorn against a local database (a fresh
+SQLite file by default, or any DATABASE_URL such as a local Postgres), then
+drives POST /api/waitlist and GET /api/waitlist/count over real HTTP with a
+configurable concurrency, duplicate ratio and request mix. Throughput and
+p50/p95/p99 latency are printed and written as JSON so runs can be compared
+against a baseline. Needs the development requirements
+(``pip install -r requirements-dev.txt``).
+
+Usage:
+    python bench_api.py --requests 5000 --concurrency 100 --output bench.json
+    python bench_api.py --database-url postgresql://localhost/waitlist_bench
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, statuses, elapsed):
+    """Throughput, latency percentiles (ms) and status counts for one request kind"""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "status_counts": {str(code): statuses.count(code) for code in sorted(set(statuses))},
+    }
+
+
+def build_workload(args, rng):
+    """Pre-generate the request list so generation cost stays out of the timings"""
+    workload = []
+    sent = []
+    for i in range(args.requests):
+        roll = rng.random()
+        if roll < args.count_ratio:
+            workload.append(("count", None))
+            continue
+        if sent and rng.random() < args.duplicate_ratio:
+            email = rng.choice(sent)
+        elif rng.random() < args.invalid_ratio:
+            email = f"not-an-email-{i}"
+        else:
+            email = f"bench_{args.seed}_{i}@example.com"
+            sent.append(email)
+        workload.append(("signup", email))
+    return workload
+
+
+class ServerThread(threading.Thread):
+    """Runs uvicorn in a background thread with its own event loop"""
+
+    def __init__(self, app, port):
+        import uvicorn
+        super().__init__(daemon=True)
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+        self.server = uvicorn.Server(config)
+
+    def run(self):
+        self.server.run()
+
+    def __enter__(self):
+        self.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.join()
+
+
+async def drive(base_url, workload, concurrency):
+    """Send the workload with a fixed number of concurrent clients"""
+    import httpx
+
+    results = {"signup": ([], []), "count": ([], [])}
+    queue = iter(workload)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            for kind, email in queue:
+                started = time.perf_counter()
+                if kind == "signup":
+                    response = await client.post("/api/waitlist", data={"email": email})
+                else:
+                    response = await client.get("/api/waitlist/count")
+                latencies, statuses = results[kind]
+                latencies.append(time.perf_counter() - started)
+                statuses.append(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return results, elapsed
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Waitlist API load benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1,
+                        help="Fraction of signups that resend an earlier email")
+    parser.add_argument("--invalid-ratio", type=float, default=0.02,
+                        help="Fraction of new signups with a malformed email")
+    parser.add_argument("--count-ratio", type=float, default=0.3,
+                        help="Fraction of requests that read the counter")
+    parser.add_argument("--database-url", help="Defaults to a fresh temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=int(time.time()))
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+
+    # Every simulated client shares one IP, so per-IP limits would skew the run
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    from api import app
+
+    workload = build_workload(args, random.Random(args.seed))
+    port = free_port()
+
+    with ServerThread(app, port):
+        results, elapsed = asyncio.run(drive(f"http://127.0.0.1:{port}", workload, args.concurrency))
+
+    all_latencies = results["signup"][0] + results["count"][0]
+    all_statuses = results["signup"][1] + results["count"][1]
+    report = {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "duplicate_ratio": args.duplicate_ratio,
+            "invalid_ratio": args.invalid_ratio,
+            "count_ratio": args.count_ratio,
+            "database": os.environ["DATABASE_URL"].split("://")[0],
+            "seed": args.seed,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "overall": summarize(all_latencies, all_statuses, elapsed),
+        "signup": summarize(*results["signup"], elapsed),
+        "count": summarize(*results["count"], elapsed),
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
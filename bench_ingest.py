@@ -0,0 +1,231 @@
+"""
+Benchmark per-request CPU of the signup ingestion formats.
+
+Drives the ASGI app directly in-process (no sockets or HTTP client, so the
+CPU measured is the server's, database driver threads included) with every
+request carrying a new email, once per body format:
+
+    form       application/x-www-form-urlencoded POST /api/waitlist
+    multipart  multipart/form-data POST /api/waitlist
+    json       application/json POST /api/waitlist
+    batch      JSON arrays on POST /api/waitlist/batch (--batch-size emails each)
+
+It then times body parsing and response serialization on their own, to show
+how much of the difference comes from python-multipart and the JSON encoder.
+
+Usage:
+    python bench_ingest.py --requests 2000 --batch-size 100 --output ingest.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+from urllib.parse import parse_qsl, urlencode
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ADMIN_TOKEN = "bench-admin-token"
+BOUNDARY = "benchboundary7d1f3a"
+
+
+def form_body(email):
+    return "application/x-www-form-urlencoded", urlencode({"email": email}).encode()
+
+
+def multipart_body(email):
+    body = (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="email"\r\n\r\n'
+        f"{email}\r\n"
+        f"--{BOUNDARY}--\r\n"
+    ).encode()
+    return f"multipart/form-data; boundary={BOUNDARY}", body
+
+
+def json_body(email):
+    return "application/json", json.dumps({"email": email}).encode()
+
+
+FORMATS = {"form": form_body, "multipart": multipart_body, "json": json_body}
+
+
+async def call(app, path, content_type, body, extra_headers=()):
+    """Run one POST through the ASGI app and return the response status"""
+    response_complete = asyncio.Event()
+    request_sent = False
+    status = None
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            response_complete.set()
+
+    headers = [
+        (b"content-type", content_type.encode()),
+        (b"content-length", str(len(body)).encode()),
+        *extra_headers,
+    ]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 80),
+    }
+    await app(scope, receive, send)
+    return status
+
+
+def summarize(cpu, requests, emails, statuses):
+    """CPU per request and per email, and status counts, for one format"""
+    return {
+        "requests": requests,
+        "emails": emails,
+        "cpu_us_per_request": round(cpu / requests * 1e6, 1),
+        "cpu_us_per_email": round(cpu / emails * 1e6, 1),
+        "status_counts": {str(code): statuses.count(code) for code in sorted(set(statuses))},
+    }
+
+
+async def ingest(app, args, seed):
+    results = {}
+    for name, encode in FORMATS.items():
+        bodies = [encode(f"{name}_{seed}_{i}@example.com") for i in range(args.requests)]
+        started = time.process_time()
+        statuses = [await call(app, "/api/waitlist", *body) for body in bodies]
+        results[name] = summarize(time.process_time() - started, len(bodies), len(bodies), statuses)
+
+    emails = [f"batch_{seed}_{i}@example.com" for i in range(args.requests)]
+    batches = [
+        json.dumps(emails[start:start + args.batch_size]).encode()
+        for start in range(0, len(emails), args.batch_size)
+    ]
+    auth = ((b"x-admin-token", ADMIN_TOKEN.encode()),)
+    started = time.process_time()
+    statuses = [await call(app, "/api/waitlist/batch", "application/json", body, auth) for body in batches]
+    results["batch"] = summarize(time.process_time() - started, len(batches), len(emails), statuses)
+    return results
+
+
+async def parse_with_starlette(content_type, body):
+    """Parse a form body the way Starlette does for Request.form()"""
+    from starlette.requests import Request
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {"type": "http", "method": "POST", "headers": [(b"content-type", content_type.encode())]}
+    async with Request(scope, receive).form() as form:
+        return dict(form)
+
+
+def codec_costs(rounds):
+    """Microseconds to parse each body format and to serialize a signup response"""
+    from api.payloads import dumps, loads
+
+    email = "jane.doe@example.com"
+    form = form_body(email)[1].decode()
+    multipart = multipart_body(email)
+    body = json_body(email)[1]
+    response = {
+        "success": True,
+        "message": "You have been successfully waitlisted!",
+        "email": email,
+        "id": 123456,
+        "referral_code": "Hll0MNJh8EyW",
+        "position": 123456,
+    }
+
+    cases = {
+        "parse_form": lambda: dict(parse_qsl(form, keep_blank_values=True)),
+        "parse_json": lambda: loads(body),
+        "serialize_stdlib_json": lambda: json.dumps(response).encode(),
+        "serialize_default": lambda: dumps(response),
+    }
+    costs = {
+        name: round(min(timeit.repeat(case, number=rounds, repeat=3)) / rounds * 1e6, 2)
+        for name, case in cases.items()
+    }
+
+    async def parse_multipart_rounds():
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await parse_with_starlette(*multipart)
+        return time.perf_counter() - started
+
+    costs["parse_multipart"] = round(asyncio.run(parse_multipart_rounds()) / rounds * 1e6, 2)
+    return costs
+
+
+async def run_app(app, args, seed):
+    async with app.router.lifespan_context(app):
+        return await ingest(app, args, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Signup ingestion CPU benchmark")
+    parser.add_argument("--requests", type=int, default=1000, help="Emails per format")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--codec-rounds", type=int, default=20000)
+    parser.add_argument("--database-url", help="Defaults to a fresh temporary SQLite file")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from api import app
+    from api.payloads import orjson
+
+    report = {
+        "config": {
+            "requests": args.requests,
+            "batch_size": args.batch_size,
+            "database": os.environ["DATABASE_URL"].split("://")[0],
+            "json_encoder": "orjson" if orjson else "json",
+        },
+        "ingest": asyncio.run(run_app(app, args, int(time.time()))),
+        "codec_us": codec_costs(args.codec_rounds),
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Benchmark signup inserts and email lookups as the waitlist table grows.
+
+For every size in --rows, each schema layout is created empty, loaded with
+that many synthetic signups spread over the last two years, analyzed, and
+then timed with single-row statements, one per transaction like the API:
+
+    insert_new        INSERT ... ON CONFLICT DO NOTHING RETURNING for unseen emails
+    insert_duplicate  the same for emails already in the table
+    lookup            the duplicate filter's existence check for a stored email
+                      (db.queries.email_exists)
+
+Layouts:
+
+    before       the schema up to migration 5: a unique index on the email
+                 string and a second index on the primary key (the
+                 email_hash column is kept, unindexed, so only indexes differ)
+    after        migrations 6 and 7: a unique index on the 16-byte email_hash
+    partitioned  after, converted with db.partitioning.partition_waitlist
+                 (PostgreSQL only; the conversion itself is timed too)
+
+Index sizes are reported as well. On PostgreSQL each layout lives in its own
+scratch schema (bench_before, ...), dropped afterwards; on SQLite each is a
+temporary file.
+
+Usage:
+    python bench_schema.py --rows 100000 --output schema.json
+    python bench_schema.py --database-url postgresql+psycopg2://localhost/waitlist_bench --rows 1000000,10000000,50000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import bindparam, create_engine, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+from db.models import Waitlist, email_hash
+from db.partitioning import email_hashes, partition_waitlist
+
+# Signups are spread evenly over this span before now
+HISTORY = timedelta(days=730)
+# Rows per statement while loading
+LOAD_BATCH_SIZE = 50000
+
+# Index holding each layout's uniqueness key
+UNIQUE_KEY = {
+    "before": "ix_waitlist_email",
+    "after": "ix_waitlist_email_hash",
+    "partitioned": "waitlist_email_hashes",
+}
+
+# Column each unpartitioned layout's ON CONFLICT names
+CONFLICT_KEY = {
+    "before": Waitlist.email,
+    "after": Waitlist.email_hash,
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies):
+    """Latency percentiles (ms) for one statement kind"""
+    latencies = sorted(latencies)
+    return {
+        "samples": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+def bench_email(n):
+    return f"bench{n}@example.com"
+
+
+def create_layout(conn, layout):
+    """Create an empty waitlist table with the given layout"""
+    Waitlist.__table__.create(conn)
+    if layout == "before":
+        conn.execute(text("DROP INDEX ix_waitlist_email_hash"))
+        conn.execute(text("CREATE UNIQUE INDEX ix_waitlist_email ON waitlist (email)"))
+        conn.execute(text("CREATE INDEX ix_waitlist_id ON waitlist (id)"))
+
+
+def load(conn, rows):
+    """Fill the table with rows synthetic signups"""
+    since = datetime.utcnow() - HISTORY
+    step = HISTORY.total_seconds() / max(rows, 1)
+    for start in range(0, rows, LOAD_BATCH_SIZE):
+        end = min(start + LOAD_BATCH_SIZE, rows)
+        if conn.dialect.name == "postgresql":
+            # Generated server-side, so tens of millions of rows load in minutes
+            conn.execute(
+                text(
+                    "INSERT INTO waitlist (email, email_hash, created_at, referral_code) "
+                    "SELECT 'bench' || g || '@example.com', decode(md5('bench' || g || '@example.com'), 'hex'), "
+                    ":since + make_interval(secs => g * :step), 'r' || g "
+                    "FROM generate_series(:start, :end - 1) AS g"
+                ),
+                {"since": since, "step": step, "start": start, "end": end},
+            )
+        else:
+            conn.execute(insert(Waitlist), [
+                {
+                    "email": bench_email(n),
+                    "email_hash": email_hash(bench_email(n)),
+                    "created_at": since + timedelta(seconds=n * step),
+                    "referral_code": f"r{n}",
+                }
+                for n in range(start, end)
+            ])
+        conn.commit()
+        print(f"  loaded {end:,} rows", end="\r", file=sys.stderr)
+    print(file=sys.stderr)
+
+
+def relation_bytes(conn, name):
+    """On-disk size of a table or index, or None where SQLite lacks dbstat"""
+    if conn.dialect.name == "postgresql":
+        return conn.scalar(text("SELECT pg_total_relation_size(to_regclass(:name))"), {"name": name})
+    try:
+        return conn.scalar(text("SELECT SUM(pgsize) FROM dbstat WHERE name = :name"), {"name": name})
+    except OperationalError:
+        return None
+
+
+def index_bytes(conn, layout):
+    """Size of every index on the waitlist, plus the hash table when partitioned"""
+    if conn.dialect.name == "postgresql":
+        if layout == "partitioned":
+            return conn.scalar(text(
+                "SELECT SUM(pg_indexes_size(relid))::bigint FROM pg_partition_tree('waitlist')"
+            )) + relation_bytes(conn, "waitlist_email_hashes")
+        return conn.scalar(text("SELECT pg_indexes_size('waitlist')"))
+    try:
+        return conn.scalar(text(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'waitlist')"
+        ))
+    except OperationalError:
+        return None
+
+
+def timed(conn, stmt, params, commit):
+    """Run stmt once per parameter set and summarize the latencies"""
+    latencies = []
+    for values in params:
+        started = time.perf_counter()
+        conn.execute(stmt, values).first()
+        if commit:
+            conn.commit()
+        else:
+            conn.rollback()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def measure(conn, layout, rows, samples, rng):
+    dialect_insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    insert_stmt = dialect_insert(Waitlist).returning(Waitlist.id)
+    # Each layout's email key, as the API names it; the partitioned table's
+    # trigger skips duplicates instead
+    if layout == "partitioned":
+        insert_stmt = insert_stmt.on_conflict_do_nothing()
+    else:
+        insert_stmt = insert_stmt.on_conflict_do_nothing(index_elements=[CONFLICT_KEY[layout]])
+
+    def signup(email):
+        return {
+            "email": email,
+            "email_hash": email_hash(email),
+            "created_at": datetime.utcnow(),
+            "referral_code": f"n{rng.getrandbits(48):x}",
+        }
+
+    existing = [bench_email(rng.randrange(rows)) for _ in range(samples)]
+    if layout == "before":
+        lookup = select(Waitlist.id).where(Waitlist.email == bindparam("email")).limit(1)
+        lookups = [{"email": email} for email in existing]
+    elif layout == "partitioned":
+        # As db.queries.email_exists does once the table is partitioned
+        lookup = select(email_hashes.c.email_hash).where(email_hashes.c.email_hash == bindparam("digest"))
+        lookups = [{"digest": email_hash(email)} for email in existing]
+    else:
+        lookup = select(Waitlist.id).where(Waitlist.email_hash == bindparam("digest")).limit(1)
+        lookups = [{"digest": email_hash(email)} for email in existing]
+
+    return {
+        "insert_new": timed(conn, insert_stmt, [signup(f"new{i}@example.com") for i in range(samples)], True),
+        "insert_duplicate": timed(conn, insert_stmt, [signup(email) for email in existing], True),
+        "lookup": timed(conn, lookup, lookups, False),
+        "index_bytes": index_bytes(conn, layout),
+        "unique_key_bytes": relation_bytes(conn, UNIQUE_KEY[layout]),
+    }
+
+
+def run_layout(engine, layout, rows, args):
+    print(f"{layout}: {rows:,} rows", file=sys.stderr)
+    result = {}
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            schema = f"bench_{layout}"
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {schema}"))
+            conn.execute(text(f"SET search_path TO {schema}"))
+        create_layout(conn, layout)
+        conn.commit()
+
+        started = time.perf_counter()
+        load(conn, rows)
+        result["load_seconds"] = round(time.perf_counter() - started, 1)
+
+        if layout == "partitioned":
+            started = time.perf_counter()
+            with conn.begin():
+                partition_waitlist(conn, months_ahead=1)
+            result["partition_seconds"] = round(time.perf_counter() - started, 1)
+
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+        result.update(measure(conn, layout, rows, args.samples, random.Random(args.seed)))
+
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SET search_path TO DEFAULT"))
+            conn.execute(text(f"DROP SCHEMA bench_{layout} CASCADE"))
+            conn.commit()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Waitlist schema data-size benchmark")
+    parser.add_argument("--rows", default="100000", help="Comma-separated table sizes, e.g. 1000000,10000000")
+    parser.add_argument("--samples", type=int, default=1000, help="Statements timed per kind")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", help="Defaults to temporary SQLite files")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.rows.split(",")]
+
+    tmpdir = None
+    if args.database_url:
+        shared = create_engine(args.database_url)
+        layouts = ["before", "after"]
+        if shared.dialect.name == "postgresql":
+            layouts.append("partitioned")
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        layouts = ["before", "after"]
+
+    results = {}
+    for rows in sizes:
+        results[str(rows)] = {}
+        for layout in layouts:
+            if tmpdir:
+                path = os.path.join(tmpdir.name, f"{layout}-{rows}.db")
+                engine = create_engine(f"sqlite:///{path}")
+            else:
+                engine = shared
+            results[str(rows)][layout] = run_layout(engine, layout, rows, args)
+            if tmpdir:
+                engine.dispose()
+                os.remove(path)
+
+    report = {
+        "config": {
+            "rows": sizes,
+            "samples": args.samples,
+            "database": args.database_url.split("://")[0] if args.database_url else "sqlite",
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
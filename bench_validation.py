@@ -0,0 +1,83 @@
+"""
+Benchmark per-email cost of waitlist email validation.
+
+Compares validation.normalize_email (cold and warm domain cache, with and
+without canonicalization) against the email-validator package with DNS
+deliverability checks disabled.
+
+Usage: python bench_validation.py [--rounds N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from validation import _normalize_domain, normalize_email
+
+SAMPLE_EMAILS = [
+    "Jane.Doe@Gmail.com",
+    " john+newsletter@outlook.com ",
+    "founder@startup.io",
+    "a.very.long.local.part.with.dots@sub.domain.example.co.uk",
+    "user@bücher.de",
+    "not-an-email",
+    "missing@tld",
+    "o'connor@example.ie",
+]
+
+
+def bench(label, func, emails, rounds):
+    """Time func over every sample email and print the per-email cost"""
+    def run():
+        for email in emails:
+            try:
+                func(email)
+            except ValueError:
+                pass
+
+    total = min(timeit.repeat(run, number=rounds, repeat=5))
+    per_email_us = total / (rounds * len(emails)) * 1e6
+    print(f"{label:<45} {per_email_us:8.2f} µs/email")
+    return per_email_us
+
+
+def bench_cold(emails, rounds):
+    """normalize_email with the domain verdict cache cleared on every call"""
+    def func(email):
+        _normalize_domain.cache_clear()
+        normalize_email(email)
+    return bench("normalize_email (cold domain cache)", func, emails, rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("EMAIL VALIDATION BENCHMARK")
+    print("=" * 60)
+
+    bench_cold(SAMPLE_EMAILS, args.rounds)
+    bench("normalize_email (warm domain cache)", normalize_email, SAMPLE_EMAILS, args.rounds)
+    bench(
+        "normalize_email (canonicalize)",
+        lambda email: normalize_email(email, canonicalize=True),
+        SAMPLE_EMAILS,
+        args.rounds,
+    )
+
+    try:
+        from email_validator import validate_email
+    except ImportError:
+        print("email-validator not installed, skipping comparison")
+    else:
+        bench(
+            "email_validator (no DNS)",
+            lambda email: validate_email(email, check_deliverability=False),
+            SAMPLE_EMAILS,
+            max(args.rounds // 10, 1),
+        )
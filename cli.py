@@ -0,0 +1,407 @@
+"""
+Command line tools for bulk loading and exporting the waitlist.
+
+Usage:
+    python cli.py import signups.csv
+    python cli.py import partner.ndjson --format ndjson
+    python cli.py export waitlist.csv
+    python cli.py export - --format ndjson > waitlist.ndjson
+    python cli.py migrate
+    python cli.py migrate --contract
+    python cli.py backfill-rollups --since 2024-01-01
+    python cli.py partition-waitlist --months-ahead 3
+    python cli.py add-partitions --months-ahead 3
+
+On PostgreSQL imports and CSV exports stream through COPY; NDJSON exports
+and other databases use a server-side cursor and batched executemany
+inserts. Memory use stays constant regardless of file size. Imports add
+their signups to the analytics rollups in the same transaction.
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import sqlite
+from db import get_engine
+from db.migrations import MIGRATIONS, current_version, run_migrations
+from db.models import Waitlist, email_hash, new_referral_code
+from db.partitioning import add_partitions, is_partitioned, partition_waitlist
+from db.rollups import add_rollups, backfill_rollups, rollup_keys
+from validation import InvalidEmail, normalize_email
+
+PROGRESS_EVERY = 100000
+
+
+class Progress:
+    """Counts processed rows and reports every PROGRESS_EVERY rows on stderr"""
+
+    def __init__(self, verb: str):
+        self.verb = verb
+        self.rows = 0
+        self.skipped = 0
+
+    def tick(self):
+        self.rows += 1
+        if self.rows % PROGRESS_EVERY == 0:
+            print(f"  {self.verb} {self.rows:,} rows...", file=sys.stderr)
+
+
+def ndjson_records(file):
+    """Parse each non-blank line as JSON, yielding None for malformed lines"""
+    for line in file:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def utc_naive(value: str) -> datetime:
+    """Parse an ISO timestamp as a naive UTC datetime, converting any offset"""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def read_signups(file, fmt: str, progress: Progress):
+    """
+    Yield (email, created_at) pairs from a CSV or NDJSON file.
+
+    CSV files need an ``email`` column and may have a ``created_at`` column
+    in ISO format; NDJSON lines are objects with the same keys. created_at
+    is yielded as a naive UTC datetime, or None when missing. Malformed
+    lines, invalid emails and created_at values that are not ISO strings are
+    counted in progress.skipped.
+    """
+    if fmt == "csv":
+        records = csv.DictReader(file)
+    else:
+        records = ndjson_records(file)
+
+    for record in records:
+        progress.tick()
+        if not isinstance(record, dict):
+            progress.skipped += 1
+            continue
+        email, created_at = record.get("email"), record.get("created_at") or None
+        try:
+            if not isinstance(email, str):
+                raise InvalidEmail("email must be a string")
+            email = normalize_email(email)
+            if created_at is not None:
+                if not isinstance(created_at, str):
+                    raise ValueError("created_at must be a string")
+                created_at = utc_naive(created_at)
+        except ValueError:
+            # InvalidEmail is a ValueError too
+            progress.skipped += 1
+            continue
+        yield email, created_at
+
+
+class CopyStream(io.RawIOBase):
+    """
+    File-like object that renders signups as CSV lines on demand so COPY can
+    pull them in chunks without materializing the whole input. Each line
+    gets a fresh referral code.
+    """
+
+    def __init__(self, signups):
+        self._lines = (self._render(email, created_at) for email, created_at in signups)
+        self._buffer = b""
+
+    @staticmethod
+    def _render(email, created_at):
+        row = io.StringIO()
+        csv.writer(row).writerow([email, created_at.isoformat() if created_at else "", new_referral_code()])
+        return row.getvalue().encode()
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def import_postgres(signups) -> int:
+    """COPY signups into a temp table, then merge them in with ON CONFLICT"""
+    engine = get_engine()
+    with engine.begin() as conn:
+        # A partitioned table's insert trigger skips duplicates; there is no index to name
+        conflict_target = "" if is_partitioned(conn) else "(email_hash) "
+        cursor = conn.connection.cursor()
+        cursor.execute(
+            "CREATE TEMP TABLE waitlist_import "
+            "(email varchar(255), created_at timestamp, referral_code varchar(16)) "
+            "ON COMMIT DROP"
+        )
+        cursor.copy_expert(
+            "COPY waitlist_import (email, created_at, referral_code) FROM STDIN WITH (FORMAT csv, NULL '')",
+            CopyStream(signups),
+        )
+        # Inserted rows come back counted per minute, for the analytics rollups
+        cursor.execute(
+            "WITH inserted AS ("
+            "INSERT INTO waitlist (email, email_hash, created_at, referral_code) "
+            "SELECT DISTINCT ON (email) email, decode(md5(email), 'hex'), "
+            "COALESCE(created_at, now() AT TIME ZONE 'utc'), referral_code "
+            "FROM waitlist_import ORDER BY email, created_at "
+            f"ON CONFLICT {conflict_target}DO NOTHING RETURNING created_at"
+            ") SELECT date_trunc('minute', created_at), count(*) FROM inserted GROUP BY 1"
+        )
+        counts = Counter()
+        inserted = 0
+        for minute, signups in cursor.fetchall():
+            for key in rollup_keys(minute):
+                counts[key] += signups
+            inserted += signups
+        add_rollups(conn, counts)
+    return inserted
+
+
+def signup_rows(signups, batch_size: int):
+    """Group signups into lists of Waitlist rows for executemany"""
+    batch = []
+    for email, created_at in signups:
+        # executemany needs the same keys in every row
+        batch.append({
+            "email": email,
+            "email_hash": email_hash(email),
+            "created_at": created_at or datetime.utcnow(),
+            "referral_code": new_referral_code(),
+        })
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_batched(signups, batch_size: int) -> int:
+    """Insert signups with executemany batches of INSERT ... ON CONFLICT DO NOTHING"""
+    stmt = (
+        sqlite.insert(Waitlist)
+        .on_conflict_do_nothing(index_elements=[Waitlist.email_hash])
+        .returning(Waitlist.created_at)
+    )
+    counts = Counter()
+    inserted = 0
+    with get_engine().begin() as conn:
+        for batch in signup_rows(signups, batch_size):
+            # Only inserted rows come back, for the analytics rollups
+            for created_at in conn.execute(stmt, batch).scalars():
+                counts.update(rollup_keys(created_at))
+                inserted += 1
+        add_rollups(conn, counts)
+    return inserted
+
+
+def export_postgres(file) -> None:
+    """Stream the table out as CSV with COPY ... TO STDOUT"""
+    connection = get_engine().raw_connection()
+    try:
+        cursor = connection.cursor()
+        query = "SELECT id, email, created_at FROM waitlist ORDER BY id"
+        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", file)
+    finally:
+        connection.close()
+
+
+def export_streaming(file, fmt: str, progress: Progress, batch_size: int) -> None:
+    """Stream the table out through a server-side cursor"""
+    engine = get_engine()
+    writer = csv.writer(file) if fmt == "csv" else None
+    if writer:
+        writer.writerow(["id", "email", "created_at"])
+
+    stmt = select(Waitlist.id, Waitlist.email, Waitlist.created_at).order_by(Waitlist.id)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        for row in result:
+            progress.tick()
+            created_at = row.created_at.isoformat() if row.created_at else None
+            if writer:
+                writer.writerow([row.id, row.email, created_at])
+            else:
+                file.write(json.dumps({"id": row.id, "email": row.email, "created_at": created_at}) + "\n")
+
+
+def detect_format(path: str, fmt: str) -> str:
+    if fmt:
+        return fmt
+    return "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def cmd_import(args):
+    engine = get_engine()
+    fmt = detect_format(args.path, args.format)
+    progress = Progress("read")
+    run_migrations(engine)
+
+    with open(args.path, newline="", encoding="utf-8") as file:
+        signups = read_signups(file, fmt, progress)
+        if engine.dialect.name == "postgresql":
+            inserted = import_postgres(signups)
+        elif engine.dialect.name == "sqlite":
+            inserted = import_batched(signups, args.batch_size)
+        else:
+            sys.exit(f"Bulk import is not supported on {engine.dialect.name}")
+
+    duplicates = progress.rows - progress.skipped - inserted
+    print(
+        f"✓ Imported {inserted:,} new emails from {progress.rows:,} rows "
+        f"({duplicates:,} duplicates, {progress.skipped:,} invalid)",
+        file=sys.stderr,
+    )
+
+
+def cmd_export(args):
+    engine = get_engine()
+    fmt = detect_format(args.path, args.format)
+    progress = Progress("wrote")
+
+    if engine.dialect.name == "postgresql" and fmt == "csv":
+        binary = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+        try:
+            export_postgres(binary)
+        finally:
+            if binary is not sys.stdout.buffer:
+                binary.close()
+        print("✓ Export complete", file=sys.stderr)
+        return
+
+    text = sys.stdout if args.path == "-" else open(args.path, "w", newline="", encoding="utf-8")
+    try:
+        export_streaming(text, fmt, progress, args.batch_size)
+    finally:
+        if text is not sys.stdout:
+            text.close()
+    print(f"✓ Exported {progress.rows:,} rows", file=sys.stderr)
+
+
+def cmd_migrate(args):
+    applied = run_migrations(get_engine(), contract=args.contract)
+    print(f"✓ Schema up to date ({applied} migrations applied)", file=sys.stderr)
+
+
+def cmd_backfill_rollups(args):
+    engine = get_engine()
+    run_migrations(engine)
+    since = args.since
+    if since is None:
+        with engine.connect() as conn:
+            since = conn.scalar(select(func.min(Waitlist.created_at)))
+        if since is None:
+            print("✓ Nothing to backfill, the waitlist is empty", file=sys.stderr)
+            return
+    until = args.until or datetime.utcnow()
+    counted = backfill_rollups(engine, since, until, args.batch_size)
+    print(
+        f"✓ Rebuilt rollups for {since:%Y-%m-%d} to {until:%Y-%m-%d} (exclusive) from {counted:,} signups",
+        file=sys.stderr,
+    )
+
+
+def require_postgres():
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        sys.exit(f"Partitioning is only supported on PostgreSQL, not {engine.dialect.name}")
+
+
+def cmd_partition_waitlist(args):
+    engine = get_engine()
+    require_postgres()
+    run_migrations(engine)
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            print("✓ The waitlist is already partitioned", file=sys.stderr)
+            return
+        if current_version(conn) < MIGRATIONS[-1][0]:
+            sys.exit("Contract migrations are pending; run `python cli.py migrate --contract` first")
+        moved = partition_waitlist(conn, args.months_ahead)
+    print(f"✓ Moved {moved:,} signups into monthly partitions", file=sys.stderr)
+    print("  Restart the API so its workers switch to the partitioned insert path", file=sys.stderr)
+
+
+def cmd_add_partitions(args):
+    engine = get_engine()
+    require_postgres()
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            sys.exit("The waitlist is not partitioned; run partition-waitlist first")
+        created = add_partitions(conn, args.months_ahead)
+    print(f"✓ Created {created} partitions", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Lavoo waitlist bulk tools")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    importer = subcommands.add_parser("import", help="Load emails from a CSV or NDJSON file")
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=["csv", "ndjson"])
+    importer.add_argument("--batch-size", type=int, default=5000)
+    importer.set_defaults(handler=cmd_import)
+
+    exporter = subcommands.add_parser("export", help="Write the waitlist to a CSV or NDJSON file")
+    exporter.add_argument("path", help="Output file, or - for stdout")
+    exporter.add_argument("--format", choices=["csv", "ndjson"])
+    exporter.add_argument("--batch-size", type=int, default=10000)
+    exporter.set_defaults(handler=cmd_export)
+
+    migrate = subcommands.add_parser("migrate", help="Apply pending schema migrations")
+    migrate.add_argument(
+        "--contract", action="store_true",
+        help="Also apply contract migrations; run once no workers of the previous release remain"
+    )
+    migrate.set_defaults(handler=cmd_migrate)
+
+    backfill = subcommands.add_parser(
+        "backfill-rollups",
+        help="Rebuild signup analytics for whole past days from the waitlist table",
+    )
+    backfill.add_argument("--since", type=datetime.fromisoformat, help="First day (default: first signup)")
+    backfill.add_argument(
+        "--until", type=datetime.fromisoformat,
+        help="Day after the last one rebuilt (default: today, which live aggregation is counting)",
+    )
+    backfill.add_argument("--batch-size", type=int, default=10000)
+    backfill.set_defaults(handler=cmd_backfill_rollups)
+
+    partition = subcommands.add_parser(
+        "partition-waitlist",
+        help="Convert the waitlist into monthly partitions by signup time (PostgreSQL)",
+    )
+    partition.add_argument("--months-ahead", type=int, default=3, help="Future months to create partitions for")
+    partition.set_defaults(handler=cmd_partition_waitlist)
+
+    partitions = subcommands.add_parser(
+        "add-partitions", help="Create partitions for the coming months (PostgreSQL, run monthly)"
+    )
+    partitions.add_argument("--months-ahead", type=int, default=3)
+    partitions.set_defaults(handler=cmd_add_partitions)
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    args.handler(args)
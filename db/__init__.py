@@ -1,38 +1,187 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-import os
-
-# Load environment variables
-load_dotenv()
-
-# Get database URL from environment
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is not set! Check your .env file.")
-
-# Log the database connection (hide password)
-import logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-safe_url = DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else 'unknown'
-logger.info(f"Connecting to database: ...@{safe_url}")
-
-# Create database engine with echo enabled for debugging
-engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
-
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Dependency to get database session
-def get_db():
-    """
-    Dependency function to get database session.
-    Yields a database session and ensures it's closed after use.
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from dotenv import load_dotenv
+from db.pool import pool_options
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Engines and session factories are created on first use so importing the
+# package (and the API) needs neither a .env file nor a reachable database
+_lock = threading.Lock()
+_engine = None
+_async_engine = None
+_session_factory = None
+_async_session_factory = None
+_replica_async_engine = None
+
+def get_database_url() -> str:
+    """
+    Read DATABASE_URL, loading the .env file on first use.
+
+    Raises:
+        ValueError: If DATABASE_URL is not set
+    """
+    load_dotenv()
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise ValueError("DATABASE_URL environment variable is not set! Check your .env file.")
+    return database_url
+
+def get_replica_url():
+    """Read DATABASE_REPLICA_URL, or None when no read replica is configured."""
+    load_dotenv()
+    return os.getenv("DATABASE_REPLICA_URL") or None
+
+def _log_connection(database_url: str):
+    # Log the database connection (hide password)
+    safe_url = database_url.split('@')[1] if '@' in database_url else 'unknown'
+    logger.info("Connecting to database: ...@%s", safe_url)
+
+def get_engine():
+    """Return the synchronous engine, creating it on first call."""
+    global _engine, _session_factory
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                database_url = get_database_url()
+                _log_connection(database_url)
+                # Pool size, overflow, timeout, recycle and pre-ping come from DB_POOL_* variables
+                _engine = create_engine(database_url, echo=False, **pool_options(database_url))
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+    return _engine
+
+def get_session_factory():
+    """Return the synchronous session factory, creating the engine if needed."""
+    get_engine()
+    return _session_factory
+
+# Dependency to get database session
+def get_db():
+    """
+    Dependency function to get database session.
+    Yields a database session and ensures it's closed after use.
+    """
+    db = get_session_factory()()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Async drivers used by the API so database I/O never blocks the event loop
+ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url):
+    """
+    Translate a synchronous database URL into its async driver equivalent.
+
+    Args:
+        url: Database URL as configured in DATABASE_URL
+
+    Returns:
+        SQLAlchemy URL using asyncpg (Postgres) or aiosqlite (SQLite)
+    """
+    url = make_url(url)
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    url = url.set(drivername=drivername)
+
+    # asyncpg does not understand libpq's sslmode parameter
+    if drivername == "postgresql+asyncpg" and "sslmode" in url.query:
+        sslmode = url.query["sslmode"]
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+
+    return url
+
+def get_async_engine():
+    """Return the async engine used by the API, creating it on first call."""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                database_url = get_database_url()
+                _log_connection(database_url)
+                async_url = to_async_url(database_url)
+                _async_engine = create_async_engine(
+                    async_url, echo=False, **pool_options(async_url, metered=True)
+                )
+                _async_session_factory = async_sessionmaker(
+                    bind=_async_engine,
+                    class_=AsyncSession,
+                    autoflush=False,
+                    expire_on_commit=False,
+                )
+    return _async_engine
+
+def get_replica_async_engine():
+    """
+    Return the async engine for the read replica, creating it on first call.
+    
+    The replica has its own connection pool, sized by the same DB_POOL_*
+    variables as the primary's.
+    
+    Returns:
+        The replica engine, or None if DATABASE_REPLICA_URL is not set
+    """
+    global _replica_async_engine
+    if _replica_async_engine is None:
+        replica_url = get_replica_url()
+        if replica_url is None:
+            return None
+        with _lock:
+            if _replica_async_engine is None:
+                _log_connection(replica_url)
+                async_url = to_async_url(replica_url)
+                _replica_async_engine = create_async_engine(async_url, echo=False, **pool_options(async_url))
+    return _replica_async_engine
+
+def get_async_session_factory():
+    """Return the async session factory, creating the engine if needed."""
+    get_async_engine()
+    return _async_session_factory
+
+def new_async_session() -> AsyncSession:
+    """Open a new AsyncSession for work outside a request, e.g. background tasks."""
+    return get_async_session_factory()()
+
+# Async dependency to get database session
+async def get_async_db():
+    """
+    Dependency function to get an async database session.
+    Yields an AsyncSession and ensures it's closed after use.
+    """
+    async with new_async_session() as db:
+        yield db
+
+async def dispose_engines():
+    """Close pooled connections on shutdown."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _replica_async_engine is not None:
+        await _replica_async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
+# Backwards-compatible module attributes (e.g. ``from db import engine``)
+# that resolve lazily on first access
+_LAZY_ATTRIBUTES = {
+    "DATABASE_URL": get_database_url,
+    "engine": get_engine,
+    "SessionLocal": get_session_factory,
+    "async_engine": get_async_engine,
+    "AsyncSessionLocal": get_async_session_factory,
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
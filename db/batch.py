@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from db.queries import insert_waitlist_email, insert_waitlist_emails
+
+logger = logging.getLogger(__name__)
+
+
+class SignupBatcher:
+    """
+    Write-behind queue that coalesces signups into multi-row inserts.
+
+    Requests enqueue the values of a validated signup and await a future. A
+    single writer task collects signups for up to ``max_delay`` seconds or
+    ``max_rows`` rows, whichever comes first, inserts them with one
+    ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` and resolves each future
+    with the new row, or None when the email was already waitlisted.
+
+    Once stop() has been called the writer drains what is queued and exits,
+    so later signups (requests still finishing during shutdown) are inserted
+    directly instead.
+    """
+
+    def __init__(self, session_factory, max_rows: int = 500, max_delay: float = 0.01):
+        self.session_factory = session_factory
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.batches = 0
+        self.rows = 0
+        self._queue = asyncio.Queue()
+        self._full = asyncio.Event()
+        self._task = None
+        self._stopped = False
+
+    def start(self):
+        """Start the background writer task on the running event loop."""
+        if self._task is None:
+            self._stopped = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued and stop the writer task."""
+        if self._task is None:
+            return
+        # Nothing may be queued behind the sentinel, the writer never reads it
+        self._stopped = True
+        self._queue.put_nowait(None)
+        self._full.set()
+        await self._task
+        self._task = None
+
+    async def submit(self, values: dict):
+        """
+        Queue a signup for insertion and wait for its batch to commit.
+
+        Args:
+            values: Column values from db.queries.signup_values()
+
+        Returns:
+            The inserted ``(id, email, referral_code, referred_by_id)`` row,
+            or None if the email is already waitlisted
+        """
+        if self._task is None:
+            raise RuntimeError("SignupBatcher is not running")
+        if self._stopped:
+            async with self.session_factory() as db:
+                return await insert_waitlist_email(db, values)
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((values, future))
+        if self._queue.qsize() >= self.max_rows:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+
+            # Give other requests a moment to join this batch
+            if self._queue.qsize() < self.max_rows - 1:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+
+            while len(batch) < self.max_rows and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        # The first signup for an email in the batch is the one inserted
+        rows = {}
+        for values, _ in batch:
+            rows.setdefault(values["email"], values)
+        try:
+            async with self.session_factory() as db:
+                inserted = await insert_waitlist_emails(db, list(rows.values()))
+        except Exception as e:
+            logger.error("Error flushing signup batch of %d: %s", len(rows), e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.rows += len(inserted)
+
+        # The first request for an email gets its row, repeats are duplicates
+        for values, future in batch:
+            if not future.done():
+                future.set_result(inserted.pop(values["email"], None))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_rows": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
@@ -0,0 +1,417 @@
+"""
+Versioned schema migrations.
+
+Each migration has an integer version and is applied at most once; applied
+versions are recorded in the schema_migrations table. Migrations are written
+to be idempotent against databases that predate this table (they check for
+existing tables, columns and indexes first), so a database created by the old
+``Base.metadata.create_all`` call upgrades cleanly.
+
+On PostgreSQL a session-level advisory lock serializes concurrent runners, so
+several replicas starting at once still apply each migration exactly once.
+
+Schema changes that old workers cannot live with are split into an expand
+migration, applied at deploy time, and a contract migration that waits until
+that deploy has fully rolled out (``python cli.py migrate --contract``).
+
+Usage: python -m db.migrations [--contract]
+"""
+import logging
+import sys
+import time
+from datetime import datetime
+from sqlalchemy import (
+    Column, DateTime, Integer, LargeBinary, MetaData, String, Table, bindparam, cast, func, inspect, select, text, update
+)
+from db.models import SignupRollup, Waitlist, email_hash, new_referral_code
+from validation import InvalidEmail, normalize_email
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_advisory_lock
+ADVISORY_LOCK_KEY = 0x4C41564F
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _has_index(conn, table: str, name: str) -> bool:
+    return any(index["name"] == name for index in inspect(conn).get_indexes(table))
+
+
+def _has_column(conn, table: str, name: str) -> bool:
+    return any(column["name"] == name for column in inspect(conn).get_columns(table))
+
+
+def _add_waitlist_columns(conn, columns: dict):
+    for name, ddl in columns.items():
+        if not _has_column(conn, "waitlist", name):
+            conn.execute(text(f"ALTER TABLE waitlist ADD COLUMN {name} {ddl}"))
+
+
+def _create_waitlist_index(conn, name: str):
+    index = next(i for i in Waitlist.__table__.indexes if i.name == name)
+    if not _has_index(conn, "waitlist", index.name):
+        index.create(conn)
+
+
+# The waitlist table as first released. Later columns and indexes come from
+# their own migrations, so every version replays on an empty database.
+baseline_waitlist = Table(
+    "waitlist",
+    MetaData(),
+    Column("id", Integer, primary_key=True, index=True, autoincrement=True),
+    Column("email", String(255), unique=True, nullable=False, index=True),
+    Column("created_at", DateTime, nullable=False),
+)
+
+
+def create_waitlist_table(conn):
+    baseline_waitlist.create(conn, checkfirst=True)
+
+
+def add_listing_index(conn):
+    _create_waitlist_index(conn, "ix_waitlist_created_at_id")
+
+
+# Rows given referral codes per UPDATE batch while backfilling
+BACKFILL_BATCH_SIZE = 10000
+
+REFERRAL_COLUMNS = {
+    "referral_code": "VARCHAR(16)",
+    "referred_by_id": "INTEGER REFERENCES waitlist (id)",
+}
+
+
+def add_referrals(conn):
+    _add_waitlist_columns(conn, REFERRAL_COLUMNS)
+
+    # Codes are random, so existing rows are filled in from Python in batches
+    stmt = (
+        update(Waitlist)
+        .where(Waitlist.id == bindparam("row_id"))
+        .values(referral_code=bindparam("code"))
+    )
+    while True:
+        ids = conn.execute(
+            select(Waitlist.id).where(Waitlist.referral_code.is_(None)).limit(BACKFILL_BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            break
+        conn.execute(stmt, [{"row_id": row_id, "code": new_referral_code()} for row_id in ids])
+
+    _create_waitlist_index(conn, "ix_waitlist_referral_code")
+
+
+CONFIRMATION_COLUMNS = {
+    "confirmation_token": "VARCHAR(64)",
+    "confirmed_at": "TIMESTAMP",
+    "confirmation_sent_at": "TIMESTAMP",
+    "confirmation_attempts": "INTEGER NOT NULL DEFAULT 0",
+    "confirmation_due_at": "TIMESTAMP",
+}
+
+
+def add_confirmations(conn):
+    # Existing signups predate double opt-in and are not sent a confirmation
+    _add_waitlist_columns(conn, CONFIRMATION_COLUMNS)
+    _create_waitlist_index(conn, "ix_waitlist_confirmation_token")
+    _create_waitlist_index(conn, "ix_waitlist_confirmation_due")
+
+
+def create_signup_rollups(conn):
+    # Filled by live aggregation; earlier days come from `python cli.py backfill-rollups`
+    SignupRollup.__table__.create(conn, checkfirst=True)
+
+
+# Indexes made redundant by migration 7: the email's own unique index, and a
+# plain index duplicating the primary key
+REDUNDANT_WAITLIST_INDEXES = ("ix_waitlist_email", "ix_waitlist_id")
+
+# Fills email_hash for rows inserted by workers that predate migration 6
+FILL_EMAIL_HASH_FUNCTION = """
+CREATE OR REPLACE FUNCTION waitlist_fill_email_hash() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.email_hash IS NULL THEN
+        NEW.email_hash := decode(md5(NEW.email), 'hex');
+    END IF;
+    RETURN NEW;
+END $$
+"""
+
+
+def _autocommit(conn):
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    conn.commit()
+    return conn.execution_options(isolation_level="AUTOCOMMIT")
+
+
+def _end_autocommit(conn):
+    # Ends SQLAlchemy's (no-op) autobegun transaction so the level may change
+    conn.commit()
+    conn.execution_options(isolation_level=conn.default_isolation_level)
+
+
+def _backfill_email_hash(conn):
+    # Each batch commits on its own, so locks and WAL stay per batch
+    if conn.dialect.name == "postgresql":
+        # Computed in the database by id range, so no rows travel to Python
+        last_id = conn.scalar(select(func.max(Waitlist.id))) or 0
+        for start in range(0, last_id, BACKFILL_BATCH_SIZE):
+            conn.execute(
+                text(
+                    "UPDATE waitlist SET email_hash = decode(md5(email), 'hex') "
+                    "WHERE id > :start AND id <= :end AND email_hash IS NULL"
+                ),
+                {"start": start, "end": start + BACKFILL_BATCH_SIZE},
+            )
+            conn.commit()
+        return
+
+    # SQLite has no md5()
+    stmt = (
+        update(Waitlist)
+        .where(Waitlist.id == bindparam("row_id"))
+        .values(email_hash=bindparam("digest"))
+    )
+    while True:
+        rows = conn.execute(
+            select(Waitlist.id, Waitlist.email).where(Waitlist.email_hash.is_(None)).limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(stmt, [{"row_id": row_id, "digest": email_hash(email)} for row_id, email in rows])
+        conn.commit()
+
+
+def add_email_hash(conn):
+    """
+    Expand step: add email_hash alongside the email index.
+
+    Workers from before this migration keep working while a deploy rolls
+    out: the column stays nullable, a trigger fills it in for their inserts
+    (PostgreSQL), and the email index their ON CONFLICT (email) names is
+    kept until migration 7.
+    """
+    if not _has_column(conn, "waitlist", "email_hash"):
+        ddl = "BYTEA" if conn.dialect.name == "postgresql" else "BLOB"
+        conn.execute(text(f"ALTER TABLE waitlist ADD COLUMN email_hash {ddl}"))
+
+    if conn.dialect.name != "postgresql":
+        _backfill_email_hash(conn)
+        _create_waitlist_index(conn, "ix_waitlist_email_hash")
+        return
+
+    conn.execute(text(FILL_EMAIL_HASH_FUNCTION))
+    conn.execute(text("DROP TRIGGER IF EXISTS waitlist_fill_email_hash ON waitlist"))
+    conn.execute(text(
+        "CREATE TRIGGER waitlist_fill_email_hash BEFORE INSERT OR UPDATE OF email ON waitlist "
+        "FOR EACH ROW EXECUTE FUNCTION waitlist_fill_email_hash()"
+    ))
+    conn.commit()
+    _backfill_email_hash(conn)
+
+    # Built without blocking signups; a build interrupted earlier leaves an
+    # invalid index behind, which is rebuilt
+    valid = conn.scalar(text(
+        "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass('ix_waitlist_email_hash')"
+    ))
+    _autocommit(conn)
+    try:
+        if valid is False:
+            conn.execute(text("DROP INDEX CONCURRENTLY ix_waitlist_email_hash"))
+        if valid is not True:
+            conn.execute(text("CREATE UNIQUE INDEX CONCURRENTLY ix_waitlist_email_hash ON waitlist (email_hash)"))
+    finally:
+        _end_autocommit(conn)
+
+
+def require_email_hash(conn):
+    """
+    Contract step: make email_hash mandatory and drop the indexes it replaces.
+
+    Only safe once no worker from before migration 6 is running, so
+    run_migrations applies it only when asked (``python cli.py migrate
+    --contract``) or on a database it creates from scratch.
+    """
+    # Rows that slipped past the trigger, e.g. while it was being created
+    _backfill_email_hash(conn)
+
+    if conn.dialect.name == "postgresql":
+        nullable = next(c for c in inspect(conn).get_columns("waitlist") if c["name"] == "email_hash")["nullable"]
+        if nullable:
+            # Validating a CHECK constraint scans without blocking writes, and
+            # SET NOT NULL then trusts it instead of scanning under a full lock
+            conn.execute(text("ALTER TABLE waitlist DROP CONSTRAINT IF EXISTS waitlist_email_hash_not_null"))
+            conn.execute(text(
+                "ALTER TABLE waitlist ADD CONSTRAINT waitlist_email_hash_not_null "
+                "CHECK (email_hash IS NOT NULL) NOT VALID"
+            ))
+            conn.commit()
+            conn.execute(text("ALTER TABLE waitlist VALIDATE CONSTRAINT waitlist_email_hash_not_null"))
+            conn.commit()
+            conn.execute(text("ALTER TABLE waitlist ALTER COLUMN email_hash SET NOT NULL"))
+            conn.execute(text("ALTER TABLE waitlist DROP CONSTRAINT waitlist_email_hash_not_null"))
+        conn.execute(text("DROP TRIGGER IF EXISTS waitlist_fill_email_hash ON waitlist"))
+        conn.execute(text("DROP FUNCTION IF EXISTS waitlist_fill_email_hash()"))
+        # Tables created outside these migrations may carry a UNIQUE constraint as well
+        conn.execute(text("ALTER TABLE waitlist DROP CONSTRAINT IF EXISTS waitlist_email_key"))
+        redundant = [name for name in REDUNDANT_WAITLIST_INDEXES if _has_index(conn, "waitlist", name)]
+        _autocommit(conn)
+        try:
+            for name in redundant:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        finally:
+            _end_autocommit(conn)
+        return
+
+    # SQLite cannot make an added column NOT NULL
+    for name in REDUNDANT_WAITLIST_INDEXES:
+        if _has_index(conn, "waitlist", name):
+            conn.execute(text(f"DROP INDEX {name}"))
+
+
+def renormalize_email_domains(conn):
+    """
+    Store legacy Unicode email domains in the IDNA form signups now use.
+
+    Rows from before normalize_email was stored as ``email.lower().strip()``,
+    so ``user@bücher.de`` kept its Unicode domain while new signups store
+    ``user@xn--bcher-kva.de`` and hash that, letting the same address sign
+    up twice. Only rows with non-ASCII characters can differ; they are found
+    by comparing byte and character lengths, one scan without an index.
+    A row whose normalized address is already taken by a later signup is
+    left as is and logged, as merging two signups is a manual decision.
+    """
+    rows = conn.execute(
+        select(Waitlist.id, Waitlist.email, Waitlist.email_hash)
+        .where(func.length(cast(Waitlist.email, LargeBinary)) != func.length(Waitlist.email))
+    ).all()
+    # Claimed hashes of the partitioned layout (see db.partitioning) move with the row
+    partitioned = inspect(conn).has_table("waitlist_email_hashes")
+
+    updated = conflicts = 0
+    for row_id, email, old_hash in rows:
+        try:
+            normalized = normalize_email(email, canonicalize=False)
+        except InvalidEmail:
+            continue
+        if normalized == email:
+            continue
+        new_hash = email_hash(normalized)
+        duplicate = conn.scalar(select(Waitlist.id).where(Waitlist.email_hash == new_hash).limit(1))
+        if duplicate is not None:
+            logger.warning("Signup %d duplicates signup %d once IDNA-encoded; left unchanged", row_id, duplicate)
+            conflicts += 1
+            continue
+        conn.execute(
+            update(Waitlist).where(Waitlist.id == row_id).values(email=normalized, email_hash=new_hash)
+        )
+        if partitioned:
+            conn.execute(
+                text("UPDATE waitlist_email_hashes SET email_hash = :new WHERE email_hash = :old"),
+                {"new": new_hash, "old": old_hash},
+            )
+        updated += 1
+    logger.info("Re-normalized %d email domains (%d duplicates left unchanged)", updated, conflicts)
+
+
+# (version, description, function taking a Connection) in the order they apply
+MIGRATIONS = [
+    (1, "create waitlist table", create_waitlist_table),
+    (2, "add (created_at, id) index for keyset listing", add_listing_index),
+    (3, "add referral codes and referrer links", add_referrals),
+    (4, "add email confirmation tracking", add_confirmations),
+    (5, "create signup_rollups table", create_signup_rollups),
+    (6, "add email hash", add_email_hash),
+    (7, "require email hash and drop redundant indexes", require_email_hash),
+    (8, "re-normalize legacy Unicode email domains", renormalize_email_domains),
+]
+
+# Contract migrations break workers from the previous release, so they wait
+# until the deploy that shipped their expand step has fully rolled out
+CONTRACT_MIGRATIONS = {7}
+
+
+def current_version(conn) -> int:
+    if not inspect(conn).has_table("schema_migrations"):
+        return 0
+    versions = conn.execute(select(schema_migrations.c.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def run_migrations(engine, contract: bool = False) -> int:
+    """
+    Apply every pending migration.
+
+    Contract migrations (CONTRACT_MIGRATIONS) and everything after them are
+    held back unless contract is set or the database has no waitlist table
+    yet, since workers of the previous release may still be running.
+
+    Args:
+        engine: Synchronous engine to migrate
+        contract: Also apply contract migrations, once a deploy has rolled out
+
+    Returns:
+        Number of migrations applied
+    """
+    started = time.perf_counter()
+    applied = 0
+
+    with engine.connect() as conn:
+        is_postgres = conn.dialect.name == "postgresql"
+        if is_postgres:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            conn.commit()
+        try:
+            schema_migrations.create(conn, checkfirst=True)
+            conn.commit()
+
+            version = current_version(conn)
+            # Nothing can be running against a database created here
+            contract = contract or not inspect(conn).has_table("waitlist")
+            for migration_version, description, migrate in MIGRATIONS:
+                if migration_version <= version:
+                    continue
+                if migration_version in CONTRACT_MIGRATIONS and not contract:
+                    logger.warning(
+                        "Migration %d (%s) is pending; run `python cli.py migrate --contract` "
+                        "once no workers of the previous release are running",
+                        migration_version, description
+                    )
+                    break
+                logger.info("Applying migration %d: %s", migration_version, description)
+                migrate(conn)
+                conn.execute(schema_migrations.insert().values(
+                    version=migration_version,
+                    description=description,
+                    applied_at=datetime.utcnow(),
+                ))
+                conn.commit()
+                applied += 1
+        finally:
+            if is_postgres:
+                conn.rollback()
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                conn.commit()
+
+    logger.info(
+        "Schema up to date (%d migrations applied in %.0f ms)",
+        applied, (time.perf_counter() - started) * 1000
+    )
+    return applied
+
+
+if __name__ == "__main__":
+    from db import get_engine
+    from logging_config import configure_logging
+
+    configure_logging()
+    run_migrations(get_engine(), contract="--contract" in sys.argv[1:])
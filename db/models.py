@@ -1,18 +1,81 @@
-from sqlalchemy import Column, Integer, String, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-from datetime import datetime
-
-Base = declarative_base()
-
-class Waitlist(Base):
-    """
-    Waitlist table to store email addresses of users waiting for the application launch.
-    """
-    __tablename__ = "waitlist"
-    
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    email = Column(String(255), unique=True, nullable=False, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    
-    def __repr__(self):
-        return f"<Waitlist(id={self.id}, email={self.email}, created_at={self.created_at})>"
+from sqlalchemy import Column, ForeignKey, Integer, LargeBinary, String, DateTime, Index
+from sqlalchemy.ext.declarative import declarative_base
+from datetime import datetime
+import hashlib
+import secrets
+
+Base = declarative_base()
+
+def new_referral_code() -> str:
+    """Random 12-character URL-safe code identifying a signup in referral links."""
+    return secrets.token_urlsafe(9)
+
+def email_hash(email: str) -> bytes:
+    """
+    16-byte MD5 digest of a normalized email, the waitlist's uniqueness key.
+
+    Not a security measure: MD5 is used because PostgreSQL computes the same
+    value as ``decode(md5(email), 'hex')``, which backfills and bulk imports
+    rely on.
+    """
+    return hashlib.md5(email.encode("utf-8"), usedforsecurity=False).digest()
+
+def _default_email_hash(context) -> bytes:
+    return email_hash(context.get_current_parameters()["email"])
+
+class Waitlist(Base):
+    """
+    Waitlist table to store email addresses of users waiting for the application launch.
+    """
+    __tablename__ = "waitlist"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    email = Column(String(255), nullable=False)
+    # Uniqueness is enforced on this fixed-width digest rather than the email itself
+    email_hash = Column(LargeBinary(16), nullable=False, default=_default_email_hash)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Shared in referral links; rows from before referrals were backfilled by migration 3
+    referral_code = Column(String(16), default=new_referral_code)
+    # The signup whose referral link brought this one in
+    referred_by_id = Column(Integer, ForeignKey("waitlist.id"), nullable=True)
+    # Double opt-in: the token mailed to the user and when they clicked it
+    confirmation_token = Column(String(64))
+    confirmed_at = Column(DateTime)
+    confirmation_sent_at = Column(DateTime)
+    confirmation_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # When the confirmation email is next due; NULL once sent or given up on
+    confirmation_due_at = Column(DateTime)
+    
+    # Keyset pagination for the admin listing walks (created_at, id)
+    __table_args__ = (
+        Index("ix_waitlist_created_at_id", "created_at", "id"),
+        Index("ix_waitlist_email_hash", "email_hash", unique=True),
+        Index("ix_waitlist_referral_code", "referral_code", unique=True),
+        Index("ix_waitlist_confirmation_token", "confirmation_token", unique=True),
+        # Partial, so only rows still waiting for an email are indexed
+        Index(
+            "ix_waitlist_confirmation_due",
+            "confirmation_due_at",
+            postgresql_where=confirmation_due_at.isnot(None),
+            sqlite_where=confirmation_due_at.isnot(None),
+        ),
+    )
+    
+    def __repr__(self):
+        return f"<Waitlist(id={self.id}, email={self.email}, created_at={self.created_at}, referred_by_id={self.referred_by_id})>"
+
+class SignupRollup(Base):
+    """
+    Signup counts per time bucket, maintained by api.analytics and db.rollups.
+    """
+    __tablename__ = "signup_rollups"
+    
+    # "minute", "hour" or "day"
+    granularity = Column(String(8), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    # "direct" or "referral"
+    source = Column(String(16), primary_key=True)
+    signups = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<SignupRollup({self.granularity} {self.bucket_start} {self.source}: {self.signups})>"
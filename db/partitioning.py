@@ -0,0 +1,210 @@
+"""
+Time-range partitioning of the waitlist table on PostgreSQL.
+
+``python cli.py partition-waitlist`` converts the single waitlist heap into a
+table partitioned by month of created_at, so new signups and the listing's
+recent pages touch small, hot partitions and old months can later be
+detached and archived with ``ALTER TABLE ... DETACH PARTITION``.
+``python cli.py add-partitions`` creates the months ahead and should run
+from cron, say monthly; rows outside every month land in a DEFAULT partition.
+
+PostgreSQL only enforces uniqueness on a partitioned table with indexes that
+include the partition key, which would make any email unique per month
+only. Email uniqueness therefore moves to the unpartitioned
+waitlist_email_hashes table: a BEFORE INSERT trigger on waitlist claims the
+row's email_hash there and silently skips the insert when the hash is
+already taken, which is what ``INSERT ... ON CONFLICT DO NOTHING`` did
+before, RETURNING included. For the same reason the primary key becomes
+(id, created_at), ids stay unique through their sequence, referral codes
+and confirmation tokens lose their unique indexes (they are random 72- and
+192-bit values), and the referred_by_id foreign key is dropped.
+
+Requires PostgreSQL 13 or later, for row triggers on partitioned tables.
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import LargeBinary, column, func, select, table, text
+from db.migrations import ADVISORY_LOCK_KEY
+from db.models import Waitlist
+
+logger = logging.getLogger(__name__)
+
+# Unpartitioned table holding every waitlisted email_hash once partitioned;
+# its primary key is the only index that finds an email in one probe
+email_hashes = table("waitlist_email_hashes", column("email_hash", LargeBinary))
+
+# Indexes of the partitioned table, created on every partition. Unique ones
+# would have to include created_at, so none are.
+PARTITIONED_INDEXES = {
+    "ix_waitlist_created_at_id": "(created_at, id)",
+    "ix_waitlist_email_hash": "(email_hash)",
+    "ix_waitlist_referral_code": "(referral_code)",
+    "ix_waitlist_confirmation_token": "(confirmation_token)",
+    "ix_waitlist_confirmation_due": "(confirmation_due_at) WHERE confirmation_due_at IS NOT NULL",
+}
+
+CLAIM_EMAIL_HASH_FUNCTION = """
+CREATE OR REPLACE FUNCTION waitlist_claim_email_hash() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO waitlist_email_hashes (email_hash) VALUES (NEW.email_hash)
+    ON CONFLICT DO NOTHING;
+    IF NOT FOUND THEN
+        -- Already waitlisted: skip the row like ON CONFLICT DO NOTHING
+        RETURN NULL;
+    END IF;
+    RETURN NEW;
+END $$
+"""
+
+RELEASE_EMAIL_HASH_FUNCTION = """
+CREATE OR REPLACE FUNCTION waitlist_release_email_hash() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM waitlist_email_hashes WHERE email_hash = OLD.email_hash;
+    RETURN NULL;
+END $$
+"""
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(start: datetime) -> datetime:
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+
+def months_from_now(months: int) -> datetime:
+    """Start of the month ``months`` months after the current one."""
+    start = month_start(datetime.utcnow())
+    for _ in range(months):
+        start = next_month(start)
+    return start
+
+
+def is_partitioned(conn, table: str = "waitlist") -> bool:
+    """Whether the table exists and is partitioned."""
+    # Cast, as asyncpg returns the "char" type as bytes
+    kind = conn.scalar(
+        text("SELECT relkind::text FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table},
+    )
+    return kind == "p"
+
+
+def create_month_partitions(conn, first: datetime, last: datetime, table: str = "waitlist") -> int:
+    """
+    Create the monthly partitions covering first through last.
+
+    Fails if the DEFAULT partition already holds rows for one of the new
+    months, which is why partitions should be created ahead of time.
+
+    Args:
+        conn: Connection inside a transaction
+        first: Any moment in the first month
+        last: Any moment in the last month
+        table: Partitioned table to add to
+
+    Returns:
+        Number of partitions created
+    """
+    created = 0
+    start = month_start(first)
+    while start <= last:
+        end = next_month(start)
+        name = f"{table}_{start:%Y_%m}"
+        if conn.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is None:
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            created += 1
+        start = end
+    return created
+
+
+def add_partitions(conn, months_ahead: int) -> int:
+    """
+    Create any missing partitions from this month to months_ahead months out.
+
+    Args:
+        conn: Connection inside a transaction
+        months_ahead: Months after the current one to cover
+
+    Returns:
+        Number of partitions created
+    """
+    return create_month_partitions(conn, datetime.utcnow(), months_from_now(months_ahead))
+
+
+def partition_waitlist(conn, months_ahead: int, lock_timeout: str = "10s") -> int:
+    """
+    Rebuild the waitlist table as a table partitioned by month of created_at.
+
+    Runs in the caller's transaction and holds an exclusive lock on waitlist
+    for the whole copy, so signups wait (or, with WAITLIST_SPOOL_DIR set,
+    are spooled by the API) until it commits. Expect roughly the time of
+    ``CREATE TABLE ... AS SELECT`` plus index builds for the table's size:
+    on one CPU with PostgreSQL 16, 15 s for 1M rows and 10 minutes for 50M
+    (bench_schema.py). Run migrations first, including the contract step
+    (``python cli.py migrate --contract``): email_hash must be filled in and
+    required. Restart the API afterwards, as each process detects the
+    layout once.
+
+    Args:
+        conn: Connection inside a transaction
+        months_ahead: Months after the current one to create partitions for
+        lock_timeout: How long to wait for running queries to release waitlist
+
+    Returns:
+        Number of rows moved
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+    conn.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+    conn.execute(text("LOCK TABLE waitlist IN ACCESS EXCLUSIVE MODE"))
+
+    sequence = conn.scalar(text("SELECT pg_get_serial_sequence('waitlist', 'id')"))
+    primary_key = conn.scalar(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = 'waitlist'::regclass AND contype = 'p'"
+    ))
+    first = conn.scalar(select(func.min(Waitlist.created_at))) or datetime.utcnow()
+
+    # Constraint and index names are per schema, so the old ones make way
+    conn.execute(text("ALTER TABLE waitlist RENAME TO waitlist_unpartitioned"))
+    conn.execute(text(
+        f"ALTER TABLE waitlist_unpartitioned RENAME CONSTRAINT {primary_key} TO waitlist_unpartitioned_pkey"
+    ))
+    # Keep the id sequence alive when the old table is dropped
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    conn.execute(text(
+        "CREATE TABLE waitlist (LIKE waitlist_unpartitioned INCLUDING DEFAULTS, "
+        "PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)"
+    ))
+    conn.execute(text("CREATE TABLE waitlist_default PARTITION OF waitlist DEFAULT"))
+    created = create_month_partitions(conn, first, months_from_now(months_ahead))
+
+    conn.execute(text("CREATE TABLE waitlist_email_hashes (email_hash BYTEA PRIMARY KEY)"))
+    conn.execute(text("INSERT INTO waitlist_email_hashes SELECT email_hash FROM waitlist_unpartitioned"))
+    moved = conn.execute(text("INSERT INTO waitlist SELECT * FROM waitlist_unpartitioned")).rowcount
+    conn.execute(text("DROP TABLE waitlist_unpartitioned"))
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY waitlist.id"))
+
+    # Built after the copy, which is faster than maintaining them row by row
+    for name, columns in PARTITIONED_INDEXES.items():
+        conn.execute(text(f"CREATE INDEX {name} ON waitlist {columns}"))
+
+    conn.execute(text(CLAIM_EMAIL_HASH_FUNCTION))
+    conn.execute(text(RELEASE_EMAIL_HASH_FUNCTION))
+    conn.execute(text(
+        "CREATE TRIGGER waitlist_claim_email_hash BEFORE INSERT ON waitlist "
+        "FOR EACH ROW EXECUTE FUNCTION waitlist_claim_email_hash()"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER waitlist_release_email_hash AFTER DELETE ON waitlist "
+        "FOR EACH ROW EXECUTE FUNCTION waitlist_release_email_hash()"
+    ))
+    conn.execute(text("ANALYZE waitlist"))
+
+    logger.info("Partitioned waitlist: %d rows moved into %d monthly partitions", moved, created)
+    return moved
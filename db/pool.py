@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Defaults mirror SQLAlchemy's QueuePool, except that connections are
+# recycled every 30 minutes, which is what lets pre-ping default to off
+POOL_DEFAULTS = {
+    "DB_POOL_SIZE": 5,
+    "DB_MAX_OVERFLOW": 10,
+    "DB_POOL_TIMEOUT": 30,
+    "DB_POOL_RECYCLE": 1800,
+}
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def pool_options(url, metered: bool = False) -> dict:
+    """
+    Build connection pool keyword arguments from the environment.
+
+    Reads DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE and
+    DB_POOL_PRE_PING. In-memory SQLite databases use a single shared
+    connection, so only pre-ping applies to them.
+
+    Pre-ping is off by default: it costs a round trip on every checkout.
+    Connections are instead recycled before server idle timeouts can close
+    them, and one that drops anyway fails a single statement, after which
+    SQLAlchemy's disconnect handling invalidates it and every older pooled
+    connection. Set DB_POOL_PRE_PING=true where idle connections are cut
+    by something faster than DB_POOL_RECYCLE, such as a proxy.
+
+    Args:
+        url: Database URL the engine will connect to
+        metered: Use MeteredAsyncQueuePool so checkout waits and connects are recorded
+
+    Returns:
+        Keyword arguments for create_engine / create_async_engine
+    """
+    options = {"pool_pre_ping": _env_flag("DB_POOL_PRE_PING", False)}
+
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+
+    options.update(
+        pool_size=int(os.getenv("DB_POOL_SIZE", POOL_DEFAULTS["DB_POOL_SIZE"])),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", POOL_DEFAULTS["DB_MAX_OVERFLOW"])),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", POOL_DEFAULTS["DB_POOL_TIMEOUT"])),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", POOL_DEFAULTS["DB_POOL_RECYCLE"])),
+    )
+    if metered:
+        options["poolclass"] = MeteredAsyncQueuePool
+    return options
+
+
+def split_connection_budget(budget: int, workers: int) -> tuple:
+    """
+    Divide a database connection budget between worker processes.
+
+    Each worker keeps two thirds of its share as persistent pool connections
+    and the rest as overflow, so the sum of every worker's pool_size and
+    max_overflow never exceeds the budget.
+
+    Args:
+        budget: Connections this replica may open in total (DB_MAX_CONNECTIONS)
+        workers: Number of worker processes sharing the budget
+
+    Returns:
+        (pool_size, max_overflow) for each worker
+
+    Raises:
+        ValueError: If the budget is smaller than the number of workers
+    """
+    per_worker = budget // workers
+    if per_worker < 1:
+        raise ValueError(f"DB_MAX_CONNECTIONS={budget} cannot give each of {workers} workers a connection")
+    pool_size = max(1, per_worker * 2 // 3)
+    return pool_size, per_worker - pool_size
+
+
+class PoolStats:
+    """
+    Running totals of how long callers waited to check out a connection.
+
+    Wait time covers queueing for a free connection only; time spent opening
+    new connections (including reconnects after recycling) is recorded
+    separately as connect time, so a slow server handshake does not look
+    like an undersized pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.connects = 0
+        self.total_connect = 0.0
+        self.max_connect = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += waited
+            if waited > self.max_wait:
+                self.max_wait = waited
+
+    def record_connect(self, elapsed: float):
+        with self._lock:
+            self.connects += 1
+            self.total_connect += elapsed
+            if elapsed > self.max_connect:
+                self.max_connect = elapsed
+
+    def snapshot(self, pool) -> dict:
+        """
+        Combine the wait totals with the pool's current occupancy.
+
+        Args:
+            pool: The engine's connection pool
+
+        Returns:
+            Dictionary of pool size, checked-out/overflow counts, wait and connect times
+        """
+        with self._lock:
+            avg_wait = self.total_wait / self.checkouts if self.checkouts else 0.0
+            avg_connect = self.total_connect / self.connects if self.connects else 0.0
+            stats = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(avg_wait * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "connects": self.connects,
+                "avg_connect_ms": round(avg_connect * 1000, 3),
+                "max_connect_ms": round(self.max_connect * 1000, 3),
+            }
+
+        stats.update(self.occupancy(pool))
+        return stats
+
+    @staticmethod
+    def occupancy(pool) -> dict:
+        """Current size and checked-out/overflow counts of a queue pool, if it has them."""
+        if not hasattr(pool, "checkedout"):
+            return {}
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+        }
+
+
+pool_stats = PoolStats()
+
+# Seconds the current checkout has spent opening connections, so connect()
+# can leave them out of its wait time. A context variable rather than a
+# thread-local because concurrent checkouts share the event loop's thread.
+_checkout_connect_time = ContextVar("checkout_connect_time", default=None)
+
+
+class MeteredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records checkout wait and connect times in pool_stats.
+    """
+
+    # Log under sqlalchemy.* like the stock pools, which SQLAlchemy keeps at WARNING
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.MeteredAsyncQueuePool"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Every new or recycled connection is opened through _invoke_creator
+        invoke_creator = self._invoke_creator
+
+        def timed_creator(record):
+            started = time.perf_counter()
+            try:
+                return invoke_creator(record)
+            finally:
+                elapsed = time.perf_counter() - started
+                pool_stats.record_connect(elapsed)
+                spent = _checkout_connect_time.get()
+                if spent is not None:
+                    spent[0] += elapsed
+
+        self._invoke_creator = timed_creator
+
+    def connect(self):
+        spent = [0.0]
+        token = _checkout_connect_time.set(spent)
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            pool_stats.record(time.perf_counter() - started - spent[0], timed_out=True)
+            raise
+        finally:
+            _checkout_connect_time.reset(token)
+        pool_stats.record(time.perf_counter() - started - spent[0])
+        return connection
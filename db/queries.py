@@ -0,0 +1,314 @@
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import bindparam, func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import Waitlist, email_hash, new_referral_code
+from db.partitioning import email_hashes, is_partitioned
+
+
+def signup_values(email: str, referral_code: Optional[str] = None, confirm: bool = False) -> dict:
+    """
+    Build the column values for one signup.
+
+    The referrer is resolved inside the INSERT with a scalar subquery on the
+    unique referral_code index, so crediting a referral costs no extra round
+    trip. Unknown codes leave referred_by_id NULL. With confirm set the row
+    is stored with a confirmation token and queued for the confirmation
+    worker, so no email work happens on the request path.
+
+    created_at is set here rather than by the column default so the caller
+    knows which analytics buckets the signup falls into. Every call returns
+    the same keys, as multi-row inserts require.
+
+    Args:
+        email: Normalized email address
+        referral_code: Code from the referral link the user signed up through
+        confirm: Queue a double opt-in confirmation email
+
+    Returns:
+        Values for insert_waitlist_email / insert_waitlist_emails
+    """
+    values = {
+        "email": email,
+        "email_hash": email_hash(email),
+        "created_at": datetime.utcnow(),
+        "referral_code": new_referral_code(),
+        "referred_by_id": None,
+        "confirmation_token": None,
+        "confirmation_due_at": None,
+    }
+    if referral_code:
+        values["referred_by_id"] = (
+            select(Waitlist.id).where(Waitlist.referral_code == referral_code).scalar_subquery()
+        )
+    if confirm:
+        values["confirmation_token"] = secrets.token_urlsafe(24)
+        values["confirmation_due_at"] = datetime.utcnow()
+    return values
+
+
+# Columns read back from every signup insert
+SIGNUP_RETURNING = (Waitlist.id, Waitlist.email, Waitlist.referral_code, Waitlist.referred_by_id)
+
+# Whether the waitlist is partitioned (see db.partitioning); checked on the
+# first insert, so the API must be restarted after partitioning the table
+_partitioned = None
+
+
+async def waitlist_is_partitioned(db: AsyncSession) -> bool:
+    """Whether signup inserts target a partitioned table, cached per process."""
+    global _partitioned
+    if _partitioned is None:
+        _partitioned = db.get_bind().dialect.name == "postgresql" and await db.run_sync(
+            lambda session: is_partitioned(session.connection())
+        )
+    return _partitioned
+
+
+def on_email_conflict_do_nothing(stmt, partitioned: bool):
+    """
+    Skip rows whose email is already waitlisted.
+
+    Only the unique email_hash index is named, so a collision on any other
+    unique column still raises. A partitioned table has no such index; its
+    insert trigger skips duplicate emails instead.
+    """
+    if partitioned:
+        return stmt.on_conflict_do_nothing()
+    return stmt.on_conflict_do_nothing(index_elements=[Waitlist.email_hash])
+
+
+async def insert_waitlist_email(db: AsyncSession, values: dict):
+    """
+    Insert one signup in a single atomic statement.
+
+    On PostgreSQL and SQLite this issues
+    ``INSERT ... ON CONFLICT (email_hash) DO NOTHING RETURNING ...`` so the
+    duplicate check, the insert and reading back the new row all happen in
+    one round trip, and concurrent signups for the same email cannot race
+    into a unique violation (see on_email_conflict_do_nothing for
+    partitioned tables). Other dialects fall back to a plain insert and
+    treat an integrity error as a duplicate.
+
+    Args:
+        db: Async database session
+        values: Column values from signup_values()
+
+    Returns:
+        The inserted ``(id, email, referral_code, referred_by_id)`` row, or
+        None if the email is already waitlisted
+    """
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = on_email_conflict_do_nothing(
+            dialect_insert(Waitlist)
+            .values(**values)
+            .returning(*SIGNUP_RETURNING),
+            await waitlist_is_partitioned(db),
+        )
+        row = (await db.execute(stmt)).first()
+        await db.commit()
+        return row
+
+    try:
+        result = await db.execute(insert(Waitlist).values(**values))
+        row = (await db.execute(
+            select(*SIGNUP_RETURNING).where(Waitlist.id == result.inserted_primary_key[0])
+        )).first()
+        await db.commit()
+        return row
+    except IntegrityError:
+        await db.rollback()
+        return None
+
+
+async def count_waitlist(db: AsyncSession) -> int:
+    """
+    Count waitlist entries with a plain ``SELECT count(*) FROM waitlist``.
+
+    Args:
+        db: Async database session
+
+    Returns:
+        Total number of waitlist entries
+    """
+    return await db.scalar(select(func.count()).select_from(Waitlist))
+
+
+async def insert_waitlist_emails(db: AsyncSession, rows) -> dict:
+    """
+    Insert many signups with one multi-row ``INSERT ... ON CONFLICT DO NOTHING``.
+
+    Args:
+        db: Async database session
+        rows: signup_values() dicts with distinct emails
+
+    Returns:
+        Mapping of newly inserted email to its returned row; duplicates are absent
+    """
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = on_email_conflict_do_nothing(
+            dialect_insert(Waitlist)
+            .values(rows)
+            .returning(*SIGNUP_RETURNING),
+            await waitlist_is_partitioned(db),
+        )
+        inserted = (await db.execute(stmt)).all()
+        await db.commit()
+        return {row.email: row for row in inserted}
+
+    inserted = {}
+    for values in rows:
+        row = await insert_waitlist_email(db, values)
+        if row is not None:
+            inserted[row.email] = row
+    return inserted
+
+
+async def email_exists(db: AsyncSession, email: str) -> bool:
+    """
+    Check the unique email_hash index for an existing waitlist entry.
+
+    A partitioned waitlist has an email_hash index per partition, so the
+    hash is looked up in waitlist_email_hashes instead.
+
+    Args:
+        db: Async database session
+        email: Normalized email address
+
+    Returns:
+        True if the email is already waitlisted
+    """
+    digest = email_hash(email)
+    if await waitlist_is_partitioned(db):
+        stmt = select(email_hashes.c.email_hash).where(email_hashes.c.email_hash == digest)
+    else:
+        stmt = select(Waitlist.id).where(Waitlist.email_hash == digest).limit(1)
+    return await db.scalar(stmt) is not None
+
+
+def waitlist_listing_query(after=None, limit=None):
+    """
+    Build a keyset-paginated query over waitlist entries.
+
+    Rows are ordered by ``(created_at, id)`` and resumed strictly after the
+    given position, so each page is an index range scan rather than an
+    OFFSET that re-reads every earlier row.
+
+    Args:
+        after: ``(created_at, id)`` of the last row already seen, or None
+        limit: Maximum number of rows, or None for all remaining rows
+
+    Returns:
+        Select statement yielding id, email and created_at
+    """
+    stmt = select(Waitlist.id, Waitlist.email, Waitlist.created_at).order_by(
+        Waitlist.created_at, Waitlist.id
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(Waitlist.created_at, Waitlist.id) > tuple_(*after))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+async def confirm_signup(db: AsyncSession, token: str) -> Optional[bool]:
+    """
+    Mark the signup holding a confirmation token as confirmed.
+
+    Args:
+        db: Async database session
+        token: Token from the confirmation link
+
+    Returns:
+        True if newly confirmed, False if it was already confirmed, None if
+        the token is unknown
+    """
+    result = await db.execute(
+        update(Waitlist.__table__)
+        .where(Waitlist.confirmation_token == token, Waitlist.confirmed_at.is_(None))
+        .values(confirmed_at=datetime.utcnow(), confirmation_due_at=None)
+    )
+    await db.commit()
+    if result.rowcount:
+        return True
+    if await db.scalar(select(Waitlist.id).where(Waitlist.confirmation_token == token)) is not None:
+        return False
+    return None
+
+
+async def claim_due_confirmations(db: AsyncSession, limit: int, lease: float) -> list:
+    """
+    Claim a batch of signups whose confirmation email is due.
+
+    Rows are selected with ``FOR UPDATE SKIP LOCKED`` on PostgreSQL, so
+    concurrent workers claim disjoint batches, and their due time is pushed
+    out by ``lease`` seconds before committing. Sending then happens outside
+    the transaction; if the worker dies, the rows become due again once the
+    lease expires.
+
+    Args:
+        db: Async database session
+        limit: Maximum rows to claim
+        lease: Seconds the claim is held
+
+    Returns:
+        Rows of id, email, confirmation_token and confirmation_attempts
+    """
+    now = datetime.utcnow()
+    rows = (await db.execute(
+        select(
+            Waitlist.id, Waitlist.email, Waitlist.confirmation_token, Waitlist.confirmation_attempts
+        )
+        .where(Waitlist.confirmation_due_at <= now)
+        .order_by(Waitlist.confirmation_due_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )).all()
+    if rows:
+        await db.execute(
+            update(Waitlist.__table__)
+            .where(Waitlist.id.in_([row.id for row in rows]))
+            .values(confirmation_due_at=now + timedelta(seconds=lease))
+        )
+    await db.commit()
+    return rows
+
+
+async def record_confirmation_results(db: AsyncSession, sent_ids, retries):
+    """
+    Store the outcome of a batch of confirmation emails.
+
+    Args:
+        db: Async database session
+        sent_ids: Ids whose email was delivered
+        retries: ``(id, attempts, due_at)`` for failed sends; a due_at of None
+            gives up on that row
+    """
+    table = Waitlist.__table__
+    if sent_ids:
+        await db.execute(
+            update(table)
+            .where(table.c.id.in_(sent_ids))
+            .values(
+                confirmation_sent_at=datetime.utcnow(),
+                confirmation_due_at=None,
+                confirmation_attempts=table.c.confirmation_attempts + 1,
+            )
+        )
+    if retries:
+        await db.execute(
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values(confirmation_attempts=bindparam("attempts"), confirmation_due_at=bindparam("due_at")),
+            [{"row_id": row_id, "attempts": attempts, "due_at": due_at} for row_id, attempts, due_at in retries],
+        )
+    await db.commit()
@@ -0,0 +1,228 @@
+"""
+Read/write routing between the primary database and an optional read replica.
+
+Read-only endpoints take their session from get_read_db(). While the
+replica is reachable and no more than REPLICA_MAX_LAG seconds behind, that
+session sends SELECTs to the replica; writes, SELECT ... FOR UPDATE and
+every statement after a write go to the primary, so a session always reads
+its own writes. Otherwise the session is a plain primary session.
+
+Replica health is checked by a background task (ReplicaRouter.run), never
+on the request path. A connection or query error on the replica marks it
+unhealthy at once, and reads fall back to the primary until the next check
+succeeds. The read that failed is retried once on the primary, so the
+request it belongs to still succeeds; only an error while iterating an
+already started stream cannot be retried.
+"""
+import asyncio
+import logging
+import os
+import time
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from db import get_async_engine, get_replica_async_engine, new_async_session
+
+logger = logging.getLogger(__name__)
+
+# Seconds of replay lag; zero when the standby has replayed all WAL it received,
+# so an idle primary does not make a caught-up replica look stale
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+async def measure_lag(conn) -> float:
+    """
+    Seconds the replica is behind the primary.
+
+    Only PostgreSQL reports replication lag; other databases are checked for
+    liveness and assumed current.
+    """
+    if conn.dialect.name == "postgresql":
+        return float(await conn.scalar(POSTGRES_LAG_QUERY))
+    await conn.execute(text("SELECT 1"))
+    return 0.0
+
+
+class RoutingSession(Session):
+    """
+    Session sending reads to a replica engine and everything else to its bind.
+
+    Used as the sync_session_class of the AsyncSessions from new_read_session().
+    """
+
+    def __init__(self, *args, replica=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica = replica
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        is_read = (
+            clause is not None
+            and getattr(clause, "is_select", False)
+            and getattr(clause, "_for_update_arg", None) is None
+        )
+        if self.replica is not None and is_read and not self.wrote and not self._flushing:
+            return self.replica
+        self.wrote = True
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+class ReadSession(AsyncSession):
+    """
+    AsyncSession that retries a read failing on the replica on the primary.
+
+    A read goes to the replica only while the session has not written, so
+    rolling back before the retry discards nothing.
+    """
+
+    async def _read(self, method, *args, **kwargs):
+        sync_session = self.sync_session
+        if sync_session.replica is None or sync_session.wrote:
+            return await method(*args, **kwargs)
+        try:
+            return await method(*args, **kwargs)
+        except (exc.DBAPIError, OSError) as e:
+            # Already retried by a nested call (scalars() runs execute())
+            if sync_session.wrote or sync_session.replica is None:
+                raise
+            # The handle_error listener has usually reported it already
+            if replica_router.healthy:
+                replica_router.mark_failed(e)
+            replica_router.fallbacks += 1
+            logger.warning("Retrying a failed replica read on the primary: %s", e)
+            await self.rollback()
+            sync_session.replica = None
+            return await method(*args, **kwargs)
+
+    async def execute(self, *args, **kwargs):
+        return await self._read(super().execute, *args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return await self._read(super().scalar, *args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return await self._read(super().scalars, *args, **kwargs)
+
+    async def stream(self, *args, **kwargs):
+        return await self._read(super().stream, *args, **kwargs)
+
+    async def stream_scalars(self, *args, **kwargs):
+        return await self._read(super().stream_scalars, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Decides whether reads may use the replica.
+
+    A background task measures replication lag every ``check_interval``
+    seconds; the replica is used while the last check succeeded within
+    ``max_lag`` and no query on it has failed since.
+    """
+
+    def __init__(self, max_lag: float, check_interval: float, timeout: float = 2.0):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.healthy = False
+        self.lag = None
+        self.checks = 0
+        self.errors = 0
+        self.replica_sessions = 0
+        self.primary_sessions = 0
+        self.fallbacks = 0
+
+    def _set_healthy(self, healthy: bool, reason: str):
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Serving reads from the replica (%s)", reason)
+            else:
+                logger.warning("Serving reads from the primary: %s", reason)
+        self.healthy = healthy
+
+    async def check(self, engine):
+        """Measure the replica's lag and update its health."""
+        self.checks += 1
+        try:
+            async with engine.connect() as conn:
+                self.lag = await asyncio.wait_for(measure_lag(conn), self.timeout)
+        except Exception as e:
+            self.lag = None
+            self._set_healthy(False, f"replica check failed: {e}")
+            return
+        if self.lag > self.max_lag:
+            self._set_healthy(False, f"replica is {self.lag:.1f}s behind")
+        else:
+            self._set_healthy(True, f"lag {self.lag:.1f}s")
+
+    def mark_failed(self, error):
+        """Stop using the replica after an error on it, until the next good check."""
+        self.errors += 1
+        self._set_healthy(False, f"replica query failed: {error}")
+
+    def watch(self, engine):
+        """Report errors raised on the replica engine to mark_failed."""
+        event.listen(engine.sync_engine, "handle_error", lambda context: self.mark_failed(context.original_exception))
+
+    async def run(self, engine):
+        """Check the replica every check_interval seconds until cancelled."""
+        self.watch(engine)
+        while True:
+            await self.check(engine)
+            await asyncio.sleep(self.check_interval)
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "checks": self.checks,
+            "errors": self.errors,
+            "replica_sessions": self.replica_sessions,
+            "primary_sessions": self.primary_sessions,
+            "fallbacks": self.fallbacks,
+        }
+
+
+# Most replication lag, in seconds, at which reads still go to the replica
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+# Seconds between replica lag checks
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "1"))
+
+replica_router = ReplicaRouter(REPLICA_MAX_LAG, REPLICA_CHECK_INTERVAL)
+
+_read_session_factory = None
+
+
+def new_read_session() -> AsyncSession:
+    """Open a session for read-mostly work, routed as described in the module docstring."""
+    global _read_session_factory
+    replica = get_replica_async_engine()
+    if replica is None or not replica_router.healthy:
+        replica_router.primary_sessions += 1
+        return new_async_session()
+
+    if _read_session_factory is None:
+        _read_session_factory = async_sessionmaker(
+            bind=get_async_engine(),
+            class_=ReadSession,
+            sync_session_class=RoutingSession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    replica_router.replica_sessions += 1
+    return _read_session_factory(replica=replica.sync_engine)
+
+
+async def get_read_db():
+    """
+    Dependency function to get a session for read-only endpoints.
+    Yields an AsyncSession reading from the replica when it is healthy and
+    fresh, and retrying on the primary any read that fails there.
+    """
+    async with new_read_session() as db:
+        yield db
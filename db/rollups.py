@@ -0,0 +1,193 @@
+"""
+Signup counts rolled up per minute, hour and day.
+
+Each signup adds one to three rollup rows, one per granularity, keyed by
+bucket start and source ("direct" or "referral"). A referred signup also
+counts towards its referrer's hourly and daily buckets, stored under the
+source ``ref:<referrer id>``. Counts are only ever added with an upsert, so
+several processes can flush into the same buckets; time series are read
+back from the rollups without touching the waitlist table.
+
+Live signups are counted by api.analytics and bulk imports by cli.py;
+``python cli.py backfill-rollups`` rebuilds whole days from the table.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import SignupRollup, Waitlist
+
+GRANULARITIES = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+SOURCES = ("direct", "referral")
+
+# Per-referrer buckets; minute ones would add a row per referrer per minute
+REFERRER_GRANULARITIES = ("hour", "day")
+REFERRER_SOURCE_PREFIX = "ref:"
+
+# Rollup rows per INSERT, within SQLite's limit of bound parameters
+ROLLUP_BATCH_SIZE = 5000
+
+
+def truncate(moment: datetime, granularity: str) -> datetime:
+    """Start of the bucket containing moment."""
+    if granularity == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def referrer_source(referrer_id: int) -> str:
+    """Rollup source holding the signups referred by one user."""
+    return f"{REFERRER_SOURCE_PREFIX}{referrer_id}"
+
+
+def rollup_keys(created_at: datetime, referrer_id=None):
+    """``(granularity, bucket_start, source)`` of every bucket a signup counts towards."""
+    source = "referral" if referrer_id is not None else "direct"
+    keys = [(granularity, truncate(created_at, granularity), source) for granularity in GRANULARITIES]
+    if referrer_id is not None:
+        source = referrer_source(referrer_id)
+        keys.extend((granularity, truncate(created_at, granularity), source) for granularity in REFERRER_GRANULARITIES)
+    return keys
+
+
+def _rows(counts) -> list:
+    return [
+        {"granularity": granularity, "bucket_start": bucket_start, "source": source, "signups": signups}
+        for (granularity, bucket_start, source), signups in counts.items()
+    ]
+
+
+def upsert_statement(dialect: str, rows: list):
+    """
+    ``INSERT ... ON CONFLICT DO UPDATE`` adding rows' counts to existing buckets.
+
+    Returns None for dialects without ON CONFLICT.
+    """
+    if dialect not in ("postgresql", "sqlite"):
+        return None
+    dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = dialect_insert(SignupRollup).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[SignupRollup.granularity, SignupRollup.bucket_start, SignupRollup.source],
+        set_={"signups": SignupRollup.signups + stmt.excluded.signups},
+    )
+
+
+async def add_rollup_counts(db: AsyncSession, counts):
+    """
+    Add in-process counts to the rollup table in one statement.
+
+    Args:
+        db: Async database session
+        counts: Mapping of ``(granularity, bucket_start, source)`` to new signups
+    """
+    rows = _rows(counts)
+    stmt = upsert_statement(db.get_bind().dialect.name, rows)
+    if stmt is not None:
+        await db.execute(stmt)
+    else:
+        table = SignupRollup.__table__
+        for row in rows:
+            result = await db.execute(
+                update(table)
+                .where(
+                    table.c.granularity == row["granularity"],
+                    table.c.bucket_start == row["bucket_start"],
+                    table.c.source == row["source"],
+                )
+                .values(signups=table.c.signups + row["signups"])
+            )
+            if not result.rowcount:
+                await db.execute(table.insert().values(**row))
+    await db.commit()
+
+
+def add_rollups(conn, counts):
+    """
+    Add counts to the rollup table in the caller's transaction.
+
+    Used by bulk imports, which count the rows they insert; PostgreSQL and
+    SQLite only, like the imports.
+
+    Args:
+        conn: Synchronous connection inside a transaction
+        counts: Mapping of ``(granularity, bucket_start, source)`` to new signups
+    """
+    rows = _rows(counts)
+    for start in range(0, len(rows), ROLLUP_BATCH_SIZE):
+        conn.execute(upsert_statement(conn.dialect.name, rows[start:start + ROLLUP_BATCH_SIZE]))
+
+
+def backfill_rollups(engine, since: datetime, until: datetime, batch_size: int = 10000) -> int:
+    """
+    Rebuild the rollups for whole days in [since, until) from the waitlist table.
+
+    Both bounds are truncated to midnight. Existing rollups in the range are
+    replaced in the same transaction, so the command can be rerun safely. The
+    range should end before the day live aggregation started, or it would
+    overwrite live counts with the rows committed so far.
+
+    Args:
+        engine: Synchronous engine
+        since: First day to rebuild
+        until: Day after the last day to rebuild
+        batch_size: Rows fetched per round trip
+
+    Returns:
+        Number of signups counted
+    """
+    since, until = truncate(since, "day"), truncate(until, "day")
+    counts = Counter()
+    signups = 0
+
+    stmt = select(Waitlist.created_at, Waitlist.referred_by_id).where(
+        Waitlist.created_at >= since, Waitlist.created_at < until
+    )
+    with engine.begin() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        for created_at, referred_by_id in result:
+            counts.update(rollup_keys(created_at, referred_by_id))
+            signups += 1
+
+        conn.execute(
+            delete(SignupRollup).where(SignupRollup.bucket_start >= since, SignupRollup.bucket_start < until)
+        )
+        rows = _rows(counts)
+        for start in range(0, len(rows), batch_size):
+            conn.execute(SignupRollup.__table__.insert(), rows[start:start + batch_size])
+    return signups
+
+
+async def rollup_series(db: AsyncSession, granularity: str, start: datetime, end: datetime, source=None) -> dict:
+    """
+    Signup counts per bucket in [start, end), summed over sources unless one is given.
+
+    Reads only the rollup rows in the range via the primary key. The sum
+    covers "direct" and "referral" only, as per-referrer rows count the same
+    signups again; pass ``referrer_source(id)`` for one referrer's series.
+
+    Returns:
+        Mapping of bucket start to signups; empty buckets are absent
+    """
+    stmt = select(SignupRollup.bucket_start, SignupRollup.signups).where(
+        SignupRollup.granularity == granularity,
+        SignupRollup.bucket_start >= start,
+        SignupRollup.bucket_start < end,
+    )
+    if source:
+        stmt = stmt.where(SignupRollup.source == source)
+    else:
+        stmt = stmt.where(SignupRollup.source.in_(SOURCES))
+
+    series = Counter()
+    for bucket_start, signups in (await db.execute(stmt)).all():
+        series[bucket_start] += signups
+    return series
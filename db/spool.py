@@ -0,0 +1,433 @@
+"""
+Durable local spool for signups accepted while the database is unavailable.
+
+Signups are appended to segment files in a spool directory. Each record is
+a 4-byte length, a 4-byte CRC32 and a JSON payload. Appends from
+concurrent requests are written and fsynced together on a worker thread,
+so each request waits for at most one shared fsync. A background replayer
+inserts spooled signups into the waitlist table with
+``INSERT ... ON CONFLICT DO NOTHING`` once the database is reachable, and
+deletes a segment only after all of its rows have committed. Replaying a
+segment twice, e.g. after a crash, only finds duplicates.
+
+A CircuitBreaker watches signup inserts. When too many of them fail or
+are slow, the breaker opens and requests go straight to the spool until a
+health probe succeeds.
+
+Several processes can share one spool directory. Every segment is
+flock()ed while it is written or replayed, so a segment left behind by a
+process that died is picked up by whichever replayer gets to it first.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from sqlalchemy import exc, text
+from db.queries import insert_waitlist_emails, signup_values
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".seg"
+CORRUPT_SUFFIX = ".corrupt"
+
+
+class SpoolFull(Exception):
+    """The spool holds max_bytes of signups that have not been replayed."""
+
+
+def is_unavailable(error: BaseException) -> bool:
+    """
+    Whether an insert failed because the database could not be reached.
+
+    Only these failures are worth spooling: a bug or a row the database
+    rejects would fail again on replay.
+    """
+    if isinstance(error, exc.DBAPIError):
+        return isinstance(error, (exc.OperationalError, exc.InterfaceError)) or error.connection_invalidated
+    # OSError covers refused connections and asyncio's TimeoutError;
+    # sqlalchemy's TimeoutError means every pooled connection is stuck
+    return isinstance(error, (OSError, asyncio.TimeoutError, exc.TimeoutError))
+
+
+def encode_record(values: dict, ref) -> bytes:
+    """
+    Frame one signup as a spool record.
+
+    Stores the referrer's code rather than the referred_by_id subquery, and
+    keeps the generated referral code and timestamps so the replayed row
+    matches what the user was told.
+    """
+    payload = json.dumps({
+        "email": values["email"],
+        "ref": ref,
+        "created_at": values["created_at"].isoformat(),
+        "referral_code": values["referral_code"],
+        "confirmation_token": values["confirmation_token"],
+    }, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_records(data: bytes):
+    """
+    Parse a segment.
+
+    Returns:
+        ``(records, valid_bytes)``; reading stops at the first torn or
+        corrupt record, so valid_bytes < len(data) means the rest was lost
+    """
+    records = []
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        length, checksum = HEADER.unpack_from(data, offset)
+        payload = data[offset + HEADER.size:offset + HEADER.size + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        records.append(json.loads(payload))
+        offset += HEADER.size + length
+    return records, offset
+
+
+def record_values(record: dict) -> dict:
+    """Rebuild signup_values() for a decoded record."""
+    values = signup_values(record["email"], record["ref"], confirm=record["confirmation_token"] is not None)
+    values["created_at"] = datetime.fromisoformat(record["created_at"])
+    values["referral_code"] = record["referral_code"]
+    values["confirmation_token"] = record["confirmation_token"]
+    return values
+
+
+class CircuitBreaker:
+    """
+    Tracks recent signup inserts and decides when to stop calling the database.
+
+    The last ``window`` calls are kept; a call counts as failed if it raised
+    or took longer than ``slow_call`` seconds. Once at least ``min_calls``
+    are recorded and the failed share reaches ``failure_ratio`` the breaker
+    opens. It stays open until a health probe run at least ``cooldown``
+    seconds later succeeds; a failed probe restarts the cooldown.
+    """
+
+    def __init__(self, window: int = 20, min_calls: int = 5, failure_ratio: float = 0.5,
+                 slow_call: float = 1.0, cooldown: float = 5.0):
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call = slow_call
+        self.cooldown = cooldown
+        self.trips = 0
+        self.opened_at = None
+        self._outcomes = deque(maxlen=window)
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def record(self, elapsed: float, failed: bool = False):
+        """Record the duration and outcome of one database call."""
+        self._outcomes.append(failed or elapsed > self.slow_call)
+        if self.is_open or len(self._outcomes) < self.min_calls:
+            return
+        if sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio:
+            logger.warning(
+                "Opening signup circuit breaker after %d of %d slow or failed inserts",
+                sum(self._outcomes), len(self._outcomes)
+            )
+            self.trip()
+
+    def trip(self):
+        """Open the breaker, or restart the cooldown if it is already open."""
+        if not self.is_open:
+            self.trips += 1
+        self.opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def reset(self):
+        """Close the breaker after a successful probe."""
+        if self.is_open:
+            logger.info("Closing signup circuit breaker; database is healthy again")
+        self.opened_at = None
+        self._outcomes.clear()
+
+    def probe_in(self) -> float:
+        """Seconds until the next health probe is due."""
+        if not self.is_open:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def stats(self) -> dict:
+        return {
+            "state": "open" if self.is_open else "closed",
+            "trips": self.trips,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": sum(self._outcomes),
+        }
+
+
+class SignupSpool:
+    """
+    Segment files of accepted signups plus the tasks that write and replay them.
+
+    Args:
+        directory: Spool directory, created if missing
+        breaker: Circuit breaker shared with the request path
+        segment_bytes: Size at which the active segment is closed and a new one started
+        max_bytes: Most unreplayed data kept on disk; appends beyond it raise SpoolFull
+        replay_batch: Rows per replay INSERT
+        probe_timeout: Seconds a health probe may take
+        scan_interval: Seconds between checks for segments left by other processes
+    """
+
+    def __init__(self, directory: str, breaker: CircuitBreaker, segment_bytes: int = 4 * 1024 * 1024,
+                 max_bytes: int = 1024 * 1024 * 1024, replay_batch: int = 500,
+                 probe_timeout: float = 2.0, scan_interval: float = 30.0):
+        self.directory = directory
+        self.breaker = breaker
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.replay_batch = replay_batch
+        self.probe_timeout = probe_timeout
+        self.scan_interval = scan_interval
+        self.spooled = 0
+        self.replayed = 0
+        self.duplicates = 0
+        self.lost_bytes = 0
+        self.fsyncs = 0
+        self.backlog_bytes = 0
+        self._file = None
+        self._file_bytes = 0
+        self._sequence = 0
+        self._pending = []
+        self._io_lock = asyncio.Lock()
+        self._written = asyncio.Event()
+        self._replay_wake = asyncio.Event()
+        self._stopping = False
+        self._writer = None
+        self._replayer = None
+
+    def start(self, session_factory, on_replayed):
+        """
+        Start the writer and replayer tasks on the running event loop.
+
+        Args:
+            session_factory: Creates AsyncSessions for replay and health probes
+            on_replayed: Called with ``(values, row)`` for every replayed row
+                that was actually inserted
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.backlog_bytes = self._scan()[1]
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+            self._replayer = asyncio.create_task(self._replay_loop(session_factory, on_replayed))
+
+    async def stop(self):
+        """Write out pending appends, then stop both tasks."""
+        if self._writer is None:
+            return
+        self._stopping = True
+        self._written.set()
+        await self._writer
+        self._replayer.cancel()
+        try:
+            await self._replayer
+        except asyncio.CancelledError:
+            pass
+        async with self._io_lock:
+            await asyncio.to_thread(self._close_segment)
+        self._writer = self._replayer = None
+
+    async def append(self, values: dict, ref=None):
+        """
+        Durably spool one signup.
+
+        Returns once the record has been fsynced.
+
+        Args:
+            values: Column values from db.queries.signup_values()
+            ref: Referral code the user signed up through, if any
+
+        Raises:
+            SpoolFull: If max_bytes of signups are waiting to be replayed
+            RuntimeError: If the spool is not running
+        """
+        if self._writer is None or self._stopping:
+            raise RuntimeError("SignupSpool is not running")
+        if self.backlog_bytes >= self.max_bytes:
+            raise SpoolFull(f"{self.backlog_bytes} bytes of signups are waiting to be replayed")
+
+        record = encode_record(values, ref)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((record, future))
+        self._written.set()
+        await future
+
+    async def _write_loop(self):
+        while True:
+            await self._written.wait()
+            self._written.clear()
+            if not self._pending:
+                if self._stopping:
+                    return
+                continue
+
+            # Everything appended during the previous fsync goes out together
+            batch, self._pending = self._pending, []
+            data = b"".join(record for record, _ in batch)
+            try:
+                async with self._io_lock:
+                    await asyncio.to_thread(self._write, data)
+            except Exception as e:
+                logger.error("Error writing %d signups to the spool: %s", len(batch), e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.spooled += len(batch)
+            self.backlog_bytes += len(data)
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+            self._replay_wake.set()
+            if self._pending:
+                self._written.set()
+
+    def _write(self, data: bytes):
+        if self._file is not None and self._file_bytes + len(data) > self.segment_bytes:
+            self._close_segment()
+        if self._file is None:
+            self._open_segment()
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file_bytes += len(data)
+        self.fsyncs += 1
+
+    def _open_segment(self):
+        # Names sort by creation time, so segments are replayed roughly in signup order
+        self._sequence += 1
+        name = f"{time.time_ns():020d}-{os.getpid()}-{self._sequence:06d}{SEGMENT_SUFFIX}"
+        self._file = open(os.path.join(self.directory, name), "ab")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        self._file_bytes = 0
+        # Make the new directory entry itself durable
+        dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _scan(self):
+        """Segment paths, oldest first, and their total size."""
+        paths, total = [], 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SEGMENT_SUFFIX):
+                paths.append(entry.path)
+                total += entry.stat().st_size
+        return sorted(paths), total
+
+    async def _probe(self, session_factory) -> bool:
+        try:
+            async with session_factory() as db:
+                await asyncio.wait_for(db.execute(text("SELECT 1")), self.probe_timeout)
+            return True
+        except Exception as e:
+            logger.info("Database health probe failed: %s", e)
+            return False
+
+    async def _replay_loop(self, session_factory, on_replayed):
+        while True:
+            if self.breaker.is_open:
+                await asyncio.sleep(self.breaker.probe_in())
+                if not await self._probe(session_factory):
+                    self.breaker.trip()
+                    continue
+                self.breaker.reset()
+
+            # Cleared first so appends made during the replay wake the next one
+            self._replay_wake.clear()
+            try:
+                await self._replay(session_factory, on_replayed)
+            except Exception as e:
+                logger.error("Error replaying spooled signups: %s", e)
+                self.breaker.trip()
+                continue
+
+            try:
+                await asyncio.wait_for(self._replay_wake.wait(), self.scan_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _replay(self, session_factory, on_replayed):
+        # Close the active segment so what it holds can be replayed now
+        if self._file is not None:
+            async with self._io_lock:
+                await asyncio.to_thread(self._close_segment)
+
+        paths, self.backlog_bytes = await asyncio.to_thread(self._scan)
+        for path in paths:
+            await self._replay_segment(path, session_factory, on_replayed)
+
+    async def _replay_segment(self, path, session_factory, on_replayed):
+        try:
+            segment = open(path, "rb")
+        except FileNotFoundError:
+            return
+        with segment:
+            try:
+                fcntl.flock(segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Being written or replayed by another process
+                return
+            if not os.path.exists(path):
+                # Finished by another replayer between our open and flock
+                return
+
+            data = await asyncio.to_thread(segment.read)
+            records, valid_bytes = decode_records(data)
+            for start in range(0, len(records), self.replay_batch):
+                rows = {}
+                for record in records[start:start + self.replay_batch]:
+                    values = record_values(record)
+                    rows.setdefault(values["email"], values)
+                async with session_factory() as db:
+                    inserted = await insert_waitlist_emails(db, list(rows.values()))
+                for email, row in inserted.items():
+                    on_replayed(rows[email], row)
+                self.replayed += len(inserted)
+                self.duplicates += len(records[start:start + self.replay_batch]) - len(inserted)
+
+            if valid_bytes < len(data):
+                # Keep the damaged tail for inspection instead of deleting it
+                self.lost_bytes += len(data) - valid_bytes
+                logger.error(
+                    "Spool segment %s has %d unreadable bytes after %d records; kept as %s",
+                    path, len(data) - valid_bytes, len(records), CORRUPT_SUFFIX
+                )
+                os.replace(path, path[:-len(SEGMENT_SUFFIX)] + CORRUPT_SUFFIX)
+            else:
+                os.remove(path)
+            self.backlog_bytes = max(0, self.backlog_bytes - len(data))
+            if records:
+                logger.info("Replayed %d spooled signups from %s", len(records), os.path.basename(path))
+
+    def stats(self) -> dict:
+        return {
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "duplicates": self.duplicates,
+            "backlog_bytes": self.backlog_bytes,
+            "lost_bytes": self.lost_bytes,
+            "fsyncs": self.fsyncs,
+            "breaker": self.breaker.stats(),
+        }
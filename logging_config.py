@@ -0,0 +1,149 @@
+"""
+Non-blocking, structured logging setup shared by the API, database layer and scripts.
+
+Log records are handed to a queue on the calling thread and formatted and
+written by a background listener thread, so handler I/O never runs on the
+event loop. Configuration comes from the environment:
+
+    LOG_LEVEL                 Root level (default INFO)
+    LOG_LEVELS                Per-logger levels, e.g. "db=WARNING,uvicorn.access=ERROR"
+    LOG_FORMAT                "json" (default) or "text"
+    LOG_REQUEST_SAMPLE_RATE   Fraction of request logs kept (default 1.0)
+    LOG_REQUEST_RATE_LIMIT    Max request logs per second per process (default 50)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+# Logger used for per-request access lines; sampled and rate limited
+REQUEST_LOGGER = "api.access"
+
+# Attributes every LogRecord has; anything else was passed via extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including extra= fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that defers message formatting to the listener thread.
+
+    The stock handler renders ``msg % args`` before enqueueing, which would
+    keep string formatting on the event loop. Records stay in-process, so
+    they can be queued untouched.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Samples records and caps them with a token bucket.
+
+    The number of records dropped since the last one that got through is
+    attached to that record as ``suppressed``.
+    """
+
+    def __init__(self, sample_rate: float, per_second: float):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.per_second = per_second
+        self.tokens = per_second
+        self.updated = time.monotonic()
+        self.suppressed = 0
+
+    def filter(self, record):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.suppressed += 1
+            return False
+
+        now = time.monotonic()
+        self.tokens = min(self.per_second, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+        if self.tokens < 1:
+            self.suppressed += 1
+            return False
+
+        self.tokens -= 1
+        if self.suppressed:
+            record.suppressed = self.suppressed
+            self.suppressed = 0
+        return True
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """
+    Install the queue-based logging pipeline on the root logger.
+
+    Safe to call more than once; only the first call has an effect.
+    """
+    global _listener
+
+    with _lock:
+        if _listener is not None:
+            return
+
+        output = logging.StreamHandler(sys.stderr)
+        if os.getenv("LOG_FORMAT", "json").lower() == "text":
+            output.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+        else:
+            output.setFormatter(JsonFormatter())
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.handlers = [DeferredQueueHandler(log_queue)]
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+        # Let uvicorn's loggers flow through the same pipeline
+        for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+            logging.getLogger(name).handlers = []
+            logging.getLogger(name).propagate = True
+
+        for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+            logging.getLogger(name).setLevel(level)
+
+        logging.getLogger(REQUEST_LOGGER).addFilter(RateLimitFilter(
+            sample_rate=float(os.getenv("LOG_REQUEST_SAMPLE_RATE", "1.0")),
+            per_second=float(os.getenv("LOG_REQUEST_RATE_LIMIT", "50")),
+        ))
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
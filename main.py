@@ -1,16 +1,153 @@
-import uvicorn
+"""
+Production launcher: migrates once, then serves api:app from several worker processes.
+
+Configuration comes from the environment:
+
+    PORT                        Listen port (default 8000)
+    WEB_CONCURRENCY             Worker processes (default: CPUs available to this process,
+                                capped by the container's cgroup CPU quota)
+    UVICORN_LOOP                Event loop, "auto" picks uvloop when installed
+    UVICORN_HTTP                HTTP parser, "auto" picks httptools when installed
+    UVICORN_BACKLOG             Listen socket backlog (default 2048)
+    UVICORN_KEEPALIVE           Idle keep-alive timeout in seconds (default 75)
+    GRACEFUL_SHUTDOWN_TIMEOUT   Seconds to let in-flight requests finish (default 30)
+    DB_MAX_CONNECTIONS          Connections this replica may open per database; split
+                                across workers (default 20)
+"""
+import importlib.util
+import logging
+import math
 import os
+import uvicorn
 from dotenv import load_dotenv
-from api import app
 
-# Load environment variables
+# Load environment variables before anything reads its configuration
 load_dotenv()
 
+from db import get_engine
+from db.migrations import run_migrations
+from db.pool import split_connection_budget
+from logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+# Connections per database shared by all workers when DB_MAX_CONNECTIONS is
+# unset; a fifth of PostgreSQL's default max_connections of 100
+DEFAULT_MAX_CONNECTIONS = 20
+
+# cgroup v2 quota file, then the v1 pair, as mounted inside a container
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def cgroup_cpu_limit():
+    """
+    CPUs allowed by the container's cgroup quota, rounded up, or None if unlimited.
+
+    Containers usually see every host CPU through sched_getaffinity while
+    their quota allows only one or two.
+    """
+    try:
+        with open(CGROUP_V2_CPU_MAX) as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open(CGROUP_V1_QUOTA) as f:
+                quota = f.read().strip()
+            with open(CGROUP_V1_PERIOD) as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    if quota in ("max", "-1"):
+        return None
+    try:
+        return max(1, math.ceil(int(quota) / int(period)))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def worker_count() -> int:
+    """Workers to start: WEB_CONCURRENCY, or the CPUs this process may run on."""
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.getenv("WEB_CONCURRENCY")))
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, limit)
+    return max(1, cpus)
+
+
+def pick_implementation(setting: str, fast: str, fallback: str) -> str:
+    """Resolve "auto" to the fast implementation when it is installed."""
+    if setting != "auto":
+        return setting
+    return fast if importlib.util.find_spec(fast) else fallback
+
+
+def size_worker_pools(workers: int):
+    """
+    Export per-worker DB_POOL_SIZE / DB_MAX_OVERFLOW derived from DB_MAX_CONNECTIONS.
+
+    Workers inherit the environment, so each one's engines are sized to its
+    share of the budget; the replica pool gets the same share of the
+    replica's connections. Explicit DB_POOL_SIZE / DB_MAX_OVERFLOW settings
+    win.
+
+    Returns:
+        Workers to start, fewer than requested if the budget cannot give
+        each one a connection
+    """
+    budget = int(os.getenv("DB_MAX_CONNECTIONS") or DEFAULT_MAX_CONNECTIONS)
+    if budget < workers:
+        logger.warning("DB_MAX_CONNECTIONS=%d allows only %d of %d workers", budget, budget, workers)
+        workers = budget
+    pool_size, max_overflow = split_connection_budget(budget, workers)
+    os.environ.setdefault("DB_POOL_SIZE", str(pool_size))
+    os.environ.setdefault("DB_MAX_OVERFLOW", str(max_overflow))
+    logger.info(
+        "Connection budget %s over %d workers: pool_size=%s max_overflow=%s",
+        budget, workers, os.environ["DB_POOL_SIZE"], os.environ["DB_MAX_OVERFLOW"]
+    )
+    return workers
+
+
 if __name__ == "__main__":
+    configure_logging()
+
+    # Migrate once here instead of in every worker's startup
+    run_migrations(get_engine())
+    get_engine().dispose()
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "false"
+
+    workers = size_worker_pools(worker_count())
+
+    loop = pick_implementation(os.getenv("UVICORN_LOOP", "auto"), "uvloop", "asyncio")
+    http = pick_implementation(os.getenv("UVICORN_HTTP", "auto"), "httptools", "h11")
+    logger.info("Starting %d workers (loop=%s, http=%s)", workers, loop, http)
+
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(
         "api:app",
         host="0.0.0.0",
         port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=int(os.getenv("UVICORN_BACKLOG", "2048")),
+        # Longer than typical load balancer idle timeouts (60s) so the proxy
+        # closes idle connections first and never reuses one we dropped
+        timeout_keep_alive=int(os.getenv("UVICORN_KEEPALIVE", "75")),
+        # On SIGTERM stop accepting, let in-flight requests finish, then run
+        # the lifespan shutdown that flushes queued write-behind signups.
+        # Live count streams never finish on their own, so they hold
+        # shutdown for this long before the lifespan ends them.
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30")),
+        # The launcher configured logging; keep uvicorn from replacing it
+        log_config=None,
         reload=False  # Disable reload to prevent ghost processes
     )
@@ -0,0 +1,102 @@
+"""
+Test script for the signup analytics rollups and their endpoint.
+Runs the API in-process against a temporary SQLite file.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'analytics.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["ADMIN_TOKEN"] = "test-admin-token"
+os.environ["WAITLIST_ANALYTICS"] = "true"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient
+from api import app
+from api.analytics import signup_aggregator
+from db import new_async_session
+
+ADMIN = {"X-Admin-Token": "test-admin-token"}
+
+
+def series(client, **params):
+    response = client.get("/api/analytics/signups", params=params, headers=ADMIN)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_referrer_series(client):
+    """Test that referred signups are charted per referrer without being counted twice"""
+    print("Testing per-referrer rollups...")
+    code = client.post("/api/waitlist", data={"email": "referrer@example.com"}).json()["referral_code"]
+    for i in range(2):
+        assert client.post("/api/waitlist", data={"email": f"friend{i}@example.com", "ref": code}).status_code == 200
+    client.portal.call(signup_aggregator.flush, new_async_session)
+
+    body = series(client, granularity="hour")
+    assert body["total"] == 3, body
+    assert series(client, granularity="hour", source="referral")["total"] == 2
+    print("✓ 3 signups in total, 2 of them referrals")
+
+    body = series(client, granularity="day", referrer=code)
+    assert body["total"] == 2 and body["referrer"] == code, body
+    print("✓ Referrer's daily series counts their 2 referrals")
+
+    response = client.get("/api/analytics/signups", params={"granularity": "minute", "referrer": code}, headers=ADMIN)
+    assert response.status_code == 400, response.status_code
+    response = client.get("/api/analytics/signups", params={"granularity": "day", "referrer": "unknown"}, headers=ADMIN)
+    assert response.status_code == 404, response.status_code
+    print("✓ Per-minute referrer series: 400, unknown referral code: 404")
+    return True
+
+
+def test_partial_end_bucket(client):
+    """Test that an end inside a bucket includes that bucket"""
+    print("\nTesting a partial end bucket...")
+    now = datetime.utcnow()
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    end = hour + timedelta(minutes=30)
+    body = series(client, granularity="hour", start=(hour - timedelta(hours=1)).isoformat(), end=end.isoformat())
+    assert body["end"] == (hour + timedelta(hours=1)).isoformat(), body
+    assert body["points"][-1]["t"] == hour.isoformat() and body["total"] == 3, body
+    print(f"✓ end={end:%H:%M} included the {hour:%H:%M} bucket")
+
+    body = series(client, granularity="hour", start=(hour - timedelta(hours=1)).isoformat(), end=hour.isoformat())
+    assert body["total"] == 0 and len(body["points"]) == 1, body
+    print("✓ An end on a bucket boundary still excludes that bucket")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO ANALYTICS TEST")
+    print("=" * 50)
+
+    results = {}
+    with TestClient(app) as client:
+        for name, test in (("Referrer Series", test_referrer_series), ("Partial End Bucket", test_partial_end_bucket)):
+            try:
+                results[name] = test(client)
+            except Exception as e:
+                print(f"✗ {name} failed: {e!r}")
+                results[name] = False
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All analytics tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
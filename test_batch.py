@@ -0,0 +1,98 @@
+"""
+Test script for the write-behind signup batcher.
+Batches into a temporary SQLite file.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'batch.db')}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import create_engine
+from db import dispose_engines, new_async_session
+from db.batch import SignupBatcher
+from db.migrations import run_migrations
+from db.queries import signup_values
+
+
+async def test_coalescing():
+    """Test that concurrent signups share one insert and repeats come back as duplicates"""
+    print("Testing batch coalescing...")
+    batcher = SignupBatcher(new_async_session, max_rows=100, max_delay=0.05)
+    batcher.start()
+    try:
+        emails = [f"batch{i}@example.com" for i in range(4)] + ["batch0@example.com"]
+        rows = await asyncio.gather(*(batcher.submit(signup_values(email)) for email in emails))
+    finally:
+        await batcher.stop()
+    assert batcher.batches == 1 and batcher.rows == 4, batcher.stats()
+    assert all(row is not None for row in rows[:4]) and rows[4] is None, rows
+    print("✓ 5 signups written in one batch, the repeated email returned None")
+    return True
+
+
+async def test_submit_while_stopping():
+    """Test that a signup submitted after stop() is inserted rather than left waiting"""
+    print("\nTesting submit during shutdown...")
+    batcher = SignupBatcher(new_async_session, max_delay=0.05)
+    batcher.start()
+    queued = asyncio.create_task(batcher.submit(signup_values("queued@example.com")))
+    await asyncio.sleep(0)
+    stopping = asyncio.create_task(batcher.stop())
+    await asyncio.sleep(0)
+
+    late = await asyncio.wait_for(batcher.submit(signup_values("late@example.com")), 5)
+    assert late is not None and late.email == "late@example.com", late
+    assert (await asyncio.wait_for(queued, 5)) is not None
+    await asyncio.wait_for(stopping, 5)
+    assert batcher.rows == 1, batcher.stats()
+    print("✓ Queued signup flushed by the writer, late one inserted directly")
+
+    try:
+        await batcher.submit(signup_values("after@example.com"))
+        raise AssertionError("submit after stop() finished should raise")
+    except RuntimeError:
+        pass
+    print("✓ Submitting to a stopped batcher raises RuntimeError")
+    return True
+
+
+async def run_async_tests():
+    results = {}
+    for name, test in (("Coalescing", test_coalescing), ("Submit While Stopping", test_submit_while_stopping)):
+        try:
+            results[name] = await test()
+        except Exception as e:
+            print(f"✗ {name} failed: {e!r}")
+            results[name] = False
+    await dispose_engines()
+    return results
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO WRITE-BEHIND BATCH TEST")
+    print("=" * 50)
+
+    run_migrations(create_engine(os.environ["DATABASE_URL"]))
+    results = asyncio.run(run_async_tests())
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All batch tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
@@ -0,0 +1,88 @@
+"""
+Test script for the cached waitlist count and its conditional requests.
+Runs the API in-process against a temporary SQLite file.
+"""
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'count.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["WAITLIST_COUNT_TTL"] = "30"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient
+from api import app
+
+
+def test_cache_headers(client):
+    """Test that the count is sent with Cache-Control and a weak ETag"""
+    print("Testing count cache headers...")
+    for i in range(2):
+        assert client.post("/api/waitlist", data={"email": f"count{i}@example.com"}).status_code == 200
+    response = client.get("/api/waitlist/count")
+    assert response.status_code == 200 and response.json() == {"count": 2}, response.text
+    assert response.headers["ETag"] == 'W/"2"', response.headers
+    assert response.headers["Cache-Control"] == "public, max-age=30", response.headers
+    print(f"✓ Count 2 sent with ETag {response.headers['ETag']} and {response.headers['Cache-Control']}")
+    return True
+
+
+def test_not_modified(client):
+    """Test that a matching If-None-Match gets 304 until the count changes"""
+    print("\nTesting conditional count requests...")
+    etag = client.get("/api/waitlist/count").headers["ETag"]
+    response = client.get("/api/waitlist/count", headers={"If-None-Match": etag})
+    assert response.status_code == 304, response.status_code
+    assert response.content == b"" and response.headers["ETag"] == etag
+    assert "max-age" in response.headers["Cache-Control"]
+    print("✓ Matching ETag answered 304 with no body and the same headers")
+
+    for header in (f'"1", {etag}', etag.removeprefix("W/"), "*"):
+        response = client.get("/api/waitlist/count", headers={"If-None-Match": header})
+        assert response.status_code == 304, (header, response.status_code)
+    print("✓ ETag lists, strong/weak variants and * also answered 304")
+
+    response = client.get("/api/waitlist/count", headers={"If-None-Match": 'W/"999", "1"'})
+    assert response.status_code == 200, response.status_code
+    print("✓ Stale ETags answered 200")
+
+    assert client.post("/api/waitlist", data={"email": "count-new@example.com"}).status_code == 200
+    response = client.get("/api/waitlist/count", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.json() == {"count": 3}, response.text
+    assert response.headers["ETag"] == 'W/"3"'
+    print("✓ A signup in this worker changed the ETag without waiting for the TTL")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO WAITLIST COUNT TEST")
+    print("=" * 50)
+
+    results = {}
+    with TestClient(app) as client:
+        for name, test in (("Cache Headers", test_cache_headers), ("Not Modified", test_not_modified)):
+            try:
+                results[name] = test(client)
+            except Exception as e:
+                print(f"✗ {name} failed: {e!r}")
+                results[name] = False
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All count tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
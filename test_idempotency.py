@@ -0,0 +1,125 @@
+"""
+Test script for Idempotency-Key handling on signups.
+Runs the API in-process against a temporary SQLite file.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'idempotency.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from api import app
+from api.idempotency import MAX_KEY_LENGTH, IdempotencyCache, IdempotencyConflict
+from db.models import Waitlist
+
+
+def stored_count(email):
+    engine = create_engine(os.environ["DATABASE_URL"])
+    with engine.connect() as conn:
+        count = conn.scalar(select(func.count()).select_from(Waitlist).where(Waitlist.email == email))
+    engine.dispose()
+    return count
+
+
+def signup(client, email, key):
+    return client.post("/api/waitlist", data={"email": email}, headers={"Idempotency-Key": key})
+
+
+def test_replay(client):
+    """Test that a retried submission gets the original response without a second insert"""
+    print("Testing Idempotency-Key replay...")
+    first = signup(client, "replay@example.com", "key-1")
+    assert first.status_code == 200 and "Idempotent-Replayed" not in first.headers, first.text
+
+    again = signup(client, "Replay@Example.com", "key-1")
+    assert again.status_code == 200, again.text
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.json() == first.json(), (again.json(), first.json())
+    assert stored_count("replay@example.com") == 1
+    print("✓ Retry replayed the original response, one row stored")
+    return True
+
+
+def test_conflict(client):
+    """Test that a key reused for another email or an oversized key is rejected"""
+    print("\nTesting Idempotency-Key conflicts...")
+    response = signup(client, "other@example.com", "key-1")
+    assert response.status_code == 422, response.status_code
+    assert "Idempotency-Key" in response.json()["detail"]
+    assert stored_count("other@example.com") == 0
+    print("✓ Same key with a different email: 422, nothing stored")
+
+    response = signup(client, "long@example.com", "k" * (MAX_KEY_LENGTH + 1))
+    assert response.status_code == 400, response.status_code
+    print(f"✓ Key longer than {MAX_KEY_LENGTH} characters: 400")
+    return True
+
+
+async def test_in_flight_retries():
+    """Test that retries wait for the first attempt and only reuse successful responses"""
+    print("\nTesting retries while the first attempt runs...")
+    cache = IdempotencyCache(max_bytes=1024 * 1024, ttl=60)
+    assert await cache.claim("k", "a@example.com") is None
+    retry = asyncio.create_task(cache.claim("k", "a@example.com"))
+    await asyncio.sleep(0)
+    assert not retry.done(), "a retry should wait for the in-flight attempt"
+    try:
+        await cache.claim("k", "b@example.com")
+        raise AssertionError("a different fingerprint should conflict while in flight")
+    except IdempotencyConflict:
+        pass
+    cache.complete("k", {"id": 1})
+    assert await retry == (200, {"id": 1})
+    print("✓ Waiting retry got the completed response; other fingerprints conflict")
+
+    assert await cache.claim("failed", "c@example.com") is None
+    retry = asyncio.create_task(cache.claim("failed", "c@example.com"))
+    await asyncio.sleep(0)
+    cache.release("failed")
+    assert await retry is None, "after a failure the retry should own the key"
+    assert "failed" not in cache.entries
+    print("✓ After a failed attempt the waiting retry runs the signup itself")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO IDEMPOTENCY TEST")
+    print("=" * 50)
+
+    results = {}
+    with TestClient(app) as client:
+        for name, test in (("Replay", test_replay), ("Conflict", test_conflict)):
+            try:
+                results[name] = test(client)
+            except Exception as e:
+                print(f"✗ {name} failed: {e!r}")
+                results[name] = False
+    try:
+        results["In-Flight Retries"] = asyncio.run(test_in_flight_retries())
+    except Exception as e:
+        print(f"✗ In-Flight Retries failed: {e!r}")
+        results["In-Flight Retries"] = False
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All idempotency tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
@@ -0,0 +1,148 @@
+"""
+Test script for the signup body formats and the partner batch endpoint.
+Runs the API in-process against a temporary SQLite file.
+"""
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'ingest.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["ADMIN_TOKEN"] = "test-admin-token"
+os.environ["WAITLIST_BATCH_MAX_EMAILS"] = "5"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient
+from api import app
+
+ADMIN = {"X-Admin-Token": "test-admin-token"}
+BATCH_MAX = 5
+
+
+def test_body_formats(client):
+    """Test that JSON, URL-encoded and multipart bodies are all accepted"""
+    print("Testing signup body formats...")
+    requests = {
+        "json": {"json": {"email": "json@example.com"}},
+        "form": {"data": {"email": "form@example.com"}},
+        "multipart": {"data": {"email": "multipart@example.com"}, "files": {"unused": ("a.txt", b"")}},
+    }
+    for name, kwargs in requests.items():
+        response = client.post("/api/waitlist", **kwargs)
+        assert response.status_code == 200, (name, response.text)
+        assert response.json()["email"] == f"{name}@example.com", response.json()
+        print(f"✓ {name} signup accepted")
+    return True
+
+
+def test_validation_errors(client):
+    """Test that a missing email keeps FastAPI's 422 detail list"""
+    print("\nTesting validation errors...")
+    for name, kwargs in {
+        "JSON body": {"json": {"ref": "abc"}},
+        "form body": {"data": {"ref": "abc"}},
+        "empty form field": {"data": {"email": ""}},
+    }.items():
+        response = client.post("/api/waitlist", **kwargs)
+        assert response.status_code == 422, (name, response.status_code)
+        detail = response.json()["detail"]
+        assert detail[0]["loc"] == ["body", "email"] and detail[0]["type"] == "missing", detail
+        print(f"✓ Missing email ({name}): 422 with a detail list")
+
+    response = client.post("/api/waitlist", json={"email": 5})
+    assert response.status_code == 422 and response.json()["detail"][0]["type"] == "string_type", response.text
+    print("✓ Non-string email: 422 string_type")
+
+    response = client.post("/api/waitlist", content=b"{", headers={"Content-Type": "application/json"})
+    assert response.status_code == 400, response.status_code
+    print("✓ Malformed JSON: 400")
+    return True
+
+
+def test_batch_limits(client):
+    """Test authentication, shape and size limits of the batch endpoint"""
+    print("\nTesting batch endpoint limits...")
+    response = client.post("/api/waitlist/batch", json=["a@example.com"])
+    assert response.status_code == 401, response.status_code
+    print("✓ Rejected without the admin token")
+
+    response = client.post("/api/waitlist/batch", json={"email": "a@example.com"}, headers=ADMIN)
+    assert response.status_code == 400, response.status_code
+    response = client.post("/api/waitlist/batch", content=b"[", headers={**ADMIN, "Content-Type": "application/json"})
+    assert response.status_code == 400, response.status_code
+    print("✓ Non-array and malformed bodies: 400")
+
+    too_many = [f"over{i}@example.com" for i in range(BATCH_MAX + 1)]
+    response = client.post("/api/waitlist/batch", json=too_many, headers=ADMIN)
+    assert response.status_code == 413, response.status_code
+    print(f"✓ {BATCH_MAX + 1} emails: 413")
+
+    items = [
+        "batch1@example.com",
+        {"email": "Batch2@Example.com"},
+        "json@example.com",
+        "not-an-email",
+        "batch1@example.com",
+    ]
+    response = client.post("/api/waitlist/batch", json=items, headers=ADMIN)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["added"], body["duplicates"], body["invalid"]) == (2, 2, 1), body
+    statuses = [result["status"] for result in body["results"]]
+    assert statuses == ["added", "added", "duplicate", "invalid", "duplicate"], statuses
+    assert body["results"][1]["email"] == "batch2@example.com"
+    print(f"✓ {BATCH_MAX} mixed items: 2 added, 2 duplicates, 1 invalid, in input order")
+    return True
+
+
+def test_export_escaping(client):
+    """Test that CSV exports neutralize formula cells and NDJSON keeps emails as stored"""
+    print("\nTesting export escaping...")
+    assert client.post("/api/waitlist", data={"email": "=cmd@example.com"}).status_code == 200
+    response = client.get("/api/waitlist", params={"format": "csv"}, headers=ADMIN)
+    assert response.status_code == 200, response.text
+    assert ",'=cmd@example.com," in response.text and ",=cmd@example.com," not in response.text, response.text
+    print("✓ CSV cell starting with = exported as '=cmd@example.com")
+
+    response = client.get("/api/waitlist", params={"format": "ndjson"}, headers=ADMIN)
+    assert '"email":"=cmd@example.com"' in response.text, response.text
+    print("✓ NDJSON export unchanged")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO SIGNUP INGEST TEST")
+    print("=" * 50)
+
+    results = {}
+    with TestClient(app) as client:
+        for name, test in (
+            ("Body Formats", test_body_formats),
+            ("Validation Errors", test_validation_errors),
+            ("Batch Limits", test_batch_limits),
+            ("Export Escaping", test_export_escaping),
+        ):
+            try:
+                results[name] = test(client)
+            except Exception as e:
+                print(f"✗ {name} failed: {e!r}")
+                results[name] = False
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All ingest tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
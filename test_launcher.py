@@ -0,0 +1,89 @@
+"""
+Test script for the production launcher's worker and connection sizing.
+Uses fake cgroup files in a temporary directory; nothing is started.
+"""
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+for name in ("WEB_CONCURRENCY", "DB_MAX_CONNECTIONS", "DB_POOL_SIZE", "DB_MAX_OVERFLOW"):
+    os.environ.pop(name, None)
+
+import main
+
+
+def write(name, content):
+    path = os.path.join(_tmpdir.name, name)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def test_cgroup_quota():
+    """Test that the cgroup CPU quota caps the worker count"""
+    print("Testing cgroup CPU quotas...")
+    main.CGROUP_V1_QUOTA = main.CGROUP_V1_PERIOD = os.path.join(_tmpdir.name, "missing")
+    for content, expected in (("max 100000\n", None), ("150000 100000\n", 2), ("50000 100000\n", 1)):
+        main.CGROUP_V2_CPU_MAX = write("cpu.max", content)
+        assert main.cgroup_cpu_limit() == expected, (content, main.cgroup_cpu_limit())
+    print("✓ cgroup v2 cpu.max: unlimited, 1.5 CPUs -> 2, 0.5 CPUs -> 1")
+
+    main.CGROUP_V2_CPU_MAX = os.path.join(_tmpdir.name, "missing")
+    main.CGROUP_V1_QUOTA = write("cfs_quota_us", "200000\n")
+    main.CGROUP_V1_PERIOD = write("cfs_period_us", "100000\n")
+    assert main.cgroup_cpu_limit() == 2
+    print("✓ cgroup v1 quota and period: 2 CPUs")
+
+    main.CGROUP_V1_QUOTA = write("cfs_quota_us", "100000\n")
+    assert main.worker_count() == 1
+    print("✓ A 1-CPU quota starts one worker whatever the host has")
+    return True
+
+
+def test_connection_budget():
+    """Test that the connection budget always applies and bounds the workers"""
+    print("\nTesting the connection budget...")
+    workers = main.size_worker_pools(4)
+    pool_size, max_overflow = int(os.environ["DB_POOL_SIZE"]), int(os.environ["DB_MAX_OVERFLOW"])
+    assert workers == 4 and workers * (pool_size + max_overflow) <= main.DEFAULT_MAX_CONNECTIONS
+    print(f"✓ Default budget of {main.DEFAULT_MAX_CONNECTIONS}: pool_size={pool_size} max_overflow={max_overflow} per worker")
+
+    for name in ("DB_POOL_SIZE", "DB_MAX_OVERFLOW"):
+        del os.environ[name]
+    os.environ["DB_MAX_CONNECTIONS"] = "3"
+    assert main.size_worker_pools(8) == 3
+    assert (os.environ["DB_POOL_SIZE"], os.environ["DB_MAX_OVERFLOW"]) == ("1", "0")
+    print("✓ A budget of 3 starts 3 workers with one connection each")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO LAUNCHER TEST")
+    print("=" * 50)
+
+    results = {}
+    for name, test in (("Cgroup Quota", test_cgroup_quota), ("Connection Budget", test_connection_budget)):
+        try:
+            results[name] = test()
+        except Exception as e:
+            print(f"✗ {name} failed: {e!r}")
+            results[name] = False
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All launcher tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
@@ -0,0 +1,102 @@
+"""
+Test script for connection pool options and checkout metering.
+Opens aiosqlite connections to a temporary file through a deliberately slow creator.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ.pop("DB_POOL_PRE_PING", None)
+
+import aiosqlite
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from db.pool import MeteredAsyncQueuePool, PoolStats, pool_options
+import db.pool
+
+CONNECT_DELAY = 0.2
+
+
+def test_pool_options():
+    """Test that pre-ping is off unless DB_POOL_PRE_PING turns it on"""
+    print("Testing pool options...")
+    url = f"sqlite:///{os.path.join(_tmpdir.name, 'options.db')}"
+    options = pool_options(url)
+    assert options["pool_pre_ping"] is False and options["pool_recycle"] == 1800, options
+    print("✓ Pre-ping off by default, connections recycled after 1800 s")
+
+    os.environ["DB_POOL_PRE_PING"] = "true"
+    try:
+        assert pool_options(url)["pool_pre_ping"] is True
+    finally:
+        del os.environ["DB_POOL_PRE_PING"]
+    print("✓ DB_POOL_PRE_PING=true enables it")
+    return True
+
+
+async def test_wait_excludes_connect():
+    """Test that connection setup is reported as connect time, not checkout wait"""
+    print("\nTesting checkout metering...")
+    db.pool.pool_stats = stats = PoolStats()
+    path = os.path.join(_tmpdir.name, "pool.db")
+
+    async def slow_connect():
+        await asyncio.sleep(CONNECT_DELAY)
+        return await aiosqlite.connect(path)
+
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", poolclass=MeteredAsyncQueuePool,
+        pool_size=1, max_overflow=0, async_creator=slow_connect
+    )
+
+    async def query(hold):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(hold)
+
+    try:
+        await query(0)
+        assert stats.connects == 1 and stats.total_connect >= CONNECT_DELAY, vars(stats)
+        assert stats.max_wait < CONNECT_DELAY / 2, vars(stats)
+        print(f"✓ First checkout: {stats.total_connect * 1000:.0f} ms connecting, {stats.max_wait * 1000:.1f} ms waiting")
+
+        await asyncio.gather(query(0.3), query(0))
+        assert stats.connects == 1 and stats.max_wait >= 0.25, vars(stats)
+        print(f"✓ Queued checkout waited {stats.max_wait * 1000:.0f} ms for the only connection")
+    finally:
+        await engine.dispose()
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO CONNECTION POOL TEST")
+    print("=" * 50)
+
+    results = {}
+    for name, test in (("Pool Options", test_pool_options), ("Wait Excludes Connect", test_wait_excludes_connect)):
+        try:
+            result = test()
+            results[name] = asyncio.run(result) if asyncio.iscoroutine(result) else result
+        except Exception as e:
+            print(f"✗ {name} failed: {e!r}")
+            results[name] = False
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All pool tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
@@ -0,0 +1,98 @@
+"""
+Test script for queue positions and the referral leaderboard.
+Runs the API in-process against a temporary SQLite file.
+"""
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'ranks.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["WAITLIST_RANKS"] = "true"
+os.environ["RANK_REFRESH_INTERVAL"] = "0.1"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient
+from api import app
+from api.ranks import public_handle, rank_index
+
+
+def wait_for_ranks(client, code):
+    for _ in range(50):
+        response = client.get("/api/waitlist/position", params={"code": code})
+        if response.status_code != 503:
+            return response
+        time.sleep(0.1)
+    return response
+
+
+def test_lazy_load(client):
+    """Test that the index is not loaded until the first rank request"""
+    print("Testing lazy rank index loading...")
+    codes = [client.post("/api/waitlist", data={"email": f"rank{i}@example.com"}).json()["referral_code"] for i in range(3)]
+    assert not rank_index.ready and rank_index._task is None, rank_index.stats()
+    print("✓ Startup and signups did not load the index")
+
+    response = wait_for_ranks(client, codes[2])
+    assert response.status_code == 200, response.text
+    assert response.json()["position"] == 3 and response.json()["total"] == 3, response.json()
+    print("✓ First position request loaded the index: position 3 of 3")
+    return codes
+
+
+def test_leaderboard(client, codes):
+    """Test that the leaderboard shows handles, never emails or referral codes"""
+    print("\nTesting the leaderboard...")
+    for i in range(2):
+        assert client.post("/api/waitlist", data={"email": f"friend{i}@example.com", "ref": codes[1]}).status_code == 200
+    response = client.get("/api/waitlist/leaderboard")
+    assert response.status_code == 200, response.text
+    leaders = response.json()["leaders"]
+    assert leaders == [{"rank": 1, "handle": public_handle(codes[1]), "referrals": 2}], leaders
+    assert "@" not in response.text and codes[1] not in response.text
+    print(f"✓ Top referrer shown as {leaders[0]['handle']}, no email or code")
+
+    position = client.get("/api/waitlist/position", params={"code": codes[1]}).json()
+    assert position["handle"] == leaders[0]["handle"] and position["position"] == 1, position
+    print("✓ Position endpoint returns the same handle and moves the referrer to first")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO RANKS TEST")
+    print("=" * 50)
+
+    results = {}
+    with TestClient(app) as client:
+        try:
+            codes = test_lazy_load(client)
+            results["Lazy Load"] = True
+        except Exception as e:
+            print(f"✗ Lazy Load failed: {e!r}")
+            results["Lazy Load"] = False
+        if results["Lazy Load"]:
+            try:
+                results["Leaderboard"] = test_leaderboard(client, codes)
+            except Exception as e:
+                print(f"✗ Leaderboard failed: {e!r}")
+                results["Leaderboard"] = False
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All ranks tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
@@ -0,0 +1,117 @@
+"""
+Test script for the signup rate limits.
+Runs the API in-process against a temporary SQLite file, with one trusted
+proxy hop so X-Forwarded-For decides which per-IP bucket a request uses.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'ratelimit.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "true"
+os.environ["TRUSTED_PROXY_HOPS"] = "1"
+os.environ["RATE_LIMIT_IP_PER_SECOND"] = "0.001"
+os.environ["RATE_LIMIT_IP_BURST"] = "3"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient
+from api import app
+from api.ratelimit import InMemoryBackend, RateLimiter
+
+IP_BURST = 3
+
+
+def signup(client, email, ip):
+    return client.post("/api/waitlist", data={"email": email}, headers={"X-Forwarded-For": ip})
+
+
+def test_ip_limit(client):
+    """Test that one address is limited while another keeps its own bucket"""
+    print("Testing the per-IP limit and 429 response...")
+    for i in range(IP_BURST):
+        response = signup(client, f"first{i}@example.com", "203.0.113.5")
+        assert response.status_code == 200, response.text
+    print(f"✓ {IP_BURST} signups from one address accepted")
+
+    response = signup(client, "first-over@example.com", "203.0.113.5")
+    assert response.status_code == 429, response.status_code
+    assert int(response.headers["Retry-After"]) >= 1
+    assert "detail" in response.json()
+    print(f"✓ Next signup rejected with 429, Retry-After {response.headers['Retry-After']}s")
+
+    response = signup(client, "second@example.com", "198.51.100.7")
+    assert response.status_code == 200, response.text
+    print("✓ A different forwarded address has its own bucket")
+    return True
+
+
+def test_client_ip():
+    """Test which X-Forwarded-For entry is trusted"""
+    print("\nTesting client address resolution...")
+
+    class FakeRequest:
+        def __init__(self, forwarded):
+            self.headers = {"x-forwarded-for": forwarded}
+            self.client = type("Client", (), {"host": "10.0.0.1"})()
+
+    limiter = RateLimiter(InMemoryBackend(), 1, 1, 0, 0, 0, 0, proxy_hops=1)
+    # A spoofed first entry is ignored; the proxy appended the real address last
+    assert limiter.client_ip(FakeRequest("1.2.3.4, 203.0.113.5")) == "203.0.113.5"
+    assert limiter.client_ip(FakeRequest("")) == "10.0.0.1"
+    direct = RateLimiter(InMemoryBackend(), 1, 1, 0, 0, 0, 0, proxy_hops=0)
+    assert direct.client_ip(FakeRequest("1.2.3.4")) == "10.0.0.1"
+    print("✓ Only the hop added by the trusted proxy is used")
+    return True
+
+
+def test_default_without_proxy_hops():
+    """Test that the per-IP limit is off by default when no proxy hops are trusted"""
+    print("\nTesting defaults without TRUSTED_PROXY_HOPS...")
+    env = {k: v for k, v in os.environ.items() if k not in ("TRUSTED_PROXY_HOPS", "RATE_LIMIT_IP_PER_SECOND")}
+    rates = subprocess.run(
+        [sys.executable, "-c", "from api.ratelimit import signup_limiter as l; print(l.ip_rate, l.global_rate)"],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout.split()
+    assert float(rates[0]) == 0 and float(rates[1]) > 0, rates
+    print("✓ Per-IP limit disabled, global limit still on")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO RATE LIMIT TEST")
+    print("=" * 50)
+
+    results = {}
+    with TestClient(app) as client:
+        try:
+            results["Per-IP Limit"] = test_ip_limit(client)
+        except Exception as e:
+            print(f"✗ Per-IP Limit failed: {e!r}")
+            results["Per-IP Limit"] = False
+    for name, test in (("Client Address", test_client_ip), ("Proxy Default", test_default_without_proxy_hops)):
+        try:
+            results[name] = test()
+        except Exception as e:
+            print(f"✗ {name} failed: {e!r}")
+            results[name] = False
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All rate limit tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
@@ -0,0 +1,221 @@
+"""
+Test script for read/write routing between the primary and a read replica.
+Two local SQLite files stand in for the primary and the replica; they hold
+different rows so each read shows which database answered it.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+PRIMARY_URL = f"sqlite:///{os.path.join(_tmpdir.name, 'primary.db')}"
+REPLICA_URL = f"sqlite:///{os.path.join(_tmpdir.name, 'replica.db')}"
+os.environ["DATABASE_URL"] = PRIMARY_URL
+os.environ["DATABASE_REPLICA_URL"] = REPLICA_URL
+os.environ["REPLICA_CHECK_INTERVAL"] = "0.1"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+import db.replica
+from db import dispose_engines, get_replica_async_engine
+from db.migrations import run_migrations
+from db.models import Waitlist
+from db.queries import count_waitlist, insert_waitlist_email, signup_values
+from db.replica import ReplicaRouter, new_read_session, replica_router
+
+PRIMARY_ROWS = 5
+# The replica is behind: it has only replicated the first two signups
+REPLICA_ROWS = 2
+
+
+def setup_databases():
+    """Create the schema in both files and fill them with diverging rows"""
+    for url, rows in ((PRIMARY_URL, PRIMARY_ROWS), (REPLICA_URL, REPLICA_ROWS)):
+        engine = create_engine(url)
+        run_migrations(engine)
+        with engine.begin() as conn:
+            conn.execute(Waitlist.__table__.insert(), [{"email": f"user{i}@example.com"} for i in range(rows)])
+        engine.dispose()
+
+
+async def read_count():
+    async with new_read_session() as session:
+        return await count_waitlist(session)
+
+
+async def test_reads_use_replica():
+    """Test that reads go to a healthy replica and writes to the primary"""
+    print("Testing read routing to a healthy replica...")
+    await replica_router.check(get_replica_async_engine())
+    assert replica_router.healthy, "replica should be healthy"
+
+    count = await read_count()
+    assert count == REPLICA_ROWS, f"expected the replica's {REPLICA_ROWS} rows, got {count}"
+    print(f"✓ Count read from the replica ({count})")
+
+    async with new_read_session() as session:
+        before = await count_waitlist(session)
+        row = await insert_waitlist_email(session, signup_values("routed@example.com"))
+        after = await count_waitlist(session)
+    assert row is not None
+    assert before == REPLICA_ROWS and after == PRIMARY_ROWS + 1, (before, after)
+    print("✓ Insert went to the primary, and later reads in the session followed it")
+
+    engine = create_engine(REPLICA_URL)
+    with engine.connect() as conn:
+        replica_rows = conn.scalar(text("SELECT COUNT(*) FROM waitlist"))
+    engine.dispose()
+    assert replica_rows == REPLICA_ROWS, "the write must not reach the replica"
+    print("✓ Replica untouched by the write")
+    return True
+
+
+async def test_stale_replica_falls_back():
+    """Test that reads go to the primary while the replica lags too far behind"""
+    print("\nTesting fallback for a lagging replica...")
+    measure_lag = db.replica.measure_lag
+
+    async def lagging(conn):
+        return replica_router.max_lag + 10
+
+    db.replica.measure_lag = lagging
+    try:
+        await replica_router.check(get_replica_async_engine())
+    finally:
+        db.replica.measure_lag = measure_lag
+    assert not replica_router.healthy, "a lagging replica should not be used"
+
+    count = await read_count()
+    assert count == PRIMARY_ROWS + 1, f"expected the primary's rows, got {count}"
+    print(f"✓ Lag of {replica_router.lag:.0f}s sent reads to the primary ({count})")
+
+    await replica_router.check(get_replica_async_engine())
+    assert replica_router.healthy and await read_count() == REPLICA_ROWS
+    print("✓ Reads returned to the replica once it caught up")
+    return True
+
+
+async def test_replica_errors_fall_back():
+    """Test that a failing replica query is retried on the primary and switches reads to it"""
+    print("\nTesting fallback after a replica error...")
+    replica_router.watch(get_replica_async_engine())
+    engine = create_engine(REPLICA_URL)
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE waitlist RENAME TO waitlist_broken"))
+    fallbacks = replica_router.fallbacks
+    count = await read_count()
+    assert count == PRIMARY_ROWS + 1, f"the failed read should be answered by the primary, got {count}"
+    assert replica_router.fallbacks == fallbacks + 1
+    print(f"✓ The failed replica read was retried on the primary ({count})")
+    assert not replica_router.healthy, "a replica error should mark it unhealthy"
+    count = await read_count()
+    assert count == PRIMARY_ROWS + 1
+    print(f"✓ After the error, reads fell back to the primary ({count})")
+
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE waitlist_broken RENAME TO waitlist"))
+    engine.dispose()
+    await replica_router.check(get_replica_async_engine())
+    assert replica_router.healthy
+    print("✓ Replica used again after a successful check")
+
+    unreachable = create_async_engine(f"sqlite+aiosqlite:///{_tmpdir.name}/missing/dir/replica.db")
+    router = ReplicaRouter(max_lag=5, check_interval=1)
+    await router.check(unreachable)
+    await unreachable.dispose()
+    assert not router.healthy and router.lag is None
+    print("✓ Unreachable replica reported unhealthy")
+    return True
+
+
+def test_count_endpoint():
+    """Test that the count endpoint is served from the replica"""
+    print("\nTesting /api/waitlist/count through the API...")
+    from fastapi.testclient import TestClient
+    from api import app
+    from api.counter import waitlist_counter
+
+    replica_router.healthy = False
+    with TestClient(app) as client:
+        # The lifespan starts the background replica check
+        deadline = time.monotonic() + 5
+        while not replica_router.healthy and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert replica_router.healthy, "background check never marked the replica healthy"
+
+        response = client.get("/api/waitlist/count")
+        assert response.status_code == 200
+        assert response.json()["count"] == REPLICA_ROWS, response.json()
+        print(f"✓ Count endpoint answered from the replica ({response.json()['count']})")
+
+        response = client.post("/api/waitlist", data={"email": "api@example.com"})
+        assert response.status_code == 200, response.text
+        print("✓ Signup still written to the primary")
+
+        # The replica fails after the request was routed to it
+        engine = create_engine(REPLICA_URL)
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE waitlist RENAME TO waitlist_broken"))
+        try:
+            assert replica_router.healthy
+            waitlist_counter.invalidate()
+            response = client.get("/api/waitlist/count")
+            assert response.status_code == 200, response.text
+            assert response.json()["count"] == PRIMARY_ROWS + 2, response.json()
+            print(f"✓ Replica error mid-request answered from the primary ({response.json()['count']})")
+        finally:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE waitlist_broken RENAME TO waitlist"))
+            engine.dispose()
+    return True
+
+
+async def run_async_tests():
+    results = {}
+    for name, test in (
+        ("Replica Reads", test_reads_use_replica),
+        ("Lag Fallback", test_stale_replica_falls_back),
+        ("Error Fallback", test_replica_errors_fall_back),
+    ):
+        try:
+            results[name] = await test()
+        except Exception as e:
+            print(f"✗ {name} failed: {e!r}")
+            results[name] = False
+    await dispose_engines()
+    return results
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO READ REPLICA TEST")
+    print("=" * 50)
+
+    setup_databases()
+    results = asyncio.run(run_async_tests())
+    try:
+        results["Count Endpoint"] = test_count_endpoint()
+    except Exception as e:
+        print(f"✗ Count Endpoint failed: {e!r}")
+        results["Count Endpoint"] = False
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All replica tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
@@ -0,0 +1,299 @@
+"""
+Test script for the waitlist schema and its uniqueness rules.
+Runs against a temporary SQLite file, or against TEST_DATABASE_URL (an
+empty scratch database; its waitlist table is dropped) when set.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{os.path.join(_tmpdir.name, 'schema.db')}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import MetaData, delete, func, insert, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+import db.queries
+from db import dispose_engines, get_engine, new_async_session
+from db import migrations
+from db.migrations import run_migrations
+from db.models import Waitlist, email_hash
+from db.partitioning import add_partitions, is_partitioned, partition_waitlist
+from db.queries import email_exists, insert_waitlist_email, insert_waitlist_emails, signup_values
+
+# Months of history seeded before partitioning, one signup each
+SEEDED_MONTHS = 14
+
+
+def drop_tables():
+    engine = get_engine()
+    metadata = MetaData()
+    metadata.reflect(engine)
+    cascade = " CASCADE" if engine.dialect.name == "postgresql" else ""
+    with engine.begin() as conn:
+        for name in ("waitlist_email_hashes", "waitlist", "signup_rollups", "schema_migrations"):
+            if name in metadata.tables:
+                conn.execute(text(f"DROP TABLE {name}{cascade}"))
+
+
+def reset_schema():
+    """Drop every table so migrations start from an empty database"""
+    drop_tables()
+    run_migrations(get_engine())
+
+
+async def test_duplicate_emails():
+    """Test that a second signup for an email is skipped, singly and in batches"""
+    print("Testing duplicate email handling...")
+    async with new_async_session() as db:
+        first = await insert_waitlist_email(db, signup_values("dup@example.com"))
+        again = await insert_waitlist_email(db, signup_values("dup@example.com"))
+        assert first is not None and again is None, (first, again)
+        print("✓ Second insert of the same email returned no row")
+
+        inserted = await insert_waitlist_emails(db, [signup_values(e) for e in ("dup@example.com", "new@example.com")])
+        assert list(inserted) == ["new@example.com"], inserted
+        print("✓ Batch insert skipped the waitlisted email only")
+
+        assert await email_exists(db, "dup@example.com")
+        assert not await email_exists(db, "missing@example.com")
+        stored = await db.scalar(select(Waitlist.email_hash).where(Waitlist.email == "dup@example.com"))
+        assert stored == email_hash("dup@example.com")
+        print("✓ Lookups go through the stored email hash")
+    return True
+
+
+async def test_other_collisions_raise():
+    """Test that a collision on another unique column is not reported as a duplicate email"""
+    print("\nTesting collisions on other unique columns...")
+    async with new_async_session() as db:
+        existing = await insert_waitlist_email(db, signup_values("owner@example.com"))
+        values = signup_values("collides@example.com")
+        values["referral_code"] = existing.referral_code
+        try:
+            await insert_waitlist_email(db, values)
+            raise AssertionError("a referral code collision should raise")
+        except IntegrityError:
+            await db.rollback()
+        count = await db.scalar(select(func.count()).select_from(Waitlist).where(Waitlist.email == "collides@example.com"))
+        assert count == 0
+    print("✓ Referral code collision raised IntegrityError instead of passing as a duplicate")
+    return True
+
+
+def test_legacy_domains():
+    """Test that migration 8 IDNA-encodes legacy Unicode domains unless the result is taken"""
+    print("\nTesting re-normalization of legacy Unicode domains...")
+    engine = get_engine()
+    # Stored by the release before normalize_email, as email.lower().strip()
+    legacy = ("legacy@bücher.de", "taken@münchen.de", "ascii@example.com")
+    with engine.begin() as conn:
+        conn.execute(insert(Waitlist), [signup_values(email) for email in legacy])
+        conn.execute(insert(Waitlist), signup_values("taken@xn--mnchen-3ya.de"))
+        conn.execute(delete(migrations.schema_migrations).where(migrations.schema_migrations.c.version == 8))
+
+    assert run_migrations(engine) == 1
+    with engine.connect() as conn:
+        emails = set(conn.execute(select(Waitlist.email).where(Waitlist.email.like("%.de"))).scalars())
+        digest = conn.scalar(select(Waitlist.email_hash).where(Waitlist.email == "legacy@xn--bcher-kva.de"))
+    assert emails == {"legacy@xn--bcher-kva.de", "taken@münchen.de", "taken@xn--mnchen-3ya.de"}, emails
+    assert digest == email_hash("legacy@xn--bcher-kva.de")
+    print("✓ Unicode domain re-encoded and rehashed; an already-taken address left for review")
+    return True
+
+
+def test_rolling_deploy():
+    """Test that signups from both releases work between the email_hash expand and contract steps (PostgreSQL)"""
+    print("\nTesting the email_hash migration during a rolling deploy...")
+    engine = get_engine()
+    drop_tables()
+    # The previous release's schema, with a signup already on it
+    before_hash = [m for m in migrations.MIGRATIONS if m[0] < 6]
+    with patch.object(migrations, "MIGRATIONS", before_hash):
+        run_migrations(engine)
+    old_insert = text(
+        "INSERT INTO waitlist (email, created_at, referral_code) VALUES (:email, now(), :code) "
+        "ON CONFLICT (email) DO NOTHING RETURNING id"
+    )
+    with engine.begin() as conn:
+        conn.execute(old_insert, {"email": "existing@example.com", "code": "existing"})
+
+    assert run_migrations(engine) == 1, "only the expand step should apply without --contract"
+    with engine.begin() as conn:
+        # A worker of the previous release: no email_hash, conflicts on email
+        assert conn.execute(old_insert, {"email": "old@example.com", "code": "old"}).first() is not None
+        assert conn.execute(old_insert, {"email": "existing@example.com", "code": "again"}).first() is None
+        missing = conn.scalar(select(func.count()).select_from(Waitlist).where(Waitlist.email_hash.is_(None)))
+    assert missing == 0, "the trigger and backfill should fill every email_hash"
+    print("✓ Previous release's inserts still work and get an email_hash")
+    return True
+
+
+async def test_rolling_deploy_new_release():
+    async with new_async_session() as session:
+        assert await insert_waitlist_email(session, signup_values("old@example.com")) is None
+        assert await insert_waitlist_email(session, signup_values("new@example.com")) is not None
+    print("✓ New release skips emails the old one stored, by hash")
+    return True
+
+
+def test_contract_step():
+    engine = get_engine()
+    assert run_migrations(engine, contract=True) == 2
+    with engine.begin() as conn:
+        column = next(c for c in inspect(conn).get_columns("waitlist") if c["name"] == "email_hash")
+        indexes = {index["name"] for index in inspect(conn).get_indexes("waitlist")}
+        trigger = conn.scalar(text("SELECT count(*) FROM pg_trigger WHERE tgname = 'waitlist_fill_email_hash'"))
+    assert not column["nullable"] and trigger == 0, (column, trigger)
+    assert "ix_waitlist_email" not in indexes and "ix_waitlist_email_hash" in indexes, indexes
+    print("✓ --contract made email_hash NOT NULL, dropped the trigger and email index and ran migration 8")
+    return True
+
+
+def test_partition_conversion():
+    """Test converting a populated waitlist into monthly partitions (PostgreSQL)"""
+    print("\nTesting partition-waitlist on a populated table...")
+    engine = get_engine()
+    now = datetime.utcnow()
+    rows = []
+    for months_ago in range(SEEDED_MONTHS):
+        values = signup_values(f"month{months_ago}@example.com")
+        values["created_at"] = now - timedelta(days=31 * months_ago)
+        rows.append(values)
+    future = signup_values("future@example.com")
+    future["created_at"] = datetime(2100, 1, 1)
+    rows.append(future)
+    with engine.begin() as conn:
+        conn.execute(insert(Waitlist), rows)
+        before = conn.scalar(select(func.count()).select_from(Waitlist))
+        last_id = conn.scalar(select(func.max(Waitlist.id)))
+
+    with engine.begin() as conn:
+        moved = partition_waitlist(conn, months_ahead=2)
+    assert moved == before, (moved, before)
+    with engine.connect() as conn:
+        assert is_partitioned(conn)
+        assert conn.scalar(select(func.count()).select_from(Waitlist)) == before
+        assert conn.scalar(text("SELECT count(*) FROM waitlist_email_hashes")) == before
+        partitions = conn.scalar(text("SELECT count(*) FROM pg_partition_tree('waitlist') WHERE isleaf"))
+        in_default = conn.scalar(text("SELECT email FROM waitlist_default"))
+        owner = conn.scalar(text("SELECT pg_get_serial_sequence('waitlist', 'id')"))
+    assert in_default == "future@example.com", in_default
+    assert owner is not None, "the id sequence should belong to the new table"
+    print(f"✓ Moved {moved} rows into {partitions} partitions, out-of-range row in the default one")
+
+    with engine.begin() as conn:
+        created = add_partitions(conn, months_ahead=4)
+    assert created == 2, created
+    print(f"✓ add-partitions created {created} more months")
+    return last_id
+
+
+async def test_partitioned_inserts(last_id):
+    """Test duplicate detection, concurrency and deletes across partitions (PostgreSQL)"""
+    print("\nTesting signups on the partitioned table...")
+    # Cached as unpartitioned by the earlier tests in this process
+    db.queries._partitioned = None
+    async with new_async_session() as session:
+        row = await insert_waitlist_email(session, signup_values("fresh@example.com"))
+        assert row is not None and row.id > last_id, row
+        print(f"✓ New signup inserted with id {row.id}, continuing the old sequence")
+
+        # Stored a year ago, so the duplicate would land in a different partition
+        old = f"month{SEEDED_MONTHS - 1}@example.com"
+        assert await insert_waitlist_email(session, signup_values(old)) is None
+        inserted = await insert_waitlist_emails(session, [signup_values(e) for e in (old, "batch@example.com")])
+        assert list(inserted) == ["batch@example.com"], inserted
+        assert await email_exists(session, old)
+        print("✓ Duplicates of emails in older partitions skipped, singly and in batches")
+
+    async def insert_once(email):
+        async with new_async_session() as session:
+            return await insert_waitlist_email(session, signup_values(email))
+
+    results = await asyncio.gather(*(insert_once("race@example.com") for _ in range(5)))
+    assert sum(row is not None for row in results) == 1, results
+    print("✓ 5 concurrent signups for one email inserted exactly one row")
+
+    async with new_async_session() as session:
+        await session.execute(delete(Waitlist).where(Waitlist.email == old))
+        await session.commit()
+        assert not await email_exists(session, old)
+        row = await insert_waitlist_email(session, signup_values(old))
+        assert row is not None, "a deleted email should be free to sign up again"
+        rows = await session.scalar(select(func.count()).select_from(Waitlist))
+        hashes = await session.scalar(text("SELECT count(*) FROM waitlist_email_hashes"))
+        assert rows == hashes, (rows, hashes)
+    print("✓ Deleting a signup released its email; hash table matches the rows")
+    return True
+
+
+async def run_async_tests(tests):
+    results = {}
+    for name, test in tests:
+        try:
+            results[name] = await test()
+        except Exception as e:
+            print(f"✗ {name} failed: {e!r}")
+            results[name] = False
+    await dispose_engines()
+    return results
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO WAITLIST SCHEMA TEST")
+    print("=" * 50)
+
+    reset_schema()
+    results = asyncio.run(run_async_tests((
+        ("Duplicate Emails", test_duplicate_emails),
+        ("Other Collisions", test_other_collisions_raise),
+    )))
+    try:
+        results["Legacy Domains"] = test_legacy_domains()
+    except Exception as e:
+        print(f"✗ Legacy Domains failed: {e!r}")
+        results["Legacy Domains"] = False
+
+    if get_engine().dialect.name == "postgresql":
+        try:
+            results["Rolling Deploy"] = (
+                test_rolling_deploy()
+                and asyncio.run(run_async_tests((("Rolling Deploy", test_rolling_deploy_new_release),)))["Rolling Deploy"]
+                and test_contract_step()
+            )
+        except Exception as e:
+            print(f"✗ Rolling Deploy failed: {e!r}")
+            results["Rolling Deploy"] = False
+        try:
+            last_id = test_partition_conversion()
+            results["Partition Conversion"] = True
+            results.update(asyncio.run(run_async_tests((
+                ("Partitioned Inserts", lambda: test_partitioned_inserts(last_id)),
+            ))))
+        except Exception as e:
+            print(f"✗ Partition Conversion failed: {e!r}")
+            results["Partition Conversion"] = False
+    else:
+        print("\nSkipping partitioning tests; set TEST_DATABASE_URL to a PostgreSQL database")
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All schema tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
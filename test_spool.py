@@ -0,0 +1,205 @@
+"""
+Test script for the signup spool used while the database is unavailable.
+Spools into a temporary directory and replays into a temporary SQLite file.
+"""
+import asyncio
+import glob
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'spool.db')}"
+os.environ["WAITLIST_SPOOL_DIR"] = os.path.join(_tmpdir.name, "api-spool")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from db import dispose_engines, new_async_session
+from db.migrations import run_migrations
+from db.models import Waitlist
+from db.queries import signup_values
+from db.spool import (
+    CORRUPT_SUFFIX, SEGMENT_SUFFIX, CircuitBreaker, SignupSpool, decode_records, encode_record,
+)
+
+
+def stored_emails():
+    engine = create_engine(os.environ["DATABASE_URL"])
+    with engine.connect() as conn:
+        emails = set(conn.execute(select(Waitlist.email)).scalars())
+    engine.dispose()
+    return emails
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for the spool")
+        await asyncio.sleep(0.02)
+
+
+def test_record_checksums():
+    """Test that a record with a bad CRC ends decoding at the last good record"""
+    print("Testing spool record framing...")
+    records = [encode_record(signup_values(f"crc{i}@example.com"), None) for i in range(3)]
+    decoded, valid_bytes = decode_records(b"".join(records))
+    assert [r["email"] for r in decoded] == [f"crc{i}@example.com" for i in range(3)]
+    assert valid_bytes == sum(len(r) for r in records)
+
+    damaged = bytearray(records[1])
+    damaged[-2] ^= 0xFF
+    decoded, valid_bytes = decode_records(records[0] + bytes(damaged) + records[2])
+    assert len(decoded) == 1 and valid_bytes == len(records[0]), (len(decoded), valid_bytes)
+    print("✓ Decoding stopped at the corrupted record")
+
+    decoded, valid_bytes = decode_records(records[0] + records[1][:-3])
+    assert len(decoded) == 1 and valid_bytes == len(records[0])
+    print("✓ A torn final record is not decoded")
+    return True
+
+
+async def test_write_and_replay():
+    """Test that spooled signups are fsynced to a segment and replayed once the database is back"""
+    print("\nTesting spool write and replay...")
+    directory = os.path.join(_tmpdir.name, "spool")
+    breaker = CircuitBreaker(cooldown=0.5)
+    # Open, as after a database outage, so nothing replays until the probe
+    breaker.trip()
+    spool = SignupSpool(directory, breaker, scan_interval=0.1)
+    replayed = []
+    spool.start(new_async_session, lambda values, row: replayed.append(values["email"]))
+    try:
+        emails = ["spool-a@example.com", "spool-b@example.com", "spool-a@example.com"]
+        await asyncio.gather(*(spool.append(signup_values(email)) for email in emails))
+        assert spool.spooled == 3 and spool.fsyncs == 1, spool.stats()
+        segments = glob.glob(os.path.join(directory, f"*{SEGMENT_SUFFIX}"))
+        with open(segments[0], "rb") as f:
+            records, _ = decode_records(f.read())
+        assert [r["email"] for r in records] == emails
+        print(f"✓ 3 concurrent appends written to {len(segments)} segment with one fsync")
+
+        await wait_for(lambda: spool.replayed == 2)
+        assert sorted(replayed) == ["spool-a@example.com", "spool-b@example.com"]
+        assert spool.duplicates == 1
+        assert not breaker.is_open
+        await wait_for(lambda: not glob.glob(os.path.join(directory, f"*{SEGMENT_SUFFIX}")))
+        assert {"spool-a@example.com", "spool-b@example.com"} <= stored_emails()
+        print("✓ Replayed after the probe succeeded, duplicate skipped, segment deleted")
+    finally:
+        await spool.stop()
+    return True
+
+
+async def test_corrupt_segment():
+    """Test that a segment with a bad CRC replays its good prefix and is kept aside"""
+    print("\nTesting replay of a corrupted segment...")
+    directory = os.path.join(_tmpdir.name, "corrupt")
+    os.makedirs(directory)
+    good = [encode_record(signup_values(f"good{i}@example.com"), None) for i in range(2)]
+    bad = bytearray(encode_record(signup_values("bad@example.com"), None))
+    bad[-1] ^= 0xFF
+    after = encode_record(signup_values("after@example.com"), None)
+    path = os.path.join(directory, f"{time.time_ns():020d}-1-000001{SEGMENT_SUFFIX}")
+    with open(path, "wb") as f:
+        f.write(b"".join(good) + bytes(bad) + after)
+
+    spool = SignupSpool(directory, CircuitBreaker(), scan_interval=0.1)
+    spool.start(new_async_session, lambda values, row: None)
+    try:
+        await wait_for(lambda: spool.replayed == 2)
+        await wait_for(lambda: os.path.exists(path[:-len(SEGMENT_SUFFIX)] + CORRUPT_SUFFIX))
+    finally:
+        await spool.stop()
+    emails = stored_emails()
+    assert {"good0@example.com", "good1@example.com"} <= emails
+    assert "bad@example.com" not in emails and "after@example.com" not in emails
+    assert spool.lost_bytes == len(bad) + len(after)
+    print(f"✓ Good records replayed, {spool.lost_bytes} damaged bytes kept as {CORRUPT_SUFFIX}")
+    return True
+
+
+def test_api_spools_only_outages():
+    """Test that only database unavailability is spooled by the signup endpoint"""
+    print("\nTesting which signup errors are spooled...")
+    from fastapi.testclient import TestClient
+    import api
+
+    insert = api.insert_signup_with_timeout
+
+    async def unreachable(*args):
+        raise OperationalError("INSERT", {}, ConnectionRefusedError("connection refused"))
+
+    async def broken(*args):
+        raise ValueError("a bug, not an outage")
+
+    with TestClient(api.app, raise_server_exceptions=False) as client:
+        try:
+            api.insert_signup_with_timeout = unreachable
+            response = client.post("/api/waitlist", data={"email": "outage@example.com"})
+            assert response.status_code == 202 and response.json()["queued"], response.text
+            print("✓ Connection error answered 202 and spooled")
+
+            spooled = api.signup_spool.spooled
+            failures = api.signup_spool.breaker.stats()["recent_failures"]
+            api.insert_signup_with_timeout = broken
+            response = client.post("/api/waitlist", data={"email": "bug@example.com"})
+            assert response.status_code == 500, response.status_code
+            assert api.signup_spool.spooled == spooled
+            assert api.signup_spool.breaker.stats()["recent_failures"] == failures
+            print("✓ Other errors fail with 500, are not spooled and do not count against the breaker")
+        finally:
+            api.insert_signup_with_timeout = insert
+    return True
+
+
+async def run_async_tests():
+    results = {}
+    for name, test in (("Write And Replay", test_write_and_replay), ("Corrupt Segment", test_corrupt_segment)):
+        try:
+            results[name] = await test()
+        except Exception as e:
+            print(f"✗ {name} failed: {e!r}")
+            results[name] = False
+    await dispose_engines()
+    return results
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("LAVOO SIGNUP SPOOL TEST")
+    print("=" * 50)
+
+    run_migrations(create_engine(os.environ["DATABASE_URL"]))
+    results = {}
+    try:
+        results["Record Checksums"] = test_record_checksums()
+    except Exception as e:
+        print(f"✗ Record Checksums failed: {e!r}")
+        results["Record Checksums"] = False
+    results.update(asyncio.run(run_async_tests()))
+    try:
+        results["Outages Only"] = test_api_spools_only_outages()
+    except Exception as e:
+        print(f"✗ Outages Only failed: {e!r}")
+        results["Outages Only"] = False
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("TEST SUMMARY")
+    print("=" * 50)
+    for name, passed in results.items():
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    _tmpdir.cleanup()
+    if all(results.values()):
+        print("\n✓ All spool tests passed!")
+    else:
+        print("\n✗ Some tests failed. Please check the errors above.")
+        sys.exit(1)
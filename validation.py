@@ -0,0 +1,106 @@
+import os
+import re
+from functools import lru_cache
+
+
+class InvalidEmail(ValueError):
+    """Raised when an email address fails syntax validation."""
+
+
+# Dot-atom local part (RFC 5322) with Unicode letters allowed for SMTPUTF8
+_LOCAL_PART = re.compile(r"[\w!#$%&'*+/=?^`{|}~-]+(?:\.[\w!#$%&'*+/=?^`{|}~-]+)*")
+# A single ASCII (post-IDNA) domain label and top-level domain
+_DOMAIN_LABEL = re.compile(r"[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?")
+_TOP_LEVEL_DOMAIN = re.compile(r"[a-z]{2,63}|xn--[a-z0-9-]{1,59}")
+
+# Providers that ignore dots in the local part and support +tags
+DOT_INSENSITIVE_DOMAINS = {"gmail.com": "gmail.com", "googlemail.com": "gmail.com"}
+# Providers that deliver user+tag@ to user@
+PLUS_ADDRESS_DOMAINS = frozenset({
+    "gmail.com",
+    "outlook.com",
+    "hotmail.com",
+    "live.com",
+    "icloud.com",
+    "me.com",
+    "fastmail.com",
+    "proton.me",
+    "protonmail.com",
+})
+
+# Collapse Gmail-style aliases to one address before storing
+CANONICALIZE_EMAILS = os.getenv("WAITLIST_CANONICALIZE_EMAILS", "").lower() in ("1", "true", "yes", "on")
+
+
+@lru_cache(maxsize=4096)
+def _normalize_domain(domain: str):
+    """
+    Lowercase, IDNA-encode and validate a domain.
+
+    Verdicts are cached because signups concentrate on a handful of
+    providers, so the IDNA codec and label checks rarely run.
+
+    Returns:
+        ASCII domain, or None if the domain is invalid
+    """
+    domain = domain.lower().rstrip(".")
+    try:
+        domain = domain.encode("idna").decode("ascii")
+    except UnicodeError:
+        return None
+
+    if len(domain) > 253:
+        return None
+
+    labels = domain.split(".")
+    if len(labels) < 2 or not _TOP_LEVEL_DOMAIN.fullmatch(labels[-1]):
+        return None
+    for label in labels:
+        if not _DOMAIN_LABEL.fullmatch(label):
+            return None
+    return domain
+
+
+def normalize_email(email: str, canonicalize: bool = CANONICALIZE_EMAILS) -> str:
+    """
+    Validate an email address and return its normalized form.
+
+    Checks are purely syntactic (no DNS): a dot-atom local part of at most
+    64 characters and a domain of at least two valid labels. The address is
+    trimmed and lowercased and the domain IDNA-encoded. With canonicalize,
+    ``+tag`` suffixes are dropped for providers that support plus addressing
+    and dots are removed from Gmail local parts.
+
+    Args:
+        email: Raw address as submitted
+        canonicalize: Collapse provider-specific aliases
+
+    Returns:
+        Normalized email address
+
+    Raises:
+        InvalidEmail: If the address is not syntactically valid
+    """
+    email = email.strip()
+    if not email or len(email) > 254:
+        raise InvalidEmail("Invalid email format")
+
+    local, sep, domain = email.rpartition("@")
+    if not sep or not local or len(local) > 64 or not _LOCAL_PART.fullmatch(local):
+        raise InvalidEmail("Invalid email format")
+
+    domain = _normalize_domain(domain)
+    if domain is None:
+        raise InvalidEmail("Invalid email format")
+
+    local = local.lower()
+    if canonicalize:
+        domain = DOT_INSENSITIVE_DOMAINS.get(domain, domain)
+        if domain in PLUS_ADDRESS_DOMAINS:
+            local = local.split("+", 1)[0]
+            if not local:
+                raise InvalidEmail("Invalid email format")
+        if domain in DOT_INSENSITIVE_DOMAINS:
+            local = local.replace(".", "")
+
+    return f"{local}@{domain}"